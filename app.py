@@ -1,18 +1,22 @@
-from flask import Flask, render_template
+from flask import Flask, render_template, request
 from flask_socketio import SocketIO
 import threading
 from datetime import datetime
 import config  # ⭐️ config 모듈 임포트
 from config import HOST, PORT, LANGUAGE, TARGET_LANG  # ⭐️ 언어 설정 임포트
 from db_handler import init_db, get_latest_session_id, fetch_data_from_db, get_all_session_ids, rename_session, \
-    delete_session  # ⭐️ delete_session 임포트
+    delete_session, close_all_connections, close_connection, register_session, \
+    get_session_details, iter_transcript_pages, search_transcripts  # ⭐️ delete_session 임포트
 from audio_processor import main_audio_streaming, audio_q
 import queue
-from summary_handler import load_kobart_model, summarize_text
+from summary_handler import load_kobart_model, summarize_text, SummaryCancelled
 import os  # ⭐️ [신규] .wav 파일 삭제를 위해 임포트
 
 # ⭐️ [신규] diarize_handler 임포트
 import diarize_handler
+from audio_ingest import remove_normalized_audio, normalized_path
+from job_scheduler import JobScheduler, JobQueueFull, PRIORITY_HIGH, PRIORITY_NORMAL
+from diarize_worker import DiarizationProcessPool
 
 app = Flask(__name__)
 socketio = SocketIO(app, cors_allowed_origins="*")
@@ -20,14 +24,65 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # --- ⭐️ [수정] 오디오 스레드 관리를 위한 전역 변수 ---
 current_audio_thread = None
 current_stop_event = None
+current_audio_session_id = None  # ⭐️ [신규] 실시간 녹음 중인 세션 (화자 분리 대상에서 제외)
+pending_session_id = None  # ⭐️ [신규] 이전 세션 정리가 끝나면 시작할 세션
+session_lock = threading.Lock()  # 위 세션 상태 변수 보호 (핸들러 스레드 ↔ 오디오 스레드)
 
-# ⭐️ [신규] 화자 분리 스레드 관리를 위한 전역 변수
-current_diarize_thread = None
+# ⭐️ [신규] 세션 불러오기 관리 (클라이언트별로 가장 최근 요청만 계속 전송)
+load_generations = {}
+load_generations_lock = threading.Lock()
+
+# ⭐️ [신규] 클라이언트별 가장 최근 요약 요청 (request_id는 결과 이벤트에 그대로 돌려줌)
+summary_jobs = {}  # sid -> job_id
+summary_request_ids = {}  # sid -> request_id
+summary_lock = threading.Lock()
+
+
+# ⭐️ [신규] 요약/화자 분리 작업 스케줄러 (상태가 바뀔 때마다 모든 클라이언트에 전송)
+def on_job_update(job):
+    socketio.emit("job_updated", job.snapshot())
+
+
+job_scheduler = JobScheduler({
+    'summary': (config.SUMMARY_JOB_WORKERS, config.SUMMARY_JOB_QUEUE_MAXSIZE),
+    'diarization': (config.DIARIZE_JOB_WORKERS, config.DIARIZE_JOB_QUEUE_MAXSIZE),
+    'diarization_lookup': (config.DIARIZE_LOOKUP_JOB_WORKERS, config.DIARIZE_LOOKUP_JOB_QUEUE_MAXSIZE),
+}, on_update=on_job_update)
+
+# ⭐️ [신규] 화자 분리 작업 프로세스 풀 (스케줄러 작업 스레드 1개당 프로세스 1개, 처음 요청 시 시작)
+diarize_pool = DiarizationProcessPool(config.DIARIZE_JOB_WORKERS) if config.DIARIZE_USE_PROCESS else None
 
 
 # ----------------------------------------------------
 
 
+# ⭐️ [신규] 세션 목록 이벤트 데이터 (sessions 테이블 메타데이터 포함)
+def build_session_list_payload(latest_session=None):
+    details = get_session_details()
+    all_sessions = [d['session_id'] for d in details]
+    if latest_session is None and all_sessions:
+        latest_session = all_sessions[0]  # 최신 세션이 첫 번째
+
+    session_details = []
+    for d in details:
+        start_time = d['start_time']
+        if start_time:
+            # DB에는 KST 'YYYY-MM-DD HH:MM:SS'로 저장됨 → 브라우저가 해석할 수 있는 ISO 형식으로
+            start_time = start_time.replace(" ", "T") + "+09:00"
+        session_details.append({
+            'session_id': d['session_id'],
+            'start_time': start_time,
+            'duration': int(round(d['duration'] or 0)),
+            'row_count': d['row_count']
+        })
+
+    return {
+        'all_sessions': all_sessions,
+        'latest_session': latest_session,
+        'session_details': session_details
+    }
+
+
 # --- Flask 라우트 ---
 @app.route("/")
 def index():
@@ -43,6 +98,9 @@ def handle_connect():
 @socketio.on("disconnect")
 def handle_disconnect():
     print("❌ 클라이언트 연결 해제됨")
+    with load_generations_lock:
+        load_generations.pop(request.sid, None)  # 진행 중인 세션 불러오기 중단
+    cancel_summary(request.sid)  # 이 클라이언트만 기다리던 요약 작업 중단
 
 
 # --- ⭐️ [신규] "세션 목록" (최초) 요청 핸들러 ---
@@ -55,15 +113,7 @@ def handle_session_list_request(data):  # ⭐️ (data) 인자 유지
     """
     print("🔄 (최초) 세션 목록 요청 수신...")
     try:
-        all_sessions = get_all_session_ids()
-        latest_session_id = None
-        if all_sessions:
-            latest_session_id = all_sessions[0]  # 최신 세션이 첫 번째
-
-        socketio.emit("session_list_updated", {
-            'all_sessions': all_sessions,
-            'latest_session': latest_session_id
-        })
+        socketio.emit("session_list_updated", build_session_list_payload())
     except Exception as e:
         print(f"⚠️ 최초 세션 목록 전송 중 오류: {e}")
         socketio.emit("session_list_updated", {
@@ -72,6 +122,118 @@ def handle_session_list_request(data):  # ⭐️ (data) 인자 유지
         })
 
 
+# --- ⭐️ [신규] 세션 기록 불러오기 핸들러 ---
+@socketio.on("request_load_session")
+def handle_load_session(data):
+    """
+    클라이언트가 세션을 선택했을 때 호출됩니다.
+    기록을 페이지 단위로 나누어 'session_log_loaded' 이벤트로 요청한 클라이언트에게만 전송합니다.
+    """
+    session_id = data.get("session_id")
+    if not session_id:
+        print("⚠️ 세션 불러오기 거부: 세션 ID가 없습니다.")
+        return
+
+    sid = request.sid
+    with load_generations_lock:
+        generation = load_generations.get(sid, 0) + 1
+        load_generations[sid] = generation  # 이전 불러오기 요청은 중단됨
+
+    print(f"🔄 (세션 불러오기) 요청 수신... 세션: {session_id}")
+    socketio.start_background_task(stream_session_log, sid, session_id, generation)
+
+
+def stream_session_log(sid, session_id, generation):
+    """(백그라운드) 세션 기록을 페이지 단위로 전송합니다. 첫 페이지는 page=0, 마지막 이벤트는 done=True"""
+    page = 0
+    total = 0
+    try:
+        for rows in iter_transcript_pages(session_id):
+            if load_generations.get(sid) != generation:
+                print(f"ℹ️ (세션 불러오기) 새 요청으로 중단: {session_id}")
+                return
+
+            socketio.emit("session_log_loaded", {
+                'session_id': session_id,
+                'logs': [{
+                    'id': row['id'],
+                    'original': row['original'],
+                    'translated': row['translated'],
+                    'speaker': row['speaker'],
+                    'time': (row['timestamp'] or "")[11:19]  # 'YYYY-MM-DD HH:MM:SS' -> 'HH:MM:SS'
+                } for row in rows],
+                'page': page,
+                'done': False
+            }, to=sid)
+            page += 1
+            total += len(rows)
+            socketio.sleep(0)  # 다른 이벤트 처리에 양보
+
+        socketio.emit("session_log_loaded", {
+            'session_id': session_id,
+            'logs': [],
+            'page': page,
+            'done': True,
+            'total': total
+        }, to=sid)
+        print(f"✅ (세션 불러오기) 완료. 세션: {session_id} ({total}개 문장, {page}페이지)")
+    except Exception as e:
+        print(f"⚠️ 세션 불러오기 중 오류: {e}")
+        # ⭐️ [수정] 일부만 받은 기록을 완료로 오인하지 않도록 실패를 알림 (done 이벤트 대신)
+        socketio.emit("session_log_failed", {
+            'session_id': session_id,
+            'error': str(e),
+            'loaded': total
+        }, to=sid)
+    finally:
+        close_connection()  # ⭐️ 작업이 끝나면 이 스레드의 DB 연결 정리
+
+
+# --- ⭐️ [신규] 전체 세션 전문 검색 핸들러 ---
+@socketio.on("request_search")
+def handle_search_request(data):
+    """
+    모든 세션의 원문/번역문을 검색하여 'search_results' 이벤트로 요청한 클라이언트에게 전송합니다.
+    data: {query, session_id(선택), start_time/end_time(선택, 'YYYY-MM-DD HH:MM:SS'), limit, offset}
+    """
+    query = (data.get("query") or "").strip()
+    if not query:
+        socketio.emit("search_results", {'query': query, 'results': []}, to=request.sid)
+        return
+
+    # 숫자가 아닌 값이 오면 기본값 사용
+    try:
+        limit = min(int(data.get("limit") or config.SEARCH_RESULT_LIMIT), config.SEARCH_RESULT_LIMIT)
+    except (TypeError, ValueError):
+        limit = config.SEARCH_RESULT_LIMIT
+    try:
+        offset = max(int(data.get("offset") or 0), 0)
+    except (TypeError, ValueError):
+        offset = 0
+    print(f"🔍 (검색) 요청 수신... 검색어: '{query}'")
+
+    results = search_transcripts(
+        query,
+        session_id=data.get("session_id") or None,
+        start_time=data.get("start_time") or None,
+        end_time=data.get("end_time") or None,
+        limit=limit,
+        offset=offset
+    )
+    socketio.emit("search_results", {
+        'query': query,
+        'offset': offset,
+        'results': [{
+            'id': r['id'],
+            'session_id': r['session_id'],
+            'time': r['timestamp'],
+            'original': r['original_snippet'],
+            'translated': r['translated_snippet'],
+            'score': r['score']
+        } for r in results]
+    }, to=request.sid)
+
+
 # --- ⭐️ [신규] 🌐 언어 변경 기능 ---
 @socketio.on("change_language")
 def handle_language_change(data):
@@ -101,63 +263,191 @@ def handle_specific_summary_request(data):
     """(수정) 클라이언트가 '요약' 버튼을 눌렀을 때 호출"""
     session_id = data.get("session_id")
     length = data.get("length", "medium")  # ⭐️ 기본값 medium
+    request_id = data.get("request_id")  # ⭐️ 클라이언트가 최신 요청의 이벤트만 표시하도록 그대로 돌려줌
 
     if not session_id:
         return
 
     print(f"🔄 (특정) 요약 요청 수신... 세션: {session_id}, 길이: {length}")
 
-    # ⭐️ [신규] 요약은 CPU 시간이 걸리므로 별도 스레드로 분리
-    threading.Thread(
-        target=run_summary_thread,
-        args=(session_id, length),  # ⭐️ length 전달
-        daemon=True
-    ).start()
+    # ⭐️ [수정] 요약은 스케줄러의 요약 작업 스레드에서 실행
+    # (같은 세션 + 같은 길이 요청이 이미 대기/실행 중이면 그 작업의 결과를 함께 받음)
+    sid = request.sid
+    with summary_lock:
+        summary_request_ids[sid] = request_id
+    try:
+        job, created = job_scheduler.submit(
+            'summary', (session_id, length), run_summary_job,
+            args=(session_id, length),  # ⭐️ length 전달
+            priority=PRIORITY_HIGH,
+            subscriber=sid
+        )
+    except JobQueueFull as e:
+        print(f"⚠️ (요약) 요청 거절: {e}")
+        socketio.emit("summary_data_updated", {
+            'current_session_id': session_id,
+            'request_id': request_id,
+            'summary': "[요약 요청이 너무 많습니다. 잠시 후 다시 시도하세요]"
+        }, to=sid)
+        return
+
+    if not created:
+        print(f"ℹ️ (요약) 진행 중인 같은 요청에 합칩니다. ({job.job_id})")
+
+    # ⭐️ 같은 클라이언트의 이전 요약 요청은 취소 (다른 구독자가 없을 때만 실제로 중단됨)
+    with summary_lock:
+        previous_job_id = summary_jobs.get(sid)
+        summary_jobs[sid] = job.job_id
+    if previous_job_id is not None and previous_job_id != job.job_id:
+        job_scheduler.unsubscribe(previous_job_id, sid)
 
 
-# ⭐️ [신규] 요약을 위한 스레드 함수 (길이 파라미터 추가)
-def run_summary_thread(session_id, length):
+# ⭐️ [신규] 요약 취소 (팝업창을 닫았을 때)
+@socketio.on("cancel_summary")
+def handle_cancel_summary(data=None):
+    if cancel_summary(request.sid):
+        print("🛑 (요약) 클라이언트 요청으로 요약을 취소합니다.")
+
+
+def cancel_summary(sid):
+    """해당 클라이언트의 요약 요청을 철회합니다. (작업이 실제로 취소됐으면 True)"""
+    with summary_lock:
+        job_id = summary_jobs.pop(sid, None)
+        summary_request_ids.pop(sid, None)
+    if job_id is None:
+        return False
+    return job_scheduler.unsubscribe(job_id, sid)
+
+
+def emit_to_summary_subscribers(job, event, payload):
+    """요약 작업을 기다리는 모든 클라이언트에게 각자의 request_id를 붙여 전송합니다."""
+    for sid in job_scheduler.subscribers(job):
+        with summary_lock:
+            request_id = summary_request_ids.get(sid)
+        socketio.emit(event, {**payload, 'request_id': request_id}, to=sid)
+
+
+# ⭐️ [수정] 요약 작업 함수 (스케줄러 작업 스레드에서 실행)
+def run_summary_job(job, session_id, length):
     """
-    (백그라운드 스레드)
-    summary_handler.py를 실행하고, 완료되면 팝업창으로 결과를 전송합니다.
+    summary_handler.py를 실행하고, 청크 요약이 끝날 때마다 'summary_progress'로,
+    완료되면 'summary_data_updated'로 이 작업을 기다리는 클라이언트의 팝업창에 결과를 전송합니다.
     """
+
+    def on_progress(event):
+        emit_to_summary_subscribers(job, "summary_progress", {
+            'current_session_id': session_id,
+            'job_id': job.job_id,
+            **event
+        })
+
     try:
         full_text = fetch_data_from_db(session_id)
         summary = ""
+        stats = None
 
         if not full_text:
             summary = "[선택된 세션에 요약할 텍스트가 없습니다]"
         else:
-            print(f"✅ (스레드) 세션 '{session_id}' 텍스트 요약 중... (길이: {length})")
+            print(f"✅ (작업) 세션 '{session_id}' 텍스트 요약 중... (길이: {length})")
             # ⭐️ [수정] 요약 길이를 전달
-            summary = summarize_text(full_text, length_mode=length)
+            summary, stats = summarize_text(full_text, length_mode=length, return_stats=True,
+                                            progress_callback=on_progress, cancel_event=job.cancel_event)
 
         # ⭐️ 팝업창 전용 이벤트로 전송
-        socketio.emit("summary_data_updated", {
+        emit_to_summary_subscribers(job, "summary_data_updated", {
             'current_session_id': session_id,
-            'summary': summary
+            'job_id': job.job_id,
+            'summary': summary,
+            'stats': stats  # ⭐️ 단계별 소요 시간
         })
 
+    except SummaryCancelled:
+        print(f"ℹ️ (작업) 세션 '{session_id}' 요약이 취소되었습니다.")
     except Exception as e:
-        print(f"⚠️ (스레드) 특정 세션 요약 처리 중 오류: {e}")
-        socketio.emit("summary_data_updated", {
+        print(f"⚠️ (작업) 특정 세션 요약 처리 중 오류: {e}")
+        emit_to_summary_subscribers(job, "summary_data_updated", {
             'current_session_id': session_id,
+            'job_id': job.job_id,
             'summary': f"[요약 생성 실패: {e}]"
         })
+        raise
+    finally:
+        with summary_lock:
+            for sid in [sid for sid, job_id in summary_jobs.items() if job_id == job.job_id]:
+                summary_jobs.pop(sid, None)
+
 
+# --- ⭐️ [신규] 작업 상태 조회 / 취소 핸들러 ---
+@socketio.on("request_job_status")
+def handle_job_status_request(data=None):
+    """대기/실행 중인 작업과 최근 끝난 작업의 상태를 'job_status'로 요청한 클라이언트에게 전송"""
+    kind = (data or {}).get("kind")
+    socketio.emit("job_status", {
+        'jobs': job_scheduler.list_jobs(kind=kind, include_finished=True)
+    }, to=request.sid)
 
-# --- ⭐️ 세션 이름 변경 핸들러 (사용자 HTML에서 제거됨) ---
-# (참고: 이 핸들러는 translation.html에서 제거되었으므로 호출되지 않습니다)
+
+@socketio.on("cancel_job")
+def handle_cancel_job(data):
+    job_id = (data or {}).get("job_id")
+    if job_id and job_scheduler.cancel(job_id):
+        print(f"🛑 클라이언트 요청으로 작업 취소: {job_id}")
+
+
+# --- ⭐️ [수정] 세션 이름 변경 핸들러 (DB 기록 + .wav 파일 + 16kHz 변환 캐시) ---
+# (참고: translation.html에는 이름 변경 버튼이 없으므로 다른 클라이언트/도구에서 호출)
 @socketio.on("request_rename_session")
 def handle_rename_session(data):
     """클라이언트의 세션 이름 변경 요청을 처리"""
-    old_id = data.get('old_id')
-    new_id = data.get('new_id')
+    old_id = (data or {}).get('old_id')
+    new_id = ((data or {}).get('new_id') or "").strip()
+
+    def fail(error):
+        print(f"⚠️ 이름 변경 거부 ('{old_id}' -> '{new_id}'): {error}")
+        socketio.emit("session_rename_failed", {'old_id': old_id, 'new_id': new_id, 'error': error}, to=request.sid)
 
     if not old_id or not new_id:
-        print("⚠️ 이름 변경 요청 오류: old_id 또는 new_id가 없습니다.")
-        return
-    # ... (이하 로직은 생략, 필요시 복원) ...
+        return fail("old_id 또는 new_id가 없습니다.")
+    if old_id == new_id:
+        return fail("같은 이름입니다.")
+    if os.path.basename(new_id) != new_id:
+        return fail("세션 이름에 경로 구분자를 쓸 수 없습니다.")
+    with session_lock:
+        live_session_id = current_audio_session_id
+    if old_id == live_session_id:
+        return fail("실시간 번역 중인 세션은 이름을 바꿀 수 없습니다.")
+
+    # 화자 분리는 wav/<세션 ID>.wav를 사용하므로 파일도 함께 옮김 (DB 변경 실패 시 되돌림)
+    old_wav = os.path.join("wav", f"{old_id}.wav")
+    new_wav = os.path.join("wav", f"{new_id}.wav")
+    if os.path.exists(new_wav):
+        return fail(f"같은 이름의 .wav 파일이 이미 있습니다: {new_wav}")
+
+    moved = False
+    try:
+        if os.path.exists(old_wav):
+            os.rename(old_wav, new_wav)
+            moved = True
+        if not rename_session(old_id, new_id, wav_path=new_wav):
+            if moved:
+                os.rename(new_wav, old_wav)
+            return fail("DB 이름 변경 실패 (없는 세션이거나 이미 있는 이름)")
+    except OSError as e:
+        return fail(f".wav 파일 이동 실패: {e}")
+
+    if moved:
+        old_cache, new_cache = normalized_path(old_wav), normalized_path(new_wav)
+        if os.path.exists(old_cache):
+            try:
+                os.replace(old_cache, new_cache)
+            except OSError as e:
+                print(f"⚠️ 변환 캐시 이동 실패, 삭제합니다: {e}")
+                remove_normalized_audio(old_wav)
+
+    print(f"✅ 세션 이름 변경 완료: '{old_id}' -> '{new_id}'")
+    socketio.emit("session_rename_success", {'old_id': old_id, 'new_id': new_id})
+    socketio.emit("session_list_updated", build_session_list_payload())
 
 
 # --- ⭐️ [신규] 세션 *삭제* 핸들러 ---
@@ -193,16 +483,12 @@ def handle_delete_session(data):
         else:
             print(f"⚠️ .wav 파일 없음 (무시): {wav_file_path}")
             file_success = True  # 파일이 없어도 DB는 삭제되어야 하므로 성공으로 간주
+        remove_normalized_audio(wav_file_path)  # ⭐️ [신규] 16kHz 변환 캐시도 삭제
 
         # 3. (중요) 모든 클라이언트의 세션 목록 갱신
         if db_success or file_success:
-            all_sessions = get_all_session_ids()
-            latest_session = all_sessions[0] if all_sessions else None
-
-            socketio.emit("session_list_updated", {
-                'all_sessions': all_sessions,
-                'latest_session': latest_session  # 가장 최신 세션을 선택
-            })
+            # 가장 최신 세션을 선택
+            socketio.emit("session_list_updated", build_session_list_payload())
             print("✅ 세션 삭제 완료. 클라이언트 목록 갱신.")
 
     except Exception as e:
@@ -230,7 +516,7 @@ def handle_start_session(data):
 def handle_stop_session(data):
     """클라이언트가 "중지" 버튼을 눌렀을 때 현재 세션을 중지시킵니다."""
     print("🔄 (세션 중지) 요청 수신...")
-    stop_audio_session(notify_client=True)
+    stop_audio_session()
 
 
 # ⭐️ [수정] "화자 분리" 요청 핸들러 (메인 페이지 버튼용)
@@ -239,8 +525,6 @@ def handle_diarization_request(data):
     """
     클라이언트가 *메인 페이지*에서 "화자 분리" 버튼을 눌렀을 때 호출됩니다.
     """
-    global current_audio_thread, current_diarize_thread
-
     session_id = data.get("session_id")
     if not session_id:
         print("⚠️ 화자 분리 거부: 세션 ID가 없습니다.")
@@ -250,7 +534,45 @@ def handle_diarization_request(data):
         })
         return
 
-    if current_audio_thread is not None and current_audio_thread.is_alive():
+    force = bool(data.get("force"))  # True: 저장된 결과를 무시하고 다시 분석
+    print(f"🔄 (화자 분리) 요청 수신... 대상 세션: {session_id}")
+
+    # ⭐️ [수정] 저장된 결과 확인(WAV 해시 계산 포함)도 서버 이벤트 처리 밖의 작업 스레드에서 실행
+    try:
+        job_scheduler.submit(
+            'diarization_lookup', (session_id, force), run_diarization_lookup_job,
+            args=(session_id, force),
+            priority=PRIORITY_HIGH,
+            subscriber=request.sid
+        )
+    except JobQueueFull as e:
+        print(f"⚠️ 화자 분리 거부: {e}")
+        socketio.emit("diarization_result", {
+            'session_id': session_id,
+            'result_text': "[오류] 대기 중인 화자 분리 작업이 너무 많습니다. 잠시 후 시도하세요."
+        })
+
+
+# ⭐️ [신규] 화자 분리 요청 1단계: 저장된 결과 확인 → 없으면 분석 작업 등록
+def run_diarization_lookup_job(job, session_id, force):
+    """
+    저장된 결과가 유효하면 바로 전송하고, 아니면 분석 작업을 대기열에 등록합니다.
+    (캐시 적중은 다른 세션 분석이 실행 중이어도 기다리지 않음)
+    """
+    if not force:
+        cached = diarize_handler.get_cached_diarization(session_id)
+        if cached is not None:
+            socketio.emit("diarization_result", {
+                'session_id': session_id,
+                'result_text': diarize_handler.format_diarization(cached),
+                'cached': True
+            })
+            return
+
+    # ⭐️ [수정] 작업 프로세스에서 실행하면 실시간 번역 중에도 다른 세션 분석 가능
+    # (녹음 중인 세션은 WAV가 아직 완성되지 않았으므로 제외)
+    live_running = current_audio_thread is not None and current_audio_thread.is_alive()
+    if live_running and (diarize_pool is None or session_id == current_audio_session_id):
         print("⚠️ 화자 분리 거부: 실시간 번역 세션이 실행 중입니다.")
         socketio.emit("diarization_result", {
             'session_id': session_id,
@@ -258,105 +580,162 @@ def handle_diarization_request(data):
         })
         return
 
-    if current_diarize_thread is not None and current_diarize_thread.is_alive():
-        print("⚠️ 화자 분리 거부: 이미 다른 세션의 화자 분리가 실행 중입니다.")
+    # ⭐️ [수정] 스케줄러 대기열에 등록 (다른 세션 작업이 실행 중이면 순서대로 실행,
+    # 같은 세션 작업이 이미 있으면 합침) - 확인 작업의 구독자를 그대로 옮김
+    try:
+        for sid in job_scheduler.subscribers(job) or [None]:
+            analysis_job, created = job_scheduler.submit(
+                'diarization', session_id, run_diarization_job,
+                args=(session_id,),
+                priority=PRIORITY_NORMAL,
+                subscriber=sid
+            )
+    except JobQueueFull as e:
+        print(f"⚠️ 화자 분리 거부: {e}")
         socketio.emit("diarization_result", {
             'session_id': session_id,
-            'result_text': "[오류] 이미 다른 화자 분리 작업이 실행 중입니다. 잠시 후 시도하세요."
+            'result_text': "[오류] 대기 중인 화자 분리 작업이 너무 많습니다. 잠시 후 시도하세요."
         })
         return
 
-    print(f"🔄 (화자 분리) 요청 수신... 대상 세션: {session_id}")
-
-    current_diarize_thread = threading.Thread(
-        target=run_diarization_thread,
-        args=(session_id,),
-        daemon=True
-    )
-    current_diarize_thread.start()
+    if not created:
+        print(f"ℹ️ (화자 분리) 같은 세션 작업이 이미 진행 중입니다. ({analysis_job.job_id})")
 
 
-# ⭐️ [신규] 화자 분리를 위한 스레드 함수
-def run_diarization_thread(session_id):
+# ⭐️ [수정] 화자 분리 작업 함수 (스케줄러 작업 스레드에서 실행)
+def run_diarization_job(job, session_id):
     """
-    (백그라운드 스레드)
     diarize_handler.py를 실행하고, 완료되면 결과를 클라이언트에 전송합니다.
+    ⭐️ [수정] DIARIZE_USE_PROCESS이면 작업 프로세스에서 실행하고 진행 상황을 전달받아 전송합니다.
+    (작업이 취소되면 작업 프로세스를 종료해서 분석을 즉시 중단)
     """
-    global current_diarize_thread
+    def on_progress(progress):
+        socketio.emit("diarization_progress", {'session_id': session_id, 'job_id': job.job_id, **progress})
 
     try:
-        result_text = diarize_handler.run_diarization(session_id)
-
+        # 캐시는 요청 시점에 이미 확인했으므로 바로 분석
+        if diarize_pool is not None:
+            result = diarize_pool.run(session_id, use_cache=False, progress_callback=on_progress,
+                                      cancel_event=job.cancel_event)
+        else:
+            result = diarize_handler.run_diarization(
+                session_id, use_cache=False,
+                progress_callback=lambda phase, **fields: on_progress({'phase': phase, **fields}),
+                return_stats=True
+            )
+        if job.cancelled or result is None:
+            print(f"ℹ️ (화자 분리) 취소된 작업의 결과는 전송하지 않습니다. 세션: {session_id}")
+            return None
+
+        result_text, stats = result
         print(f"✅ (화자 분리) 완료. 세션: {session_id}")
 
         socketio.emit("diarization_result", {
             'session_id': session_id,
-            'result_text': result_text
+            'result_text': result_text,
+            'stored': stats['stored']  # False면 다음 요청 때 다시 분석 (번역 실패 포함 등)
         })
 
     except Exception as e:
-        print(f"❌ (화자 분리) 스레드 오류: {e}")
+        print(f"❌ (화자 분리) 작업 오류: {e}")
         socketio.emit("diarization_result", {
             'session_id': session_id,
             'result_text': f"[오류] 화자 분리 중 심각한 오류 발생: {e}"
         })
-    finally:
-        current_diarize_thread = None
+        raise
 
 
-# --- ⭐️ [신규] 오디오 세션 중지 함수 ---
-def stop_audio_session(notify_client=True):
-    global current_audio_thread, current_stop_event
-
-    stopped_successfully = False
-    if current_stop_event is not None and current_audio_thread is not None:
-        print("🔄 [Session] 'stop_event' 전송. 스레드 중지 시도...")
-        current_stop_event.set()
+# --- ⭐️ [수정] 오디오 세션 스레드 (세션이 끝나면 완료 이벤트 전송) ---
+def run_audio_session(session_id, stop_event):
+    """
+    실시간 번역 스레드 본체. 남은 발화 처리(파이프라인 종료)까지 끝나면 session_stopped를 보내고,
+    그 사이 새 세션 시작 요청이 있었으면 이어서 시작합니다. (Socket.IO 핸들러는 종료를 기다리지 않음)
+    """
+    global current_audio_thread, current_stop_event, current_audio_session_id, pending_session_id
+    try:
+        main_audio_streaming(session_id, socketio, stop_event)
+    except Exception as e:
+        print(f"❌ [Session] 오디오 스레드 오류: {e}")
+    finally:
+        with session_lock:
+            current_audio_thread = None
+            current_stop_event = None
+            current_audio_session_id = None
+            next_session_id, pending_session_id = pending_session_id, None
+        print(f"✅ [Session] 세션 '{session_id}' 스레드 중지 완료.")
+
+        if next_session_id is not None:
+            start_new_audio_session(next_session_id)
+        else:
+            socketio.emit("session_stopped", {
+                'session_id': session_id,
+                'message': '세션이 중지되었습니다. 새로 시작할 수 있습니다.'
+            })
 
-        print("🔄 [Session] 오디오 백로그 큐 비우는 중...")
-        while not audio_q.empty():
-            try:
-                audio_q.get_nowait()
-            except queue.Empty:
-                break
-        print("✅ [Session] 큐 비우기 완료.")
 
-        current_audio_thread.join(timeout=2.0)
+# --- ⭐️ [신규] 오디오 세션 중지 함수 ---
+def stop_audio_session():
+    """
+    ⭐️ [수정] 중지 신호만 보내고 바로 반환합니다. (중지 요청을 보냈으면 True)
+    남은 발화 처리가 끝나면 오디오 스레드가 session_stopped를 보냅니다.
+    """
+    with session_lock:
+        stop_event = current_stop_event
+        session_id = current_audio_session_id
 
-        if not current_audio_thread.is_alive():
-            print("✅ [Session] 스레드 중지 완료.")
-            stopped_successfully = True
-        else:
-            print("⚠️ [Session] 스레드가 2초 내에 종료되지 않았습니다.")
-    else:
+    if stop_event is None:
         print("ℹ️ [Session] 중지할 활성 스레드가 없습니다.")
-        stopped_successfully = True  # 중지할 것이 없어도 성공으로 간주
+        socketio.emit("session_stopped", {'message': '세션이 중지되었습니다. 새로 시작할 수 있습니다.'})
+        return False
 
-    current_audio_thread = None
-    current_stop_event = None
+    print("🔄 [Session] 'stop_event' 전송. 스레드 중지 시도...")
+    stop_event.set()
 
-    if notify_client:
-        socketio.emit("session_stopped", {
-            'message': '세션이 중지되었습니다. 새로 시작할 수 있습니다.'
-        })
-    return stopped_successfully
+    print("🔄 [Session] 오디오 백로그 큐 비우는 중...")
+    while not audio_q.empty():
+        try:
+            audio_q.get_nowait()
+        except queue.Empty:
+            break
+    print("✅ [Session] 큐 비우기 완료.")
+
+    socketio.emit("session_stopping", {
+        'session_id': session_id,
+        'message': '남은 발화를 처리한 뒤 세션을 중지합니다...'
+    })
+    return True
 
 
 # --- ⭐️ [수정] Whisper 세션 시작/재시작 함수 ---
 def start_new_audio_session(session_id):
-    global current_audio_thread, current_stop_event
+    global current_audio_thread, current_stop_event, current_audio_session_id, pending_session_id
+
+    with session_lock:
+        previous_running = current_audio_thread is not None
+        if previous_running:
+            # ⭐️ [수정] 이전 세션이 남은 발화를 처리 중이면 기다리지 않고, 정리가 끝난 뒤 시작하도록 예약
+            pending_session_id = session_id
+        else:
+            current_stop_event = threading.Event()
+            current_audio_session_id = session_id
+            audio_thread = threading.Thread(
+                target=run_audio_session,
+                args=(session_id, current_stop_event),
+                daemon=True
+            )
+            current_audio_thread = audio_thread
+
+    if previous_running:
+        print(f"🔄 [Session] 이전 세션 정리 후 '{session_id}' 세션을 시작합니다.")
+        stop_audio_session()
+        return
 
-    stop_audio_session(notify_client=False)
-    current_stop_event = threading.Event()
+    # ⭐️ [신규] 세션 메타데이터 등록 (첫 문장 전에도 목록에 표시)
+    register_session(session_id, os.path.join("wav", f"{session_id}.wav"))
 
     print(f"\n🎬 [새 세션 시작] 세션 ID: {session_id}\n")
 
-    current_audio_thread = threading.Thread(
-        target=main_audio_streaming,
-        args=(session_id, socketio, current_stop_event),
-        daemon=True
-    )
-    current_audio_thread.start()
+    audio_thread.start()
     print("🎤 Whisper 실시간 음성 인식 스레드 시작됨 ✅")
 
     socketio.emit("new_session_started", {
@@ -366,11 +745,8 @@ def start_new_audio_session(session_id):
 
     # ⭐️ [신규] 5. 모든 클라이언트의 세션 드롭다운 목록을 갱신
     try:
-        all_sessions = get_all_session_ids()
-        socketio.emit("session_list_updated", {
-            'all_sessions': all_sessions,
-            'latest_session': session_id  # 방금 시작한 세션을 선택
-        })
+        # 방금 시작한 세션을 선택
+        socketio.emit("session_list_updated", build_session_list_payload(latest_session=session_id))
         print(f"✅ 세션 목록 갱신 완료. (새 세션: {session_id})")
     except Exception as e:
         print(f"⚠️ 세션 목록 갱신 중 오류: {e}")
@@ -395,4 +771,10 @@ if __name__ == "__main__":
     print("✅ (준비 완료) 클라이언트의 '번역 시작' 요청을 대기합니다...")
 
     # Socket.IO 서버 실행 (메인 스레드)
-    socketio.run(app, host=HOST, port=PORT, debug=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    try:
+        socketio.run(app, host=HOST, port=PORT, debug=False, allow_unsafe_werkzeug=True)
+    finally:
+        job_scheduler.shutdown(timeout=2.0)  # ⭐️ [신규] 대기 중인 작업 취소
+        if diarize_pool is not None:
+            diarize_pool.close(timeout=5.0)  # ⭐️ [신규] 화자 분리 작업 프로세스 종료
+        close_all_connections()  # ⭐️ [신규] 스레드별 DB 연결 정리
\ No newline at end of file
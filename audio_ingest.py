@@ -0,0 +1,126 @@
+import os
+import math
+from fractions import Fraction
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from config import RATE, AUDIO_INGEST_BLOCK_SEC, AUDIO_INGEST_CACHE_SUFFIX
+
+# ============================================
+# 📥 오디오 입력 정규화 (16kHz / 모노 / int16)
+# ============================================
+# - 다른 장치에서 가져온 녹음(44.1kHz, 48kHz, 스테레오 등)을 분석 모델 입력 형식으로 변환
+# - 블록 단위로 읽어서 채널 평균(downmix) + 폴리페이즈 리샘플링 → 긴 파일도 메모리 사용량 일정
+# - 변환 결과는 원본 옆에 '<이름>.16k.wav'로 저장해 두고, 원본이 바뀌지 않았으면 재사용
+
+
+def is_normalized(info, target_sr=RATE):
+    """이미 16kHz 모노 int16 PCM WAV인지 (변환 없이 바로 사용 가능)"""
+    return (info.samplerate == target_sr and info.channels == 1
+            and info.format == 'WAV' and info.subtype == 'PCM_16')
+
+
+def normalized_path(path):
+    stem, _ = os.path.splitext(path)
+    return stem + AUDIO_INGEST_CACHE_SUFFIX
+
+
+def _resample_ratio(source_sr, target_sr):
+    ratio = Fraction(target_sr, source_sr)  # 44100 → 16000 : 160/441
+    return ratio.numerator, ratio.denominator
+
+
+def resample_stream(blocks, source_sr, target_sr=RATE):
+    """
+    float32 모노 블록들을 받아 target_sr로 리샘플링한 블록들을 내보내는 제너레이터.
+    블록 경계에서 필터가 끊기지 않도록 앞뒤 문맥(context)을 붙여 변환한 뒤 잘라냅니다.
+    (전체를 한 번에 resample_poly 한 결과와 같음)
+    """
+    up, down = _resample_ratio(source_sr, target_sr)
+    if up == down:
+        yield from blocks
+        return
+
+    # resample_poly 기본 필터 길이(입력 기준 약 10 * max(up, down) / up 샘플)보다 충분히 긴 문맥,
+    # down의 배수로 맞춰야 출력 샘플 위치가 정수로 떨어짐
+    context = down * max(1, math.ceil(max(1024, 20 * max(up, down) // up) / down))
+
+    pending = np.zeros(0, dtype=np.float32)  # 아직 변환하지 않은 입력 (앞쪽 context 포함)
+    left = 0  # pending 앞부분 중 이미 변환된 문맥 샘플 수
+    for block in blocks:
+        pending = np.concatenate([pending, block])
+        # 오른쪽 문맥을 남기고, down의 배수 길이만큼만 변환
+        ready = (len(pending) - left - context) // down * down
+        if ready <= 0:
+            continue
+        segment = pending[:left + ready + context]
+        out = resample_poly(segment, up, down)
+        start = left * up // down
+        yield out[start:start + ready * up // down].astype(np.float32, copy=False)
+        # 다음 변환의 왼쪽 문맥으로 최대 context개만 남김 (파일 시작 부분은 더 짧을 수 있음)
+        keep_from = max(0, left + ready - context)
+        pending = pending[keep_from:]
+        left = left + ready - keep_from
+
+    if len(pending) > left:
+        out = resample_poly(pending, up, down)
+        start = left * up // down
+        total = math.ceil((len(pending) - left) * up / down)
+        yield out[start:start + total].astype(np.float32, copy=False)
+
+
+def _read_mono_blocks(source, block_frames):
+    """soundfile로 블록 단위 읽기 + 채널 평균 (float32)"""
+    while True:
+        block = source.read(block_frames, dtype='float32', always_2d=True)
+        if not len(block):
+            break
+        yield block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+
+
+def normalize_audio_file(path, output_path=None, target_sr=RATE, block_sec=AUDIO_INGEST_BLOCK_SEC):
+    """path를 target_sr 모노 int16 WAV로 변환해 output_path에 저장하고 그 경로를 반환합니다."""
+    output_path = output_path or normalized_path(path)
+    tmp_path = output_path + ".tmp"
+    with sf.SoundFile(path) as source:
+        print(f"🔄 (오디오 정규화) {path}: {source.samplerate}Hz, {source.channels}채널 → "
+              f"{target_sr}Hz 모노 ({source.frames / source.samplerate:.1f}초)")
+        block_frames = max(1, int(block_sec * source.samplerate))
+        blocks = resample_stream(_read_mono_blocks(source, block_frames), source.samplerate, target_sr)
+        try:
+            with sf.SoundFile(tmp_path, mode='w', samplerate=target_sr, channels=1,
+                              subtype='PCM_16', format='WAV') as output:
+                for block in blocks:
+                    output.write(np.clip(block, -1.0, 1.0))
+            os.replace(tmp_path, output_path)  # 완성된 파일만 캐시로 보이도록
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return output_path
+
+
+def get_normalized_audio(path, target_sr=RATE):
+    """
+    분석에 사용할 16kHz 모노 int16 WAV 경로를 반환합니다.
+    - 원본이 이미 그 형식이면 원본 그대로
+    - 원본보다 새로운 변환 캐시가 있으면 캐시
+    - 그 외에는 변환 후 캐시 생성
+    """
+    if is_normalized(sf.info(path), target_sr):
+        return path
+
+    cache_path = normalized_path(path)
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        print(f"✅ (오디오 정규화) 캐시 사용: {cache_path}")
+        return cache_path
+    return normalize_audio_file(path, cache_path, target_sr)
+
+
+def remove_normalized_audio(path):
+    """원본과 함께 변환 캐시도 삭제합니다. (세션 삭제 시)"""
+    cache_path = normalized_path(path)
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+        print(f"✅ 정규화 오디오 캐시 삭제 완료: {cache_path}")
@@ -36,18 +36,26 @@ import time
 # import webrtcvad # ❌ (제거)
 import torch  # ⭐️ [추가] Silero VAD에 필요
 from faster_whisper import WhisperModel
-from deep_translator import GoogleTranslator
 from datetime import datetime, timezone, timedelta
 import traceback
 import noisereduce as nr
 import wave
 
 import config
-from db_handler import insert_transcript
+from db_handler import enqueue_transcript, flush_transcripts, update_session_audio, close_connection
+from translation_service import get_translation_service
+from stream_pipeline import PipelineStage, StreamingPipeline, StageStats, POLICY_BLOCK
+from speaker_tracker import OnlineSpeakerTracker
+from audio_segmenter import UtteranceSegmenter  # ⭐️ [신규] 링 버퍼 + VAD 발화 분할 (모델 없이 테스트 가능)
 from config import (
     MODEL_TYPE, LANGUAGE, TARGET_LANG,
     BEAM_SIZE, INPUT_DEVICE_INDEX, FRAME_SIZE,
-    VAD_THRESHOLD, RATE, CHUNK_DURATION_SEC, CHUNK_SIZE
+    VAD_THRESHOLD, RATE, CHUNK_DURATION_SEC, CHUNK_SIZE,
+    WHISPER_VAD_FILTER,
+    AUDIO_QUEUE_MAXSIZE, STT_QUEUE_MAXSIZE, STT_QUEUE_POLICY,
+    TRANSLATE_QUEUE_MAXSIZE, TRANSLATE_QUEUE_POLICY,
+    PERSIST_QUEUE_MAXSIZE, PERSIST_QUEUE_POLICY, PIPELINE_STOP_TIMEOUT_SEC,
+    LIVE_SPEAKER_ENABLED, SPEAKER_QUEUE_MAXSIZE, SPEAKER_SKIP_BACKLOG
 )
 
 print(f"🎧 Whisper 모델({MODEL_TYPE}) 로드 중...")
@@ -74,7 +82,11 @@ except Exception as e:
     vad_model = None
 
 # ❌ (제거) vad = webrtcvad.Vad(VAD_MODE)
-audio_q = queue.Queue()
+# ⭐️ [수정] 크기 제한 큐 (가득 차면 오디오 콜백에서 가장 오래된 블록을 버림)
+audio_q = queue.Queue(maxsize=AUDIO_QUEUE_MAXSIZE)
+capture_stats = StageStats("capture")
+segment_stats = StageStats("segment")
+last_pipeline_stats = []  # 마지막 세션의 단계별 지연 통계
 
 
 # --- 번역 ---
@@ -87,7 +99,8 @@ def translate_text_local(text, target_lang=TARGET_LANG):
         return ""
 
     try:
-        return GoogleTranslator(source='auto', target=target_lang).translate(text)
+        # ⭐️ [수정] 공용 번역 서비스 사용 (클라이언트 재사용 + LRU 캐시 + 묶음 요청)
+        return get_translation_service().translate(text, target_lang)
     except Exception as e:
         print(f"⚠️ 번역 실패: {e}")
         return ""
@@ -107,53 +120,22 @@ def is_sentence_complete(text):
     return text.endswith(endings)
 
 
-# ⭐️ [신규] Silero VAD용 헬퍼 함수 (버그 수정)
-def is_chunk_speech(data_chunk, vad_model, rate=RATE, frame_size=FRAME_SIZE, threshold=VAD_THRESHOLD):
-    """
-    긴 오디오 청크(data_chunk)를 VAD_FRAME_SIZE(512) 샘플 크기로 나누어
-    하나라도 음성으로 감지되면 True를 반환합니다.
-    """
-    if not vad_model:
-        print("⚠️ VAD 모델이 없어 음성으로 간주합니다.")
-        return True  # VAD 모델 로드 실패 시 무조건 음성으로 처리
-
-    # data_chunk는 (N, 1) 형태일 수 있으므로 flatten()
-    data_flat = data_chunk.flatten()
-
-    # 512 샘플(VAD_FRAME_SIZE) 단위로 반복
-    for i in range(0, len(data_flat), frame_size):
-        frame = data_flat[i: i + frame_size]
-
-        # ⭐️ (중요) 마지막 프레임이 512보다 작으면 VAD가 오류를 일으킴
-        if len(frame) < frame_size:
-            continue
-
-        # 1. int16 numpy -> float32 tensor
-        audio_float32_tensor = torch.from_numpy(frame.astype(np.float32) / 32768.0)
-
-        # 2. VAD 모델 실행 (음성 확률 반환)
-        try:
-            # ⭐️ .item()은 tensor(0.xx) -> 0.xx (float)로 변환
-            speech_prob = vad_model(audio_float32_tensor, rate).item()
-
-            # 3. 임계값과 비교
-            if speech_prob >= threshold:
-                return True  # 음성 감지됨
-        except Exception as e:
-            # CHUNK_SIZE가 512의 배수가 아닌 경우 등 예외 처리
-            # print(f"VAD 프레임 처리 오류 (무시): {e}")
-            pass
-
-            # 루프가 끝날 때까지 음성이 감지되지 않음
-    return False
-
-
 # --- 오디오 콜백 ---
 def audio_callback(indata, frames, time_, status):
     if status:
         print(f"[Audio status] {status}")
     try:
-        audio_q.put(indata.copy())
+        block = indata.copy()
+        try:
+            audio_q.put_nowait(block)
+        except queue.Full:
+            # ⭐️ 콜백은 절대 블록되면 안 되므로 가장 오래된 블록을 버리고 넣음
+            try:
+                audio_q.get_nowait()
+                capture_stats.record_drop()
+            except queue.Empty:
+                pass
+            audio_q.put_nowait(block)
     except Exception:
         traceback.print_exc()
 
@@ -161,8 +143,141 @@ def audio_callback(indata, frames, time_, status):
 # --- ❌ (제거) 'is_speech_chunk' (webrtcvad) ---
 
 
+# ⭐️ [신규] 발화 1개 인식 (노이즈 제거 + 정규화 + Whisper)
+def transcribe_utterance(audio_int16, offset_sec=0.0):
+    """
+    int16 발화 오디오를 Whisper로 인식합니다.
+    반환: (텍스트, 세그먼트 목록 [{start, end, text}]) - 세그먼트 시간은 offset_sec를 더한 WAV 기준 초
+    """
+    # 🔉 노이즈 제거
+    reduced = nr.reduce_noise(y=audio_int16.reshape(-1), sr=RATE)
+
+    # ⭐️ 0으로 나누기 오류(RuntimeWarning) 방지
+    max_val = np.max(np.abs(reduced))
+    if max_val > 0:
+        normalized_audio = reduced / max_val
+    else:
+        normalized_audio = reduced  # 완전한 무음 (이미 0으로 채워진 배열)
+
+    audio_float32 = np.int16(normalized_audio * 32767).astype(np.float32) / 32768.0
+
+    # 🧠 Whisper 인식
+    segments, _ = model.transcribe(
+        audio_float32,
+        language=config.LANGUAGE,
+        beam_size=BEAM_SIZE,
+        # --- ⭐️ 환각(쓰레기값) 억제 옵션 ---
+        vad_filter=WHISPER_VAD_FILTER,  # 발화 단위로 이미 잘랐으므로 기본 비활성화
+        no_speech_threshold=0.4,  # 이 값 이하의 '음성 확률'은 무시
+        log_prob_threshold=-1.0,  # 신뢰도가 너무 낮은 토큰(단어)을 억제
+        condition_on_previous_text=False  # 이전 텍스트에 덜 의존하여 반복 환각을 줄임
+    )
+    results = [{
+        'start': round(offset_sec + seg.start, 3),
+        'end': round(offset_sec + seg.end, 3),
+        'text': seg.text.strip()
+    } for seg in segments if seg.text.strip()]
+    return " ".join(seg['text'] for seg in results), results
+
+
+# ⭐️ [신규] 파이프라인 단계 ((화자 구분) → STT → 번역 → 전송/저장)
+def make_speaker_handler(tracker, backlog=lambda: 0, skip_backlog=SPEAKER_SKIP_BACKLOG):
+    """
+    발화에 실시간 화자 라벨을 붙입니다. (audio, reason, start_sec) → (audio, reason, start_sec, speaker)
+    backlog(): 이 단계에 대기 중인 발화 수 - skip_backlog 이상이면 임베딩 없이 speaker=None으로 넘김
+    """
+    state = {'skipped': 0}
+
+    def label_utterance(utterance):
+        if skip_backlog and backlog() >= skip_backlog:
+            state['skipped'] += 1
+            if state['skipped'] == 1 or state['skipped'] % 10 == 0:
+                print(f"⚠️ (실시간 화자 구분) 처리 지연으로 화자 구분 생략 (누적 {state['skipped']}개 발화)")
+            return [utterance + (None,)]
+        return [utterance + (tracker.assign(utterance[0]),)]
+
+    return label_utterance
+
+
+def make_stt_handler(session_id):
+    """발화 1개를 인식하고, 문장이 끝났으면 다음 단계(번역)로 넘길 항목을 반환합니다."""
+    state = {'sentence_buffer': "", 'speaker_samples': {}, 'segments': []}
+    kst = timezone(timedelta(hours=9))
+
+    def finish_sentence():
+        sentence = state['sentence_buffer'].strip()
+        speaker_samples = state['speaker_samples']
+        segments = state['segments']
+        state['sentence_buffer'] = ""
+        state['speaker_samples'] = {}
+        state['segments'] = []
+        if not sentence:
+            return []
+        # 여러 발화가 이어진 문장은 가장 오래 말한 화자로 표시
+        speaker = max(speaker_samples, key=speaker_samples.get) if speaker_samples else None
+        return [{
+            'session_id': session_id,
+            'original': sentence,
+            'speaker': speaker,
+            'segments': segments,  # WAV 기준 Whisper 세그먼트 (화자 분리에서 재사용)
+            'time': datetime.now(kst).strftime("%H:%M:%S")
+        }]
+
+    def handle_utterance(utterance):
+        audio_int16, reason, start_sec = utterance[:3]
+        speaker = utterance[3] if len(utterance) > 3 else None
+
+        results = []
+        if speaker is not None and state['sentence_buffer'] and speaker not in state['speaker_samples']:
+            # 화자가 바뀌면 이어 붙이던 문장을 먼저 완성 (다른 사람의 말과 섞이지 않도록)
+            results += finish_sentence()
+
+        text, segments = transcribe_utterance(audio_int16, start_sec)
+        if text:
+            state['sentence_buffer'] += " " + text
+            state['segments'] += segments
+            if speaker is not None:
+                state['speaker_samples'][speaker] = state['speaker_samples'].get(speaker, 0) + len(audio_int16)
+            print(f"🧩 발화 인식 ({len(audio_int16) / RATE:.1f}초, {reason}"
+                  f"{', ' + speaker if speaker else ''}): {text}")
+
+        sentence = state['sentence_buffer'].strip()
+        # 무음으로 끝난 발화 또는 종결어미로 끝난 문장이면 완성으로 간주
+        # (길이 제한으로 잘린 발화는 다음 발화와 이어 붙임)
+        if sentence and not (reason == "max_length" and not is_sentence_complete(sentence)):
+            results += finish_sentence()
+        return results or None
+
+    return handle_utterance
+
+
+def translate_sentence(item):
+    item['translated'] = translate_text_local(item['original'], target_lang=config.TARGET_LANG)
+    print(f"✅ 완성 문장: {item['original']}")
+    print(f"🌐 번역 결과: {item['translated']}\n")
+    return [item]
+
+
+def make_persist_handler(socketio):
+    def emit_and_persist(item):
+        socketio.emit('partial_translation', {
+            'original': item['original'],
+            'translated': item['translated'],
+            'speaker': item.get('speaker'),  # ⭐️ 실시간 화자 구분 (비활성화 시 None)
+            'time': item['time'],
+            'session_id': item['session_id']
+        })
+        # ⭐️ [수정] 행마다 커밋하지 않고 쓰기 큐에 넣음 (백그라운드에서 일괄 기록)
+        enqueue_transcript(item['session_id'], item['original'], item['translated'], item.get('speaker'),
+                           item.get('segments'))
+        return None
+
+    return emit_and_persist
+
+
 # --- 메인 루프 ---
 def main_audio_streaming(session_id, socketio, stop_event=None):
+    global last_pipeline_stats
     print(f"🗂️ 세션 시작 (스트리밍 모드): {session_id}")
 
     # ⭐️ [신규] .wav 파일 쓰기 준비
@@ -173,6 +288,7 @@ def main_audio_streaming(session_id, socketio, stop_event=None):
 
     wave_file = None
     wave_file_name = os.path.join(output_dir, f"{session_id}.wav") # wav/session_id.wav
+    recorded_frames = 0  # 녹음된 샘플 수 (세션 길이 기록용)
     try:
         wave_file = wave.open(wave_file_name, 'wb')
         wave_file.setnchannels(1)  # 모노 (1 채널)
@@ -183,11 +299,27 @@ def main_audio_streaming(session_id, socketio, stop_event=None):
         print(f"⚠️ [오류] {wave_file_name} 파일 생성 실패: {e}")
         wave_file = None  # 파일 쓰기 비활성화
 
-    buffer = np.zeros((0, 1), dtype=np.int16)
-    sentence_buffer = ""
-    previous_text = ""
-    last_emit_time = time.time()
-    silence_counter = 0
+    # ⭐️ [수정] 고정 3초 청크 대신 VAD 기반 발화 단위로 분할
+    segmenter = UtteranceSegmenter(vad_model)
+
+    # ⭐️ [신규] STT / 번역 / 전송·저장을 별도 작업 스레드로 분리 (크기 제한 큐로 연결)
+    stages = []
+    speaker_tracker = None
+    if LIVE_SPEAKER_ENABLED:
+        # 화자 임베딩은 STT 앞 단계에서 계산 (발화마다 임베딩 시간만큼 STT 시작이 늦어짐)
+        # 밀리면 발화를 버리지 않고 화자 없이 넘김 (자막/세그먼트 유실 방지)
+        speaker_tracker = OnlineSpeakerTracker()
+        speaker_stage = PipelineStage("speaker", None, SPEAKER_QUEUE_MAXSIZE, POLICY_BLOCK)
+        speaker_stage.handler = make_speaker_handler(speaker_tracker, backlog=speaker_stage.qsize)
+        stages.append(speaker_stage)
+    pipeline = StreamingPipeline(stages + [
+        PipelineStage("stt", make_stt_handler(session_id), STT_QUEUE_MAXSIZE, STT_QUEUE_POLICY),
+        PipelineStage("translate", translate_sentence, TRANSLATE_QUEUE_MAXSIZE, TRANSLATE_QUEUE_POLICY),
+        PipelineStage("persist", make_persist_handler(socketio), PERSIST_QUEUE_MAXSIZE, PERSIST_QUEUE_POLICY),
+    ])
+    pipeline.start()
+    capture_stats.reset()
+    segment_stats.reset()
 
     try:
         with sd.InputStream(
@@ -203,121 +335,36 @@ def main_audio_streaming(session_id, socketio, stop_event=None):
             while True:
                 if stop_event is not None and stop_event.is_set():
                     print("🛑 stop_event 수신: 종료합니다.")
+                    # 말하는 도중 종료된 마지막 발화도 처리
+                    for utterance in segmenter.flush():
+                        pipeline.put(utterance)
                     break
 
-                if not audio_q.empty():
-                    block = audio_q.get()
-                    # ⭐️ [신규] 1. 오디오 조각을 .wav 파일에 저장
-                    if wave_file:
-                        try:
-                            wave_file.writeframes(block.tobytes())
-                        except Exception as e:
-                            print(f"⚠️ [오류] {wave_file_name} 파일 쓰기 중단: {e}")
-                            wave_file.close()  # 오류 발생 시 파일 닫기
-                            wave_file = None  # 더 이상 쓰지 않음
-
-                    buffer = np.concatenate((buffer, block), axis=0)
-
-                    if len(buffer) >= CHUNK_SIZE:
-                        data_chunk = buffer[:CHUNK_SIZE]
-                        buffer = buffer[CHUNK_SIZE:]
-
-                        try:
-                            # 🔉 [수정] 음성 감지 (Silero VAD 헬퍼 함수 사용)
-                            # ⭐️ data_chunk(48000)를 헬퍼 함수로 전달
-                            if not is_chunk_speech(data_chunk, vad_model, RATE, FRAME_SIZE, VAD_THRESHOLD):
-                                # (무음으로 간주 - 기존 'if not is_speech_chunk' 로직)
-                                silence_counter += 1
-                                if silence_counter >= 2 and sentence_buffer.strip():
-                                    # ✅ 1.5초 이상 무음 → 문장 완료로 간주
-                                    kst = timezone(timedelta(hours=9))
-                                    now_time = datetime.now(kst).strftime("%H:%M:%S")
-
-                                    translated = translate_text_local(sentence_buffer, target_lang=config.TARGET_LANG)
-                                    print(f"✅ 완성 문장: {sentence_buffer}")
-                                    print(f"🌐 번역 결과: {translated}\n")
-
-                                    socketio.emit('partial_translation', {
-                                        'original': sentence_buffer.strip(),
-                                        'translated': translated,
-                                        'time': now_time,
-                                        'session_id': session_id
-                                    })
-
-                                    insert_transcript(session_id, sentence_buffer.strip(), translated)
-                                    sentence_buffer = ""
-                                    previous_text = ""
-                                    silence_counter = 0
-
-                                # ⭐️ (중요) 원본 로직과 동일하게, 음성이 아니면 번역/인식 스킵
-                                continue
-
-                            else:
-                                # (음성으로 간주 - 기존 'else' 블록)
-                                silence_counter = 0
-
-                                # 🔉 노이즈 제거
-                                reduced = nr.reduce_noise(y=data_chunk.flatten(), sr=RATE)
-
-                                # ⭐️ [수정] 0으로 나누기 오류(RuntimeWarning) 방지
-                                max_val = np.max(np.abs(reduced))
-
-                                if max_val > 0:
-                                    # 신호가 있을 때만 정규화
-                                    normalized_audio = reduced / max_val
-                                else:
-                                    # 완전한 무음인 경우 (max_val == 0)
-                                    normalized_audio = reduced  # (이미 0으로 채워진 배열)
-
-                                reduced_int16 = np.int16(normalized_audio * 32767)
-                                audio_float32 = reduced_int16.astype(np.float32) / 32768.0
-
-                            # 🧠 Whisper 인식 (무음이 아닐 때만 이쪽으로 넘어옴)
-                            segments, _ = model.transcribe(
-                                audio_float32,
-                                language=config.LANGUAGE,
-                                beam_size=BEAM_SIZE,
-                                # --- ⭐️ 환각(쓰레기값) 억제 옵션 추가 ---
-                                vad_filter=True,  # VAD 필터를 사용해 음성이 없는 세그먼트를 제거
-                                no_speech_threshold=0.4,  # 이 값 이하의 '음성 확률'은 무시
-                                log_prob_threshold=-1.0,  # 신뢰도가 너무 낮은 토큰(단어)을 억제
-                                condition_on_previous_text=False  # 이전 텍스트에 덜 의존하여 반복 환각을 줄임
-                            )
-                            partial_text = " ".join(seg.text.strip() for seg in segments if seg.text.strip())
-
-                            if partial_text and partial_text != previous_text:
-                                # ✅ 새로 추가된 부분만 추출
-                                new_part = partial_text.replace(previous_text, "").strip()
-                                if new_part:
-                                    sentence_buffer += " " + new_part
-                                    previous_text = partial_text
-                                    print(f"🧩 부분 인식 누적: {new_part}")
-
-                                # 종결어미 기반 문장 완성 감지
-                                if is_sentence_complete(sentence_buffer):
-                                    kst = timezone(timedelta(hours=9))
-                                    now_time = datetime.now(kst).strftime("%H:%M:%S")
-
-                                    translated = translate_text_local(sentence_buffer, target_lang=config.TARGET_LANG)
-                                    print(f"✅ 완성 문장: {sentence_buffer}")
-                                    print(f"🌐 번역 결과: {translated}\n")
-
-                                    socketio.emit('partial_translation', {
-                                        'original': sentence_buffer.strip(),
-                                        'translated': translated,
-                                        'time': now_time,
-                                        'session_id': session_id
-                                    })
-
-                                    insert_transcript(session_id, sentence_buffer.strip(), translated)
-                                    sentence_buffer = ""
-                                    previous_text = ""
-
-                        except Exception as e:
-                            print(f"⚠️ 스트리밍 처리 오류: {e}")
-                            traceback.print_exc()
-                else:
-                    time.sleep(0.01)
+                try:
+                    block = audio_q.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+
+                started_at = time.perf_counter()
+                # ⭐️ [신규] 1. 오디오 조각을 .wav 파일에 저장
+                if wave_file:
+                    try:
+                        wave_file.writeframes(block.tobytes())
+                        recorded_frames += len(block)
+                    except Exception as e:
+                        print(f"⚠️ [오류] {wave_file_name} 파일 쓰기 중단: {e}")
+                        wave_file.close()  # 오류 발생 시 파일 닫기
+                        wave_file = None  # 더 이상 쓰지 않음
+
+                # 2. VAD로 발화 경계 추적 → 완성된 발화만 STT 단계로 전달 (인식은 기다리지 않음)
+                try:
+                    for utterance in segmenter.feed(block):
+                        pipeline.put(utterance)
+                except Exception as e:
+                    segment_stats.record_error()
+                    print(f"⚠️ VAD 처리 오류: {e}")
+                    traceback.print_exc()
+                segment_stats.record(0.0, time.perf_counter() - started_at)
 
     except sd.PortAudioError as e:
         print("❌ 오디오 장치 오류:", e)
@@ -328,4 +375,23 @@ def main_audio_streaming(session_id, socketio, stop_event=None):
         # ⭐️ [신규] 세션이 끝나면 .wav 파일 닫기
         if wave_file:
             wave_file.close()
-            print(f"🌊 오디오 파일 저장 완료: {wave_file_name}")
\ No newline at end of file
+            print(f"🌊 오디오 파일 저장 완료: {wave_file_name}")
+        update_session_audio(session_id, wave_file_name, recorded_frames / RATE)
+
+        # ⭐️ [신규] 남은 발화/문장을 모두 처리한 뒤 파이프라인 종료
+        print("🔄 [Pipeline] 남은 작업 처리 후 종료 중...")
+        # (STT/번역 단계는 단계별 제한 시간을 넘기면 남은 항목을 버림, 마지막 전송/저장 단계는 끝까지 처리)
+        pipeline.stop(timeout_per_stage=PIPELINE_STOP_TIMEOUT_SEC)
+        flush_transcripts(timeout=5.0)  # 이 세션의 남은 행을 모두 DB에 기록
+        last_pipeline_stats = [capture_stats.snapshot(), segment_stats.snapshot()] + pipeline.stats()
+        for stats in last_pipeline_stats:
+            print(f"📊 [Pipeline:{stats['stage']}] {stats}")
+
+        # ⭐️ [신규] 버려진 항목(큐 초과/종료 시간 초과)이 있으면 클라이언트에 알림
+        dropped = {stats['stage']: stats['dropped'] for stats in last_pipeline_stats if stats['dropped']}
+        if dropped:
+            print(f"⚠️ [Pipeline] 이 세션에서 처리하지 못하고 버린 항목: {dropped}")
+            socketio.emit("pipeline_dropped", {'session_id': session_id, 'dropped': dropped})
+        if speaker_tracker is not None:
+            print(f"🗣️ (실시간 화자 구분) 화자별 발화 수: {speaker_tracker.stats()}")
+        close_connection()  # ⭐️ 세션 스레드의 DB 연결 정리
\ No newline at end of file
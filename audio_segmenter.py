@@ -0,0 +1,257 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from config import (
+    RATE, FRAME_SIZE, VAD_THRESHOLD,
+    SILENCE_TIMEOUT_MS, SPEECH_PAD_MS, MIN_SPEECH_MS, MAX_UTTERANCE_SEC, VAD_BATCH_FRAMES
+)
+
+# ============================================
+# ✂️ 링 버퍼 + VAD 기반 발화 분할 (audio_processor.py에서 분리)
+# ============================================
+# 모델 로드 없이 임포트할 수 있도록 분리 (Whisper/VAD 모델은 audio_processor.py에서 로드)
+# torch는 VAD 추론 시에만 필요하므로 함수 안에서 임포트
+
+
+# ⭐️ [신규] 고정 크기 int16 링 버퍼 (블록마다 np.concatenate 하지 않음)
+class AudioRingBuffer:
+    """
+    미리 할당한 int16 배열에 오디오 블록을 순환 기록합니다.
+    데이터를 두 번(미러) 기록해 두므로 어느 위치의 청크든 복사 없이 연속된 view로 꺼낼 수 있습니다.
+    (반환된 view는 다음 write()로 capacity만큼 덮어쓰기 전까지 유효)
+    """
+
+    def __init__(self, chunk_size, hop_size=None, capacity=None):
+        hop_size = hop_size or chunk_size  # 기본: 청크가 서로 겹치지 않음
+        if hop_size <= 0 or hop_size > chunk_size:
+            raise ValueError(f"hop_size({hop_size})는 1 이상, chunk_size({chunk_size}) 이하여야 합니다.")
+        self.chunk_size = chunk_size
+        self.hop_size = hop_size
+        self.capacity = capacity or chunk_size * 2  # 기본: 청크 2개 분량
+        if self.capacity < chunk_size:
+            raise ValueError("capacity는 chunk_size보다 작을 수 없습니다.")
+        self._data = np.zeros(self.capacity * 2, dtype=np.int16)
+        self._write_pos = 0  # 지금까지 기록된 총 샘플 수 (절대 위치)
+        self._read_pos = 0  # 다음 청크의 시작 (절대 위치)
+        self.dropped_samples = 0  # 용량 초과로 버려진 샘플 수
+
+    def __len__(self):
+        return self._write_pos - self._read_pos
+
+    def write(self, block):
+        """(N,) 또는 (N, 1) 형태의 int16 블록을 기록합니다."""
+        samples = block.reshape(-1)
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self.capacity:
+            # 블록 하나가 버퍼보다 크면 최신 샘플만 유지
+            # ⭐️ [수정] 블록 앞부분 + 기존 미처리 샘플을 한 번만 세고 버림 (아래 overflow에서 다시 세지 않도록)
+            skipped = n - self.capacity
+            self.dropped_samples += len(self) + skipped
+            self._write_pos += skipped
+            self._read_pos = self._write_pos
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        # 소비가 밀려 용량을 넘으면 가장 오래된 샘플부터 버림
+        overflow = len(self) + n - self.capacity
+        if overflow > 0:
+            self.dropped_samples += overflow
+            self._read_pos += overflow
+
+        pos = self._write_pos % self.capacity
+        first = min(n, self.capacity - pos)
+        self._data[pos:pos + first] = samples[:first]
+        self._data[pos + self.capacity:pos + self.capacity + first] = samples[:first]
+        rest = n - first
+        if rest:
+            self._data[:rest] = samples[first:]
+            self._data[self.capacity:self.capacity + rest] = samples[first:]
+        self._write_pos += n
+
+    def has_chunk(self):
+        return len(self) >= self.chunk_size
+
+    def read_chunk(self):
+        """chunk_size 길이의 view를 반환하고 읽기 위치를 hop_size만큼 이동합니다."""
+        if not self.has_chunk():
+            return None
+        start = self._read_pos % self.capacity
+        chunk = self._data[start:start + self.chunk_size]
+        self._read_pos += self.hop_size
+        return chunk
+
+    def clear(self):
+        self._write_pos = 0
+        self._read_pos = 0
+        self.dropped_samples = 0  # ⭐️ [수정] 재사용 시 이전 세션의 버린 샘플 수가 남지 않도록
+
+
+# ⭐️ [수정] Silero VAD 청크 헬퍼 (변환은 청크 전체 1회, 추론은 프레임 순서대로)
+def reset_vad_state(vad_model):
+    """Silero VAD의 RNN 상태를 초기화합니다. (세션 시작 시에만 호출)"""
+    if vad_model is not None and hasattr(vad_model, "reset_states"):
+        vad_model.reset_states()
+
+
+def get_chunk_speech_probs(data_chunk, vad_model, rate=RATE, frame_size=FRAME_SIZE):
+    """
+    오디오 청크를 frame_size(512) 단위 프레임으로 나누어 프레임별 음성 확률 배열(np.float32)을 반환합니다.
+    배치 추론이 아니라 프레임마다 모델을 한 번씩 호출하는 루프입니다.
+    Silero VAD는 상태를 가진 RNN이므로 프레임을 시간 순서대로 하나씩 넣고, 상태는 초기화하지 않습니다.
+    (이전 청크의 문맥이 다음 프레임 판단에 이어짐 - 초기화는 reset_vad_state로 세션 시작 시에만)
+    (마지막 자투리 프레임(< frame_size)은 VAD 오류를 막기 위해 제외)
+    """
+    # data_chunk는 (N, 1) 형태일 수 있으므로 reshape (view, 복사 없음)
+    data_flat = data_chunk.reshape(-1)
+    n_frames = len(data_flat) // frame_size
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    if not vad_model:
+        # VAD 모델 로드 실패 시 무조건 음성으로 처리
+        return np.ones(n_frames, dtype=np.float32)
+
+    import torch
+
+    # int16 numpy -> float32 -> (n_frames, frame_size)
+    # (청크 전체를 한 번에 변환해도 128ms당 약 10us 절약 수준 - 속도는 프레임별 모델 호출이 좌우)
+    frames = data_flat[:n_frames * frame_size].astype(np.float32)
+    frames *= 1.0 / 32768.0
+    frames_tensor = torch.from_numpy(frames.reshape(n_frames, frame_size))
+
+    probs = np.zeros(n_frames, dtype=np.float32)
+    with torch.no_grad():
+        for i in range(n_frames):
+            try:
+                probs[i] = vad_model(frames_tensor[i], rate).item()
+            except Exception as e:
+                print(f"⚠️ VAD 처리 중 오류: {e}")
+    return probs
+
+
+# ⭐️ [신규] VAD 기반 스트리밍 발화 분할기 (고정 3초 청크 대체)
+class UtteranceSegmenter:
+    """
+    Silero VAD 프레임 확률로 발화 시작/끝을 추적하여 가변 길이 발화(int16)를 잘라냅니다.
+    - 시작: 확률 >= threshold 프레임 (앞쪽 SPEECH_PAD_MS 만큼 포함)
+    - 끝: SILENCE_TIMEOUT_MS 이상 무음 (뒤쪽 SPEECH_PAD_MS 만큼만 남김)
+    - 최대 길이(MAX_UTTERANCE_SEC)를 넘으면 강제로 자름
+    feed()는 완성된 발화를 (audio_int16, reason, start_sec) 리스트로 반환합니다.
+    reason: "silence"(무음으로 종료), "max_length"(길이 제한), "flush"(세션 종료)
+    start_sec: 지금까지 feed()로 들어온 오디오(= 녹음 WAV) 기준 발화 시작 위치 (초)
+    """
+
+    def __init__(self, vad_model, rate=RATE, frame_size=FRAME_SIZE, threshold=VAD_THRESHOLD,
+                 silence_timeout_ms=SILENCE_TIMEOUT_MS, speech_pad_ms=SPEECH_PAD_MS,
+                 min_speech_ms=MIN_SPEECH_MS, max_utterance_sec=MAX_UTTERANCE_SEC,
+                 batch_frames=VAD_BATCH_FRAMES):
+        self.vad_model = vad_model
+        self.rate = rate
+        self.frame_size = frame_size
+        self.threshold = threshold
+        self.neg_threshold = max(threshold - 0.15, 0.01)  # 히스테리시스 (말끝 흔들림 방지)
+
+        frame_ms = 1000.0 * frame_size / rate
+        self.silence_frames = max(1, math.ceil(silence_timeout_ms / frame_ms))
+        self.pad_frames = math.ceil(speech_pad_ms / frame_ms)
+        self.min_speech_frames = max(1, math.ceil(min_speech_ms / frame_ms))
+        self.max_samples = max(int(max_utterance_sec * rate) // frame_size, 1) * frame_size
+
+        batch_size = frame_size * max(1, batch_frames)
+        self._vad_buffer = AudioRingBuffer(batch_size)
+        self._utterance = np.zeros(self.max_samples, dtype=np.int16)  # 발화 버퍼 (미리 할당)
+        self._length = 0
+        self._preroll = deque(maxlen=max(1, self.pad_frames))
+        self._position = 0  # 처리한 프레임의 누적 샘플 수
+        self._start_sample = 0  # 현재 발화의 시작 위치 (샘플)
+        self._reset()
+        # 세션(= 분할기) 시작 시에만 VAD 상태 초기화. 발화 사이에는 상태를 이어서 사용
+        reset_vad_state(vad_model)
+
+    def _reset(self):
+        self._length = 0
+        self._triggered = False
+        self._speech_frames = 0
+        self._silence_run = 0
+        self._silence_start = 0  # 뒤쪽 무음이 시작되는 발화 버퍼 위치 (마지막 비무음 프레임 끝, 샘플)
+
+    def _append(self, frame):
+        self._utterance[self._length:self._length + len(frame)] = frame
+        self._length += len(frame)
+
+    def _finish(self, reason):
+        utterance = None
+        if self._speech_frames >= self.min_speech_frames:
+            utterance = (self._utterance[:self._length].copy(), reason, self._start_sample / self.rate)
+        self._reset()
+        return utterance
+
+    def _process_frame(self, frame, prob):
+        frame_start = self._position
+        self._position += len(frame)
+        if not self._triggered:
+            if prob >= self.threshold:
+                self._triggered = True
+                self._start_sample = frame_start - len(self._preroll) * self.frame_size
+                for pre in self._preroll:
+                    self._append(pre)
+                self._preroll.clear()
+                self._append(frame)
+                self._speech_frames = 1
+                self._silence_start = self._length
+            else:
+                self._preroll.append(frame.copy())  # view는 덮어써지므로 복사
+            return None
+
+        self._append(frame)
+        if prob >= self.threshold:
+            self._speech_frames += 1
+            self._silence_run = 0
+        elif prob < self.neg_threshold:
+            self._silence_run += 1
+        # (neg_threshold ~ threshold 사이 히스테리시스 프레임은 무음 카운트를 늘리지도, 초기화하지도 않지만
+        #  음성일 수 있으므로 뒤쪽 무음 시작 위치는 그 뒤로 옮김)
+        if prob >= self.neg_threshold:
+            self._silence_start = self._length
+
+        if self._silence_run >= self.silence_frames:
+            # ⭐️ [수정] 뒤쪽 무음이 시작된 위치 + 패딩까지만 남김
+            # (무음 구간 중간에 히스테리시스 프레임이 섞여도 음성이 잘리지 않도록 프레임 수가 아닌 위치 기준으로 자름)
+            self._length = min(self._length, self._silence_start + self.pad_frames * self.frame_size)
+            return self._finish("silence")
+
+        if self._length + self.frame_size > self.max_samples:
+            return self._finish("max_length")
+        return None
+
+    def feed(self, block):
+        """
+        오디오 블록을 넣고, 완성된 발화 목록을 반환합니다.
+        VAD 상태는 분할기 생성(세션 시작) 이후 계속 이어지므로 매 읽기마다 문맥이 유지됩니다.
+        """
+        samples = block.reshape(-1)
+        step = self._vad_buffer.chunk_size
+        utterances = []
+        # 배치 크기씩 나누어 기록 (큰 블록이 들어와도 읽지 않은 샘플을 덮어쓰지 않도록)
+        for offset in range(0, len(samples), step):
+            self._vad_buffer.write(samples[offset:offset + step])
+            while self._vad_buffer.has_chunk():
+                batch = self._vad_buffer.read_chunk()
+                probs = get_chunk_speech_probs(batch, self.vad_model, self.rate, self.frame_size)
+                for i, prob in enumerate(probs):
+                    frame = batch[i * self.frame_size:(i + 1) * self.frame_size]
+                    utterance = self._process_frame(frame, prob)
+                    if utterance is not None:
+                        utterances.append(utterance)
+        return utterances
+
+    def flush(self):
+        """진행 중인 발화를 강제로 마무리합니다. (세션 종료 시)"""
+        if not self._triggered:
+            return []
+        utterance = self._finish("flush")
+        return [utterance] if utterance is not None else []
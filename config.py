@@ -14,16 +14,73 @@ BEAM_SIZE = 1
 LANGUAGE = "en"
 TARGET_LANG = "ko"
 
+# --- ⭐️ [신규] 번역 서비스 설정 ---
+# 번역 백엔드: "google"(GoogleTranslator), "stub"(오프라인용, 원문 그대로 반환)
+TRANSLATION_BACKEND = "google"
+# 번역 결과 LRU 캐시 최대 항목 수
+TRANSLATION_CACHE_SIZE = 5000
+# ⭐️ [신규] 캐시 크기 제한 (원문 + 번역문 글자 수 합계, 0이면 제한 없음) - 긴 문장이 많아도 메모리가 일정
+TRANSLATION_CACHE_MAX_CHARS = 1_000_000
+# 이 시간(ms) 동안 모인 요청을 한 번에 묶어서 번역
+TRANSLATION_BATCH_WINDOW_MS = 50
+TRANSLATION_MAX_BATCH_SIZE = 16
+TRANSLATION_MAX_BATCH_CHARS = 4500  # Google 번역 1회 요청 한도(5000자) 이하
+TRANSLATION_TIMEOUT_SEC = 10.0
+# 동시에 진행할 번역 요청 수 (작업 스레드 수)
+TRANSLATION_WORKERS = 4
+# (후처리) 실패한 문장 재시도 횟수
+TRANSLATION_RETRIES = 2
+
 # --- 데이터베이스 설정 ---
 DB_NAME = "translations.db"
+# 다른 스레드가 쓰는 중일 때 최대 대기 시간(초)
+DB_BUSY_TIMEOUT_SEC = 5.0
+# 연결별로 재사용할 컴파일된 SQL 문장 수
+DB_STATEMENT_CACHE_SIZE = 128
+# ⭐️ [신규] 트랜스크립트 일괄 기록 (이 개수가 모이거나 이 시간이 지나면 한 번에 기록)
+DB_WRITE_BATCH_SIZE = 20
+DB_WRITE_FLUSH_SEC = 1.0
+# ⭐️ [신규] 세션 기록 불러오기 시 한 번에 전송할 행 수
+DB_PAGE_SIZE = 200
+# ⭐️ [신규] 전문 검색 결과 최대 개수
+SEARCH_RESULT_LIMIT = 50
 
 # --- KoBART 요약 모델 ---
 KOBART_MODEL_NAME = "gogamza/kobart-summarization"
+# ⭐️ [신규] KoBART 추론 백엔드 (같은 summarize_text API 사용)
+# "torch"(기본 fp32), "torch_int8"(동적 int8 양자화, CPU 지연/메모리 감소),
+# "onnx"(ONNX Runtime, optimum[onnxruntime] 필요 - 없으면 torch로 대체)
+KOBART_BACKEND = "torch"
+# ONNX 변환 결과 저장 위치 (최초 1회 변환 후 재사용)
+KOBART_ONNX_DIR = "models/kobart-onnx"
+# 모델 로드 직후 fp32 결과와 비교 검사 실행 여부 (fp32 모델을 잠시 추가로 로드함)
+KOBART_PARITY_CHECK = False
+# fp32 대비 요약문 유사도(0~1)가 이보다 낮으면 (검사 오류 포함) 해당 백엔드 대신 fp32 torch 사용
+KOBART_PARITY_MIN_SIMILARITY = 0.8
+# ⭐️ [신규] 청크별 중간 요약을 DB(summary_cache 테이블)에 캐시하여 재요약 시 재사용
+SUMMARY_CACHE_ENABLED = True
+# ⭐️ [신규] Map 단계에서 한 번의 generate()로 함께 요약할 청크 수 (CPU 메모리에 맞게 조절)
+SUMMARY_BATCH_SIZE = 4
+# ⭐️ [신규] 계층형 Reduce: 한 번에 합칠 중간 요약의 최대 토큰 수 (모델 입력 1024 이하)
+SUMMARY_REDUCE_GROUP_TOKENS = 900
+# 같은 단계(레벨)의 배치들을 동시에 생성할 스레드 수
+# (CPU에서는 torch가 이미 여러 코어를 쓰므로 1~2 권장, 코어가 많으면 늘려도 됨)
+SUMMARY_PARALLEL_WORKERS = 1
 
 # --- 서버 설정 ---
 HOST = "0.0.0.0"
 PORT = 5000
 
+# --- ⭐️ [신규] 백그라운드 작업 스케줄러 (job_scheduler.py) ---
+# 종류별 동시 실행 작업 수 / 대기열 최대 크기 (가득 차면 새 요청 거절)
+SUMMARY_JOB_WORKERS = 1  # KoBART 생성은 CPU를 모두 사용하므로 1개씩
+SUMMARY_JOB_QUEUE_MAXSIZE = 8
+DIARIZE_JOB_WORKERS = 1
+DIARIZE_JOB_QUEUE_MAXSIZE = 4
+# 화자 분리 요청 시 저장된 결과 확인(필요하면 WAV 해시 계산)용 가벼운 작업
+DIARIZE_LOOKUP_JOB_WORKERS = 1
+DIARIZE_LOOKUP_JOB_QUEUE_MAXSIZE = 16
+
 # --- 오디오 입력 장치 ---
 # 특정 장치를 지정하지 않으면 자동 기본 입력 사용
 INPUT_DEVICE_INDEX = None
@@ -47,6 +104,18 @@ VAD_FRAME_SIZE = 512 # 512 샘플 (32ms)
 # 말이 끝났다고 판단할 무음 지속 시간(ms)
 SILENCE_TIMEOUT_MS = 700
 
+# ⭐️ [신규] 발화(utterance) 단위 분할 설정
+# 발화 앞뒤로 붙일 여유 구간(ms) (단어 앞/끝이 잘리지 않도록)
+SPEECH_PAD_MS = 200
+# 이보다 짧은 음성은 잡음으로 보고 버림(ms)
+MIN_SPEECH_MS = 250
+# 발화 최대 길이(초) - 넘으면 강제로 잘라서 Whisper로 전달
+MAX_UTTERANCE_SEC = 15.0
+# 링 버퍼에서 몇 프레임씩 꺼내 VAD를 돌릴지 (4 x 32ms = 128ms, 배치 추론이 아니라 프레임마다 순서대로 모델 호출)
+VAD_BATCH_FRAMES = 4
+# 발화 단위로 이미 잘라서 보내므로 Whisper 자체 VAD 필터는 기본 비활성화
+WHISPER_VAD_FILTER = False
+
 # --- 오디오 스트리밍 설정 ---
 RATE = 16000
 # ⭐️ [수정] FRAME_SIZE를 VAD_FRAME_SIZE로 교체
@@ -55,6 +124,21 @@ FRAME_SIZE = VAD_FRAME_SIZE
 CHUNK_DURATION_SEC = 3.0  # ✅ 청크 3초 단위로 변경
 CHUNK_SIZE = int(RATE * CHUNK_DURATION_SEC)
 
+# --- ⭐️ [신규] 단계별 파이프라인 큐 설정 ---
+# 캡처 → VAD/발화 분할 → STT → 번역 → 전송/저장 (단계마다 크기 제한 큐)
+# 정책: "block"(대기, 앞 단계로 역압), "drop_oldest"(오래된 것 버림), "drop_newest"(새 것 버림)
+AUDIO_QUEUE_MAXSIZE = 320  # 캡처 블록 큐 (512샘플 x 320 ≈ 10초), 가득 차면 오래된 블록부터 버림
+STT_QUEUE_MAXSIZE = 32
+# ⭐️ [수정] 완성된 발화는 버리지 않음 - Whisper가 밀리면 발화 분할이 기다리고 그동안 캡처 블록은 audio_q에 쌓임
+STT_QUEUE_POLICY = "block"
+TRANSLATE_QUEUE_MAXSIZE = 64
+TRANSLATE_QUEUE_POLICY = "block"
+PERSIST_QUEUE_MAXSIZE = 256
+PERSIST_QUEUE_POLICY = "block"
+# 세션 종료 시 단계마다 남은 발화/문장 처리를 기다리는 최대 시간(초) - 넘으면 그 단계의 남은 항목을 버리고 종료
+# (마지막 전송/저장 단계는 제한 없이 모두 처리, 끝나면 session_stopped 전송)
+PIPELINE_STOP_TIMEOUT_SEC = 20.0
+
 # ⚠️ [필수] Hugging Face 토큰 (https://huggingface.co/settings/tokens)
 # (보안을 위해 '' 안에 넣는 것보다 환경 변수 사용을 권장합니다. 아래 팁 참조)
 HF_TOKEN = "hf_your_token_here"
@@ -65,4 +149,45 @@ DIARIZE_COMPUTE_TYPE = "int8" # CPU에서 실행하기 위한 타입
 
 # 후처리에 사용할 Whisper 모델 (실시간 모델과 다르게 설정 가능)
 # (예: 실시간은 "tiny", 후처리는 "base" 또는 "small" 사용)
-DIARIZE_MODEL_TYPE = "tiny"
\ No newline at end of file
+DIARIZE_MODEL_TYPE = "tiny"
+
+# ⭐️ [신규] 긴 녹음은 창(window) 단위로 나누어 처리 (WAV는 메모리 매핑으로 필요한 구간만 읽음)
+# 창 길이 (초) - 1시간 녹음도 창 하나 크기(10분 ≈ 38MB float32)만 메모리에 올림
+DIARIZE_WINDOW_SEC = 600.0
+# 인접 창이 겹치는 길이 (초) - 경계에서 잘린 문장 복원 + 창 사이 화자 라벨 매칭에 사용
+DIARIZE_WINDOW_OVERLAP_SEC = 30.0
+
+# ⭐️ [신규] 오디오 입력 정규화 (audio_ingest.py)
+# 16kHz 모노가 아닌 녹음은 이 길이(초) 단위 블록으로 리샘플링해 '<이름>.16k.wav'로 캐시
+AUDIO_INGEST_BLOCK_SEC = 60.0
+AUDIO_INGEST_CACHE_SUFFIX = ".16k.wav"
+
+# ⭐️ [신규] 실시간 세션에서 저장한 Whisper 세그먼트를 화자 분리에 재사용 (STT 재실행 생략)
+DIARIZE_REUSE_LIVE_SEGMENTS = True
+# 세그먼트 사이 빈 구간이 이 길이(초) 이상이면 그 구간만 다시 인식 (누락된 발화 보완)
+DIARIZE_GAP_MIN_SEC = 2.0
+
+# ⭐️ [신규] 화자 분리 결과를 DB에 저장하고, WAV와 모델 설정이 그대로면 재분석 없이 사용
+DIARIZE_CACHE_ENABLED = True
+
+# ⭐️ [신규] 화자 분리를 별도 작업 프로세스에서 실행 (실시간 번역과 GIL/CPU 경쟁 방지 → 실시간 세션 중에도 분석 가능)
+# False: 기존처럼 서버 프로세스 안의 스레드에서 실행 (실시간 세션 중에는 분석 거부)
+DIARIZE_USE_PROCESS = True
+DIARIZE_PROCESS_THREADS = 2  # 작업 프로세스의 torch/BLAS 연산 스레드 수 (0: 라이브러리 기본값 = 전체 코어)
+DIARIZE_CPU_AFFINITY = []  # 작업 프로세스가 사용할 CPU 코어 번호 (예: [2, 3], 빈 목록: 제한 없음 / Linux 전용)
+DIARIZE_PROCESS_NICE = 10  # 작업 프로세스 우선순위 낮춤 (0: 그대로 / Windows 제외)
+
+# --- ⭐️ [신규] 실시간 화자 구분 (speaker_tracker.py) ---
+# 발화마다 화자 임베딩을 계산해 SPEAKER_00, SPEAKER_01... 라벨을 실시간으로 붙임 (CPU 사용량 증가)
+LIVE_SPEAKER_ENABLED = False
+LIVE_SPEAKER_EMBEDDING_MODEL = "pyannote/wespeaker-voxceleb-resnet34-LM"
+# 기존 화자 평균 임베딩과의 코사인 유사도가 이 값 이상이면 같은 화자로 판단 (낮출수록 화자 수 감소)
+LIVE_SPEAKER_SIMILARITY = 0.55
+# 이보다 짧은 발화는 임베딩이 불안정하므로 직전 화자로 간주
+LIVE_SPEAKER_MIN_SEC = 1.0
+# 최대 화자 수 (넘으면 가장 가까운 화자로 배정)
+LIVE_SPEAKER_MAX_SPEAKERS = 8
+SPEAKER_QUEUE_MAXSIZE = 32
+# 화자 단계 대기 발화가 이 개수 이상이면 임베딩을 건너뛰고 화자 없이(None) 바로 STT로 넘김
+# (발화는 버리지 않음 - 자막/세그먼트 유실 방지)
+SPEAKER_SKIP_BACKLOG = 4
@@ -0,0 +1,2 @@
+# test_summary.py는 KoBART 모델과 DB 데이터가 필요한 수동 실행 스크립트 (python test_summary.py)
+collect_ignore = ["test_summary.py"]
@@ -1,57 +1,437 @@
 import sqlite3
+import threading
+import queue
+import time
 from datetime import datetime, timezone, timedelta
-from config import DB_NAME
+from config import DB_NAME, DB_BUSY_TIMEOUT_SEC, DB_STATEMENT_CACHE_SIZE, DB_WRITE_BATCH_SIZE, DB_WRITE_FLUSH_SEC, \
+    DB_PAGE_SIZE, SEARCH_RESULT_LIMIT
+
+
+# ⭐️ [신규] 스레드별 영구 연결 관리 (매 호출마다 connect/close 하지 않음)
+_local = threading.local()
+_connections = {}  # 스레드 -> 연결 (close_all_connections() / 종료된 스레드 연결 정리용)
+_connections_lock = threading.Lock()
+
+# ⭐️ 자주 쓰는 SQL은 상수로 고정 (sqlite3가 연결별로 컴파일된 문장을 캐시해서 재사용)
+SQL_INSERT_TRANSCRIPT = ("INSERT INTO transcripts (session_id, timestamp, original_text, translated_text, speaker, "
+                         "start_sec, end_sec) VALUES (?, ?, ?, ?, ?, ?, ?)")
+SQL_INSERT_LIVE_SEGMENT = "INSERT INTO live_segments (session_id, start_sec, end_sec, text) VALUES (?, ?, ?, ?)"
+SQL_INSERT_DIARIZATION_TURN = ("INSERT INTO diarization_turns (session_id, seq, start_sec, end_sec, speaker, text, "
+                               "translation) VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+
+def get_connection():
+    """
+    현재 스레드 전용 SQLite 연결을 반환합니다. (최초 1회 생성 후 재사용)
+    WAL 모드 + synchronous=NORMAL로 오디오 스레드 쓰기와 요약/화자 분리 스레드 읽기가 서로 막지 않습니다.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(
+            DB_NAME,
+            check_same_thread=False,
+            timeout=DB_BUSY_TIMEOUT_SEC,
+            cached_statements=DB_STATEMENT_CACHE_SIZE
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+        with _connections_lock:
+            _prune_dead_connections()
+            _connections[threading.current_thread()] = conn
+    return conn
+
+
+def _prune_dead_connections():
+    """
+    이미 종료된 스레드(세션별 파이프라인 단계, Socket.IO 작업 등)가 남긴 연결을 닫습니다.
+    (_connections_lock 안에서 호출 - 새 연결을 만들 때마다 정리하므로 목록이 계속 늘어나지 않음)
+    """
+    for thread in [t for t in _connections if not t.is_alive()]:
+        try:
+            _connections.pop(thread).close()
+        except Exception:
+            pass
+
+
+def close_connection():
+    """현재 스레드의 연결을 닫습니다. (작업 스레드가 끝날 때 호출)"""
+    conn = _local.__dict__.pop("conn", None)
+    if conn is None:
+        return
+    with _connections_lock:
+        _connections.pop(threading.current_thread(), None)
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _rollback(conn):
+    """쓰기 실패 시 열린 트랜잭션을 되돌립니다. (연결은 계속 재사용)"""
+    if conn is not None:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+
+
+def close_all_connections():
+    """(서버 종료 시) 모든 스레드의 연결을 닫습니다."""
+    with _connections_lock:
+        for conn in _connections.values():
+            try:
+                conn.close()
+            except Exception:
+                pass
+        _connections.clear()
+    _local.__dict__.pop("conn", None)
+
+
+# ⭐️ [신규] 버전별 스키마 마이그레이션 (PRAGMA user_version에 현재 버전 기록)
+MIGRATIONS = {
+    1: """
+    CREATE TABLE IF NOT EXISTS transcripts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        original_text TEXT,
+        translated_text TEXT
+    );
+    """,
+    # 세션 메타데이터 테이블 + 인덱스 (세션 목록/로드가 전체 transcripts 스캔 없이 동작)
+    2: """
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        created_at DATETIME,
+        last_activity DATETIME,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        wav_path TEXT,
+        duration_sec REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_transcripts_session_ts ON transcripts(session_id, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions(last_activity);
+
+    -- 기존 데이터로 세션 메타데이터 채우기
+    INSERT OR IGNORE INTO sessions (session_id, created_at, last_activity, row_count)
+    SELECT session_id, MIN(timestamp), MAX(timestamp), COUNT(*)
+    FROM transcripts
+    WHERE session_id IS NOT NULL
+    GROUP BY session_id;
+
+    -- 행 추가/삭제 시 세션 메타데이터 자동 갱신
+    CREATE TRIGGER IF NOT EXISTS trg_transcripts_insert AFTER INSERT ON transcripts
+    BEGIN
+        INSERT INTO sessions (session_id, created_at, last_activity, row_count)
+        VALUES (NEW.session_id, NEW.timestamp, NEW.timestamp, 1)
+        ON CONFLICT(session_id) DO UPDATE SET
+            row_count = row_count + 1,
+            last_activity = MAX(COALESCE(last_activity, ''), excluded.last_activity);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transcripts_delete AFTER DELETE ON transcripts
+    BEGIN
+        UPDATE sessions SET row_count = MAX(row_count - 1, 0) WHERE session_id = OLD.session_id;
+    END;
+    """,
+    # FTS5 전문 검색 인덱스 (transcripts를 원본으로 하는 external content 테이블)
+    # 세션 ID는 검색 시 transcripts와 JOIN 하므로 이름 변경은 자동 반영됨
+    3: """
+    CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5(
+        original_text,
+        translated_text,
+        content='transcripts',
+        content_rowid='id',
+        tokenize='unicode61'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_transcripts_fts_insert AFTER INSERT ON transcripts
+    BEGIN
+        INSERT INTO transcripts_fts (rowid, original_text, translated_text)
+        VALUES (NEW.id, NEW.original_text, NEW.translated_text);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transcripts_fts_delete AFTER DELETE ON transcripts
+    BEGIN
+        INSERT INTO transcripts_fts (transcripts_fts, rowid, original_text, translated_text)
+        VALUES ('delete', OLD.id, OLD.original_text, OLD.translated_text);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transcripts_fts_update AFTER UPDATE OF original_text, translated_text ON transcripts
+    BEGIN
+        INSERT INTO transcripts_fts (transcripts_fts, rowid, original_text, translated_text)
+        VALUES ('delete', OLD.id, OLD.original_text, OLD.translated_text);
+        INSERT INTO transcripts_fts (rowid, original_text, translated_text)
+        VALUES (NEW.id, NEW.original_text, NEW.translated_text);
+    END;
+
+    -- 기존 기록으로 검색 인덱스 생성
+    INSERT INTO transcripts_fts (transcripts_fts) VALUES ('rebuild');
+    """,
+    # 요약 중간 결과(Map 요약) 캐시 - 키: (청크 내용, 모델, 생성 파라미터) 해시
+    4: """
+    CREATE TABLE IF NOT EXISTS summary_cache (
+        cache_key TEXT PRIMARY KEY,
+        model_name TEXT,
+        summary TEXT NOT NULL,
+        created_at DATETIME
+    );
+    """,
+    # 실시간 화자 구분 결과 (화자 라벨, 없으면 NULL)
+    5: """
+    ALTER TABLE transcripts ADD COLUMN speaker TEXT;
+    """,
+    # 실시간 Whisper 세그먼트 (WAV 안에서의 위치 + 텍스트) - 화자 분리 시 STT 재실행 대신 사용
+    6: """
+    CREATE TABLE IF NOT EXISTS live_segments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        start_sec REAL NOT NULL,
+        end_sec REAL NOT NULL,
+        text TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_live_segments_session ON live_segments(session_id, start_sec);
+    ALTER TABLE transcripts ADD COLUMN start_sec REAL;
+    ALTER TABLE transcripts ADD COLUMN end_sec REAL;
+    """,
+    # 화자 분리 결과 캐시 - 세션별 실행 정보(WAV 크기/수정 시각/해시 + 모델 설정) + 발화 행
+    7: """
+    CREATE TABLE IF NOT EXISTS diarization_runs (
+        session_id TEXT PRIMARY KEY,
+        wav_size INTEGER NOT NULL,
+        wav_mtime_ns INTEGER NOT NULL,
+        wav_hash TEXT NOT NULL,
+        config_key TEXT NOT NULL,
+        created_at DATETIME
+    );
+    CREATE TABLE IF NOT EXISTS diarization_turns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        start_sec REAL,
+        end_sec REAL,
+        speaker TEXT,
+        text TEXT NOT NULL,
+        translation TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_diarization_turns_session ON diarization_turns(session_id, seq);
+    """,
+}
+SCHEMA_VERSION = max(MIGRATIONS)
 
 
 def init_db():
-    """데이터베이스 테이블을 초기화합니다."""
+    """데이터베이스 스키마를 최신 버전으로 마이그레이션합니다."""
     conn = None
     try:
-        conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transcripts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            original_text TEXT,
-            translated_text TEXT
+        conn = get_connection()
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version in sorted(MIGRATIONS):
+            if version <= current:
+                continue
+            print(f"🔄 DB 스키마 마이그레이션: v{current} -> v{version}")
+            # 마이그레이션 1개 = 트랜잭션 1개 (실패 시 해당 버전 전체 취소)
+            conn.executescript(
+                "BEGIN;\n" + MIGRATIONS[version] + f"\nPRAGMA user_version = {version};\nCOMMIT;"
+            )
+            current = version
+        print(f"✅ DB '{DB_NAME}' 초기화 완료. (스키마 v{current})")
+    except Exception as e:
+        _rollback(conn)
+        print(f"⚠️ DB 초기화 실패: {e}")
+
+
+# ⭐️ [신규] 세션 메타데이터 (세션 시작/종료 시 호출)
+def register_session(session_id, wav_path=None):
+    """새 세션을 sessions 테이블에 등록합니다. (이미 있으면 마지막 활동 시각만 갱신)"""
+    conn = None
+    try:
+        conn = get_connection()
+        now = _now_kst()
+        conn.execute(
+            """
+            INSERT INTO sessions (session_id, created_at, last_activity, wav_path)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                last_activity = excluded.last_activity,
+                wav_path = COALESCE(excluded.wav_path, wav_path)
+            """,
+            (session_id, now, now, wav_path)
         )
-        ''')
         conn.commit()
-        print(f"✅ DB '{DB_NAME}' 초기화 완료.")
+        return True
     except Exception as e:
-        print(f"⚠️ DB 초기화 실패: {e}")
-    finally:
-        if conn:
-            conn.close()
+        _rollback(conn)
+        print(f"⚠️ 세션 등록 실패: {e}")
+        return False
+
+
+def update_session_audio(session_id, wav_path, duration_sec):
+    """세션의 .wav 경로와 녹음 길이(초)를 기록합니다."""
+    conn = None
+    try:
+        conn = get_connection()
+        conn.execute(
+            "UPDATE sessions SET wav_path = ?, duration_sec = ? WHERE session_id = ?",
+            (wav_path, duration_sec, session_id)
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        _rollback(conn)
+        print(f"⚠️ 세션 오디오 정보 갱신 실패: {e}")
+        return False
 
 
-def insert_transcript(session_id, original, translated):
+def get_session_details():
+    """세션 목록을 메타데이터와 함께 (최신순으로) 가져옵니다."""
+    conn = None
+    try:
+        conn = get_connection()
+        rows = conn.execute(
+            """
+            SELECT session_id, created_at, last_activity, row_count, wav_path, duration_sec
+            FROM sessions
+            ORDER BY last_activity DESC
+            """
+        ).fetchall()
+        return [{
+            'session_id': row[0],
+            'start_time': row[1],
+            'last_activity': row[2],
+            'row_count': row[3],
+            'wav_path': row[4],
+            'duration': row[5] or 0
+        } for row in rows]
+    except Exception as e:
+        print(f"⚠️ 세션 상세 정보 조회 실패: {e}")
+        return []
+
+
+def insert_transcript(session_id, original, translated, speaker=None, start_sec=None, end_sec=None):
     """번역 결과를 DB에 삽입합니다."""
     conn = None
     try:
-        conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+        conn = get_connection()
         cursor = conn.cursor()
-        kst = timezone(timedelta(hours=9))
-        now = datetime.now(kst).strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute(
-            "INSERT INTO transcripts (session_id, timestamp, original_text, translated_text) VALUES (?, ?, ?, ?)",
-            (session_id, now, original, translated)
-        )
+        cursor.execute(SQL_INSERT_TRANSCRIPT,
+                       (session_id, _now_kst(), original, translated, speaker, start_sec, end_sec))
         conn.commit()
     except Exception as e:
+        _rollback(conn)
         print(f"⚠️ DB 삽입 실패: {e}")
-    finally:
-        if conn:
-            conn.close()
+
+
+def _now_kst():
+    kst = timezone(timedelta(hours=9))
+    return datetime.now(kst).strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ⭐️ [신규] 쓰기 지연(write-behind) 트랜스크립트 기록기
+class TranscriptWriter:
+    """
+    오디오 파이프라인은 enqueue()로 큐에 넣기만 하고, 백그라운드 스레드가
+    DB_WRITE_BATCH_SIZE개가 모이거나 DB_WRITE_FLUSH_SEC가 지나면 executemany로 한 트랜잭션에 기록합니다.
+    flush()는 그때까지 넣은 행이 모두 기록될 때까지 기다립니다. (세션 종료 시 유실 방지)
+    """
+
+    def __init__(self, batch_size=DB_WRITE_BATCH_SIZE, flush_interval=DB_WRITE_FLUSH_SEC, max_retries=3):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, session_id, original, translated, speaker=None, segments=None):
+        """segments: 이 문장을 이루는 Whisper 세그먼트 [{start, end, text}] (WAV 기준 초)"""
+        # 타임스탬프는 기록 시점이 아니라 문장이 들어온 시점 기준
+        self._ensure_started()
+        segments = segments or []
+        start_sec = min((seg['start'] for seg in segments), default=None)
+        end_sec = max((seg['end'] for seg in segments), default=None)
+        self._queue.put((
+            (session_id, _now_kst(), original, translated, speaker, start_sec, end_sec),
+            [(session_id, seg['start'], seg['end'], seg['text']) for seg in segments]
+        ))
+
+    def flush(self, timeout=None):
+        """지금까지 넣은 행이 모두 기록되면 True를 반환합니다."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _write(self, items):
+        if not items:
+            return
+        rows = [transcript_row for transcript_row, _ in items]
+        segment_rows = [row for _, rows_ in items for row in rows_]
+        for attempt in range(1, self.max_retries + 1):
+            conn = None
+            try:
+                conn = get_connection()
+                with conn:  # 하나의 트랜잭션 (예외 시 자동 rollback)
+                    conn.executemany(SQL_INSERT_TRANSCRIPT, rows)
+                    if segment_rows:
+                        conn.executemany(SQL_INSERT_LIVE_SEGMENT, segment_rows)
+                return
+            except Exception as e:
+                print(f"⚠️ DB 일괄 삽입 실패 ({len(rows)}개, 시도 {attempt}/{self.max_retries}): {e}")
+                time.sleep(0.2 * attempt)
+        print(f"❌ DB 일괄 삽입 최종 실패: {len(rows)}개 행을 기록하지 못했습니다.")
+
+    def _run(self):
+        rows = []
+        deadline = None
+        while True:
+            timeout = None if not rows else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, threading.Event):
+                self._write(rows)
+                rows = []
+                item.set()
+                continue
+
+            if item is not None:
+                rows.append(item)
+                if len(rows) == 1:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if rows and (len(rows) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(rows)
+                rows = []
+
+
+transcript_writer = TranscriptWriter()
+
+
+def enqueue_transcript(session_id, original, translated, speaker=None, segments=None):
+    """번역 결과를 쓰기 큐에 넣습니다. (실제 기록은 백그라운드에서 일괄 처리)"""
+    transcript_writer.enqueue(session_id, original, translated, speaker, segments)
+
+
+def flush_transcripts(timeout=None):
+    """쓰기 큐에 남은 행을 모두 DB에 기록합니다."""
+    return transcript_writer.flush(timeout)
 
 
 def fetch_data_from_db(session_id=None):
     """DB에서 텍스트를 가져옵니다."""
     conn = None
     try:
-        conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+        conn = get_connection()
         cursor = conn.cursor()
         query = "SELECT COALESCE(NULLIF(translated_text, ''), original_text) FROM transcripts"
         params = []
@@ -74,18 +454,259 @@ def fetch_data_from_db(session_id=None):
     except Exception as e:
         print(f"⚠️ DB 읽기 실패: {e}")
         return ""
-    finally:
-        if conn:
-            conn.close()
+
+
+# ⭐️ [신규] 실시간 Whisper 세그먼트 조회 (화자 분리에서 STT 대신 사용)
+def get_live_segments(session_id, start_sec=None, end_sec=None):
+    """세션의 세그먼트를 시작 시간 순으로 반환합니다. [{start, end, text}] (start_sec <= 시작 < end_sec)"""
+    conn = None
+    try:
+        conn = get_connection()
+        query = "SELECT start_sec, end_sec, text FROM live_segments WHERE session_id = ?"
+        params = [session_id]
+        if start_sec is not None:
+            query += " AND start_sec >= ?"
+            params.append(start_sec)
+        if end_sec is not None:
+            query += " AND start_sec < ?"
+            params.append(end_sec)
+        query += " ORDER BY start_sec"
+        return [{'start': row[0], 'end': row[1], 'text': row[2]} for row in conn.execute(query, params)]
+    except Exception as e:
+        print(f"⚠️ 실시간 세그먼트 조회 실패: {e}")
+        return []
+
+
+# ⭐️ [신규] 커서 기반 페이지 조회 (세션 전체를 한 문자열로 만들지 않음)
+SQL_TRANSCRIPT_PAGE_FIRST = """
+SELECT id, timestamp, original_text, translated_text, speaker FROM transcripts
+WHERE session_id = ?
+ORDER BY timestamp, id
+LIMIT ?
+"""
+SQL_TRANSCRIPT_PAGE_NEXT = """
+SELECT id, timestamp, original_text, translated_text, speaker FROM transcripts
+WHERE session_id = ? AND (timestamp, id) > (?, ?)
+ORDER BY timestamp, id
+LIMIT ?
+"""
+
+
+def fetch_transcript_page(session_id, cursor=None, page_size=DB_PAGE_SIZE):
+    """
+    세션 기록을 (timestamp, id) 순서로 page_size개씩 가져옵니다.
+    반환: (rows, next_cursor) - rows는 {id, timestamp, original, translated, speaker} 목록,
+    next_cursor는 다음 페이지 요청에 넘길 값 (마지막 페이지면 None)
+    ⭐️ [수정] DB 오류는 그대로 올림 (빈 페이지로 바꾸면 호출한 쪽이 기록이 끝난 것으로 오인함)
+    """
+    conn = get_connection()
+    if cursor is None:
+        result = conn.execute(SQL_TRANSCRIPT_PAGE_FIRST, (session_id, page_size))
+    else:
+        result = conn.execute(SQL_TRANSCRIPT_PAGE_NEXT, (session_id, cursor[0], cursor[1], page_size))
+    rows = [{
+        'id': row[0],
+        'timestamp': row[1],
+        'original': row[2] or "",
+        'translated': row[3] or "",
+        'speaker': row[4]
+    } for row in result.fetchall()]
+
+    next_cursor = None
+    if len(rows) == page_size:
+        next_cursor = (rows[-1]['timestamp'], rows[-1]['id'])
+    return rows, next_cursor
+
+
+def iter_transcript_pages(session_id, page_size=DB_PAGE_SIZE):
+    """세션 기록을 페이지 단위로 순회합니다. (메모리에는 한 페이지만 유지, DB 오류는 그대로 올림)"""
+    cursor = None
+    while True:
+        rows, cursor = fetch_transcript_page(session_id, cursor, page_size)
+        if rows:
+            yield rows
+        if cursor is None:
+            break
+
+
+# ⭐️ [신규] 전문 검색 (FTS5)
+def _build_fts_query(query):
+    """
+    사용자 입력을 FTS5 MATCH 식으로 변환합니다.
+    단어마다 접두어 검색("회의"* → '회의는', '회의록')을 적용하고 모두 포함(AND)하는 행을 찾습니다.
+    """
+    terms = [t.replace('"', '') for t in query.split()]
+    return " ".join(f'"{t}"*' for t in terms if t)
+
+
+def search_transcripts(query, session_id=None, start_time=None, end_time=None,
+                       limit=SEARCH_RESULT_LIMIT, offset=0):
+    """
+    모든 세션의 원문/번역문에서 검색합니다. (관련도 순)
+    start_time/end_time: 'YYYY-MM-DD HH:MM:SS' 형식 (KST, 포함 범위)
+    반환: {id, session_id, timestamp, original, translated, original_snippet, translated_snippet, score} 목록
+    """
+    fts_query = _build_fts_query(query or "")
+    if not fts_query:
+        return []
+
+    sql = """
+    SELECT t.id, t.session_id, t.timestamp, t.original_text, t.translated_text,
+           snippet(transcripts_fts, 0, '[', ']', '…', 12),
+           snippet(transcripts_fts, 1, '[', ']', '…', 12),
+           bm25(transcripts_fts) AS score
+    FROM transcripts_fts
+    JOIN transcripts t ON t.id = transcripts_fts.rowid
+    WHERE transcripts_fts MATCH ?
+    """
+    params = [fts_query]
+    if session_id:
+        sql += " AND t.session_id = ?"
+        params.append(session_id)
+    if start_time:
+        sql += " AND t.timestamp >= ?"
+        params.append(start_time)
+    if end_time:
+        sql += " AND t.timestamp <= ?"
+        params.append(end_time)
+    sql += " ORDER BY score LIMIT ? OFFSET ?"
+    params.extend([limit, offset])
+
+    conn = None
+    try:
+        conn = get_connection()
+        rows = conn.execute(sql, params).fetchall()
+        return [{
+            'id': row[0],
+            'session_id': row[1],
+            'timestamp': row[2],
+            'original': row[3] or "",
+            'translated': row[4] or "",
+            'original_snippet': row[5] or "",
+            'translated_snippet': row[6] or "",
+            'score': row[7]  # bm25: 낮을수록 관련도 높음
+        } for row in rows]
+    except Exception as e:
+        print(f"⚠️ 전문 검색 실패: {e}")
+        return []
+
+
+# ⭐️ [신규] 요약 캐시
+def get_cached_summaries(cache_keys):
+    """캐시 키 목록 중 저장된 요약만 {cache_key: summary}로 반환합니다."""
+    if not cache_keys:
+        return {}
+    conn = None
+    try:
+        conn = get_connection()
+        found = {}
+        keys = list(cache_keys)
+        for i in range(0, len(keys), 500):  # SQLite 바인딩 변수 개수 제한 대비
+            part = keys[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = conn.execute(
+                f"SELECT cache_key, summary FROM summary_cache WHERE cache_key IN ({placeholders})", part
+            ).fetchall()
+            found.update(rows)
+        return found
+    except Exception as e:
+        print(f"⚠️ 요약 캐시 조회 실패: {e}")
+        return {}
+
+
+def put_cached_summary(cache_key, model_name, summary):
+    """요약 결과를 캐시에 저장합니다."""
+    conn = None
+    try:
+        conn = get_connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO summary_cache (cache_key, model_name, summary, created_at) VALUES (?, ?, ?, ?)",
+            (cache_key, model_name, summary, _now_kst())
+        )
+        conn.commit()
+    except Exception as e:
+        _rollback(conn)
+        print(f"⚠️ 요약 캐시 저장 실패: {e}")
+
+
+# ⭐️ [신규] 화자 분리 결과 캐시
+def get_diarization_run(session_id):
+    """저장된 화자 분리 실행 정보 {wav_size, wav_mtime_ns, wav_hash, config_key, created_at} (없으면 None)"""
+    conn = None
+    try:
+        conn = get_connection()
+        row = conn.execute(
+            "SELECT wav_size, wav_mtime_ns, wav_hash, config_key, created_at FROM diarization_runs "
+            "WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'wav_size': row[0], 'wav_mtime_ns': row[1], 'wav_hash': row[2],
+                'config_key': row[3], 'created_at': row[4]}
+    except Exception as e:
+        print(f"⚠️ 화자 분리 캐시 조회 실패: {e}")
+        return None
+
+
+def get_diarization_turns(session_id):
+    """저장된 화자 분리 결과를 순서대로 반환합니다. [{start, end, speaker, text, translation}]"""
+    conn = None
+    try:
+        conn = get_connection()
+        rows = conn.execute(
+            "SELECT start_sec, end_sec, speaker, text, translation FROM diarization_turns "
+            "WHERE session_id = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+        return [{'start': row[0], 'end': row[1], 'speaker': row[2], 'text': row[3], 'translation': row[4]}
+                for row in rows]
+    except Exception as e:
+        print(f"⚠️ 화자 분리 결과 조회 실패: {e}")
+        return []
+
+
+def put_diarization_result(session_id, wav_size, wav_mtime_ns, wav_hash, config_key, turns):
+    """세션의 이전 결과를 지우고 새 화자 분리 결과를 한 트랜잭션으로 저장합니다."""
+    conn = None
+    try:
+        conn = get_connection()
+        conn.execute("DELETE FROM diarization_turns WHERE session_id = ?", (session_id,))
+        conn.execute(
+            "INSERT OR REPLACE INTO diarization_runs (session_id, wav_size, wav_mtime_ns, wav_hash, config_key, "
+            "created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, wav_size, wav_mtime_ns, wav_hash, config_key, _now_kst())
+        )
+        conn.executemany(SQL_INSERT_DIARIZATION_TURN, [
+            (session_id, seq, turn.get('start'), turn.get('end'), turn.get('speaker'), turn['text'],
+             turn.get('translation'))
+            for seq, turn in enumerate(turns)
+        ])
+        conn.commit()
+        return True
+    except Exception as e:
+        _rollback(conn)
+        print(f"⚠️ 화자 분리 결과 저장 실패: {e}")
+        return False
+
+
+def touch_diarization_run(session_id, wav_mtime_ns):
+    """내용(해시)은 같고 수정 시각만 바뀐 경우, 다음 조회에서 해시를 다시 계산하지 않도록 갱신합니다."""
+    conn = None
+    try:
+        conn = get_connection()
+        conn.execute("UPDATE diarization_runs SET wav_mtime_ns = ? WHERE session_id = ?", (wav_mtime_ns, session_id))
+        conn.commit()
+    except Exception as e:
+        _rollback(conn)
+        print(f"⚠️ 화자 분리 캐시 갱신 실패: {e}")
 
 
 def get_latest_session_id():
     """DB에서 가장 최근의 session_id를 가져옵니다."""
     conn = None
     try:
-        conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+        conn = get_connection()
         cursor = conn.cursor()
-        query = "SELECT session_id FROM transcripts ORDER BY timestamp DESC LIMIT 1"
+        query = "SELECT session_id FROM sessions ORDER BY last_activity DESC LIMIT 1"
         cursor.execute(query)
         result = cursor.fetchone()
         if result:
@@ -95,84 +716,90 @@ def get_latest_session_id():
     except Exception as e:
         print(f"⚠️ 최근 세션 ID 조회 실패: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def get_all_session_ids():
     """DB에서 모든 고유한 session_id 목록을 (최신순으로) 가져옵니다."""
     conn = None
     try:
-        conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+        conn = get_connection()
         cursor = conn.cursor()
-        query = """
-        SELECT DISTINCT session_id 
-        FROM transcripts 
-        ORDER BY timestamp DESC
-        """
+        # ⭐️ [수정] transcripts 전체 스캔 대신 sessions 테이블 사용
+        query = "SELECT session_id FROM sessions ORDER BY last_activity DESC"
         cursor.execute(query)
         rows = cursor.fetchall()
         return [row[0] for row in rows]
     except Exception as e:
         print(f"⚠️ 모든 세션 ID 조회 실패: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 
-def rename_session(old_id, new_id):
-    """DB에서 'old_id'를 'new_id'로 변경합니다."""
+def rename_session(old_id, new_id, wav_path=None):
+    """
+    DB에서 'old_id'를 'new_id'로 변경합니다.
+    ⭐️ [수정] wav_path가 주어지면 세션의 .wav 경로도 같은 트랜잭션에서 변경 (파일 이동은 호출한 쪽에서)
+    """
     conn = None
     try:
-        conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+        conn = get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT 1 FROM transcripts WHERE session_id = ? LIMIT 1", (new_id,))
+        cursor.execute("SELECT 1 FROM sessions WHERE session_id = ? LIMIT 1", (new_id,))
         if cursor.fetchone():
             print(f"⚠️ 이름 변경 실패: '{new_id}'가 이미 존재합니다.")
             return False
 
+        # 세션 메타데이터는 그대로 옮기고, 기록 행의 세션 ID 변경
+        cursor.execute("UPDATE sessions SET session_id = ?, wav_path = COALESCE(?, wav_path) WHERE session_id = ?",
+                       (new_id, wav_path, old_id))
+        session_renamed = cursor.rowcount > 0
+        cursor.execute("UPDATE live_segments SET session_id = ? WHERE session_id = ?", (new_id, old_id))
+        cursor.execute("UPDATE diarization_runs SET session_id = ? WHERE session_id = ?", (new_id, old_id))
+        cursor.execute("UPDATE diarization_turns SET session_id = ? WHERE session_id = ?", (new_id, old_id))
         query = "UPDATE transcripts SET session_id = ? WHERE session_id = ?"
         cursor.execute(query, (new_id, old_id))
-        conn.commit()
+        renamed_rows = cursor.rowcount
 
-        if cursor.rowcount > 0:
-            print(f"✅ DB 세션 이름 변경 완료: '{old_id}' -> '{new_id}' ({cursor.rowcount}개 레코드)")
-            return True
-        else:
+        # ⭐️ [수정] 기록 행이 없는 세션도 세션 메타데이터가 바뀌었으면 성공 (아무것도 없으면 되돌림)
+        if not session_renamed and renamed_rows == 0:
+            conn.rollback()
             print(f"⚠️ 이름 변경 실패: '{old_id}'를 찾을 수 없습니다.")
             return False
 
+        conn.commit()
+        print(f"✅ DB 세션 이름 변경 완료: '{old_id}' -> '{new_id}' ({renamed_rows}개 레코드)")
+        return True
+
     except Exception as e:
+        _rollback(conn)
         print(f"⚠️ 세션 이름 변경 중 DB 오류: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
 # ⭐️ [신규] 세션 삭제 함수
 def delete_session(session_id):
     """DB에서 해당 session_id의 모든 기록을 삭제합니다."""
     conn = None
     try:
-        conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+        conn = get_connection()
         cursor = conn.cursor()
 
         query = "DELETE FROM transcripts WHERE session_id = ?"
         cursor.execute(query, (session_id,))
+        deleted_rows = cursor.rowcount
+        cursor.execute("DELETE FROM live_segments WHERE session_id = ?", (session_id,))
+        cursor.execute("DELETE FROM diarization_turns WHERE session_id = ?", (session_id,))
+        cursor.execute("DELETE FROM diarization_runs WHERE session_id = ?", (session_id,))
+        cursor.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        session_deleted = cursor.rowcount > 0
         conn.commit()
 
-        if cursor.rowcount > 0:
-            print(f"✅ DB 세션 삭제 완료: '{session_id}' ({cursor.rowcount}개 레코드)")
+        if deleted_rows > 0 or session_deleted:
+            print(f"✅ DB 세션 삭제 완료: '{session_id}' ({deleted_rows}개 레코드)")
             return True
         else:
             print(f"⚠️ DB 세션 삭제 실패: '{session_id}'를 찾을 수 없습니다.")
             return False
 
     except Exception as e:
+        _rollback(conn)
         print(f"⚠️ 세션 삭제 중 DB 오류: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
@@ -1,11 +1,17 @@
 import os
 import torch
 import whisperx
-from deep_translator import GoogleTranslator
+from translation_service import get_translation_service
+from audio_ingest import get_normalized_audio
+from db_handler import get_live_segments, get_diarization_run, get_diarization_turns, put_diarization_result, \
+    touch_diarization_run
 from pyannote.audio import Pipeline
-import soundfile as sf
 import numpy as np
 import pandas as pd
+import time
+import struct
+import hashlib
+import json
 
 # ⭐️ config에서 설정값 임포트
 from config import (
@@ -14,7 +20,15 @@ from config import (
     DIARIZE_COMPUTE_TYPE,
     DIARIZE_MODEL_TYPE,
     LANGUAGE,  # 실시간 모드와 동일한 언어 사용
-    TARGET_LANG
+    TARGET_LANG,
+    TRANSLATION_RETRIES,
+    TRANSLATION_TIMEOUT_SEC,
+    DIARIZE_WINDOW_SEC,
+    DIARIZE_WINDOW_OVERLAP_SEC,
+    DIARIZE_REUSE_LIVE_SEGMENTS,
+    DIARIZE_GAP_MIN_SEC,
+    DIARIZE_CACHE_ENABLED,
+    RATE
 )
 
 # ============================================
@@ -34,6 +48,10 @@ MODEL_TYPE = DIARIZE_MODEL_TYPE
 # (LANGUAGE와 TARGET_LANG는 이미 임포트됨)
 
 
+TARGET_SR = RATE  # Whisper / pyannote 입력 샘플레이트 (16kHz)
+DIARIZE_PIPELINE = "pyannote/speaker-diarization-3.1"
+TRANSLATION_FAILED = "[번역 실패]"
+
 # --- 모델 캐시 (전역 변수) ---
 model_cache = {
     "whisper": None,
@@ -52,10 +70,44 @@ def translate_text(text, target=TARGET_LANG):
     if not text or not text.strip():
         return ""
     try:
-        return GoogleTranslator(source='auto', target=target).translate(text)
+        return get_translation_service().translate(text, target)
     except Exception as e:
         print(f"⚠️ (후처리) 번역 실패: {e}")
-        return "[번역 실패]"
+        return TRANSLATION_FAILED
+
+
+# ⭐️ [신규] 여러 문장 일괄 번역 (묶음 요청 + 병렬 + 재시도)
+def translate_texts(texts, target=TARGET_LANG, retries=TRANSLATION_RETRIES):
+    """
+    문장 목록을 한꺼번에 번역 서비스에 넘기고 입력 순서대로 결과를 반환합니다.
+    (동시 요청 수는 번역 서비스 작업 스레드 수로 제한)
+    실패한 문장만 재시도하며, 끝까지 실패하면 '[번역 실패]'로 채웁니다.
+    """
+    service = get_translation_service()
+    results = [""] * len(texts)
+    pending = [i for i, text in enumerate(texts) if text and text.strip()]
+
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        if attempt > 0:
+            print(f"🔄 (후처리) 번역 실패 {len(pending)}개 문장 재시도 ({attempt}/{retries})...")
+            time.sleep(0.5 * attempt)  # 간단한 백오프
+
+        translations = service.translate_many([texts[i] for i in pending], target, timeout=TRANSLATION_TIMEOUT_SEC)
+        failed = []
+        for i, translated in zip(pending, translations):
+            if isinstance(translated, Exception):
+                failed.append(i)
+            else:
+                results[i] = translated
+        pending = failed
+
+    for i in pending:
+        results[i] = TRANSLATION_FAILED
+    if pending:
+        print(f"⚠️ (후처리) 최종 번역 실패: {len(pending)}개 문장")
+    return results
 
 
 # ============================================
@@ -97,7 +149,7 @@ def load_diarize_model():
         print("🔄 (후처리) 화자 분리 모델 로드 중... (CPU, 최초 1회 시간 소요)")
         try:
             pipeline = Pipeline.from_pretrained(
-                "pyannote/speaker-diarization-3.1",
+                DIARIZE_PIPELINE,
                 use_auth_token=HF_TOKEN
             )
             pipeline.to(torch.device(DEVICE))
@@ -110,132 +162,450 @@ def load_diarize_model():
 
 
 # ============================================
-# 🎙️ 메인 분석 함수
+# 💾 오디오 로드 (메모리 매핑 + 창 단위 읽기)
 # ============================================
 
-def run_diarization(session_id):
+def _find_wav_data_chunk(path):
     """
-    저장된 .wav 파일을 기반으로 화자 분리 및 번역을 수행합니다.
-    (CPU에서 실행되므로 매우 느립니다)
+    PCM WAV 헤더를 읽어 (채널 수, 샘플레이트, 샘플 폭(바이트), data 시작 위치, data 크기)를 반환합니다.
+    PCM 정수 형식이 아니면 None
     """
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            return None
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                audio_format, channels, sr, _, _, bits = struct.unpack('<HHIIHH', f.read(16))
+                f.seek(chunk_size - 16 + (chunk_size & 1), os.SEEK_CUR)
+                fmt = (audio_format, channels, sr, bits)
+            elif chunk_id == b'data':
+                if fmt is None or fmt[0] != 1:  # 1 = PCM
+                    return None
+                data_offset = f.tell()
+                # 녹음 도중 종료되어 헤더의 크기가 갱신되지 않은 경우 실제 파일 크기 기준
+                data_size = min(chunk_size, os.path.getsize(path) - data_offset)
+                return fmt[1], fmt[2], fmt[3] // 8, data_offset, data_size
+            else:
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
 
-    # --- 1. 오디오 파일 확인 ---
-    output_dir = "wav"
-    audio_file = os.path.join(output_dir, f"{session_id}.wav")
 
-    if not os.path.exists(audio_file):
-        print(f"❌ (후처리) 오디오 파일 없음: {audio_file}")
-        return f"[오류] 세션 오디오 파일({audio_file})을 찾을 수 없습니다."
+def load_audio_source(audio_file):
+    """
+    분석용 오디오를 (frames, channels) int16 배열로 엽니다. 반환: (source, sr)
+    16kHz 모노 int16 WAV가 아니면 audio_ingest로 변환(캐시)한 파일을 사용하고,
+    np.memmap으로 열어 실제로 읽는 구간만 메모리에 올라오게 합니다.
+    """
+    audio_file = get_normalized_audio(audio_file)
+    info = _find_wav_data_chunk(audio_file)
+    if info is None or info[2] != 2:
+        raise ValueError(f"16bit PCM WAV가 아닙니다: {audio_file}")
+    channels, sr, width, offset, size = info
+    frames = size // (width * channels)
+    source = np.memmap(audio_file, dtype='<i2', mode='r', offset=offset, shape=(frames, channels))
+    print(f"💾 (후처리) WAV 메모리 매핑: {frames / sr:.1f}초, {channels}채널, {sr}Hz")
+    return source, sr
+
+
+def read_window(source, sr, start_sec, end_sec):
+    """source의 [start_sec, end_sec) 구간을 모노 float32 배열로 반환합니다."""
+    start = int(start_sec * sr)
+    end = min(int(end_sec * sr), len(source))
+    window = np.asarray(source[start:end]).astype(np.float32) / 32768.0
+    window = window.mean(axis=1) if window.shape[1] > 1 else window[:, 0]
+    return np.ascontiguousarray(window)
+
+
+def plan_windows(duration_sec, window_sec=DIARIZE_WINDOW_SEC, overlap_sec=DIARIZE_WINDOW_OVERLAP_SEC):
+    """[(start, end), ...] 창 목록 (인접 창은 overlap_sec만큼 겹침, 짧은 녹음은 창 1개)"""
+    if window_sec <= 0 or duration_sec <= window_sec:
+        return [(0.0, duration_sec)]
+    overlap_sec = min(max(overlap_sec, 0.0), window_sec / 2)
+    hop = window_sec - overlap_sec
+    windows = []
+    start = 0.0
+    while True:
+        end = min(start + window_sec, duration_sec)
+        windows.append((start, end))
+        if end >= duration_sec:
+            break
+        start += hop
+    return windows
 
-    print(f"✅ (후처리) 세션 '{session_id}' 분석 시작... (CPU 사용, 매우 느릴 수 있음)")
 
-    try:
-        # --- 2. 오디오 로드 ---
-        audio_data, sr = sf.read(audio_file, dtype='float32')
-        if audio_data.ndim > 1:
-            audio_data = np.mean(audio_data, axis=1)
-        if sr != 16000:
-            print(f"⚠️ 경고: 오디오 샘플레이트가 16kHz가 아닙니다. ({sr}Hz). 리샘플링 시도...")
-            if sr > 16000:
-                step = int(sr / 16000)
-                audio_data = audio_data[::step]
+# ============================================
+# 🧵 창별 결과 이어 붙이기
+# ============================================
 
-    except Exception as e:
-        print(f"❌ (후처리) 오디오 파일 로드 실패: {e}")
-        return "[오류] 오디오 파일 로드에 실패했습니다."
+def _shift_segments(segments, offset):
+    """창 기준 시간을 녹음 전체 기준으로 변환합니다. (단어 타임스탬프 포함)"""
+    for segment in segments:
+        for key in ('start', 'end'):
+            if segment.get(key) is not None:
+                segment[key] += offset
+        for word in segment.get('words', []):
+            for key in ('start', 'end'):
+                if word.get(key) is not None:
+                    word[key] += offset
+    return segments
+
+
+def _match_speakers(prev_turns, new_turns, overlap_start, overlap_end):
+    """
+    겹치는 구간에서 함께 말한 시간이 가장 긴 쌍부터 순서대로 짝지어
+    새 창의 지역 라벨 → 이전 창의 전역 라벨 대응표를 만듭니다.
+    """
+    scores = {}
+    for p in prev_turns:
+        for n in new_turns:
+            shared = min(p['end'], n['end'], overlap_end) - max(p['start'], n['start'], overlap_start)
+            if shared > 0:
+                key = (n['speaker'], p['speaker'])
+                scores[key] = scores.get(key, 0.0) + shared
+
+    mapping = {}
+    used = set()
+    for (local, global_label), _ in sorted(scores.items(), key=lambda item: -item[1]):
+        if local not in mapping and global_label not in used:
+            mapping[local] = global_label
+            used.add(global_label)
+    return mapping
+
+
+def stitch_windows(window_results):
+    """
+    창별 결과 [{start, end, segments, turns}, ...]를 하나로 합칩니다.
+    - 겹치는 구간의 중간 지점을 경계로, 각 창은 자기 구간에서 시작한 세그먼트/화자 구간만 사용 (중복 제거)
+    - 화자 라벨은 겹치는 구간의 화자 분리 결과로 창 사이에 연결 (SPEAKER_00... 으로 다시 번호 매김)
+    """
+    segments = []
+    turns = []
+    next_speaker = 0
+    prev_global_turns = []
+
+    for k, window in enumerate(window_results):
+        own_start = 0.0 if k == 0 else (window['start'] + window_results[k - 1]['end']) / 2
+        own_end = float('inf') if k == len(window_results) - 1 \
+            else (window['end'] + window_results[k + 1]['start']) / 2
+
+        # 화자 라벨 연결 (첫 창은 그대로 새 번호 부여)
+        mapping = {}
+        if k > 0:
+            mapping = _match_speakers(prev_global_turns, window['turns'],
+                                      window['start'], window_results[k - 1]['end'])
+        for turn in window['turns']:
+            if turn['speaker'] not in mapping:
+                mapping[turn['speaker']] = f"SPEAKER_{next_speaker:02d}"
+                next_speaker += 1
+        global_turns = [{**turn, 'speaker': mapping[turn['speaker']]} for turn in window['turns']]
+        prev_global_turns = global_turns
+
+        for turn in global_turns:
+            start, end = max(turn['start'], own_start), min(turn['end'], own_end)
+            if end > start:
+                turns.append({'start': start, 'end': end, 'speaker': turn['speaker']})
+
+        for segment in window['segments']:
+            seg_start = segment.get('start')
+            if seg_start is None or own_start <= seg_start < own_end:
+                segments.append(segment)
+
+    return segments, turns
 
+
+# ============================================
+# 🗄️ 결과 캐시 (WAV 지문 + 모델 설정)
+# ============================================
+
+def _config_key():
+    """결과에 영향을 주는 설정의 해시 (하나라도 바뀌면 캐시 무효)"""
+    payload = json.dumps({
+        'whisper': MODEL_TYPE,
+        'compute_type': COMPUTE_TYPE,
+        'device': DEVICE,
+        'language': LANGUAGE,
+        'target_lang': TARGET_LANG,
+        'diarize_pipeline': DIARIZE_PIPELINE,
+        'window_sec': DIARIZE_WINDOW_SEC,
+        'overlap_sec': DIARIZE_WINDOW_OVERLAP_SEC,
+        'reuse_live': DIARIZE_REUSE_LIVE_SEGMENTS,
+        'gap_min_sec': DIARIZE_GAP_MIN_SEC,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_cached_diarization(session_id, audio_file=None):
+    """
+    WAV와 모델 설정이 저장 당시와 같으면 저장된 결과 행 목록을, 아니면 None을 반환합니다.
+    크기/수정 시각이 같으면 바로 사용하고, 수정 시각만 다르면 내용 해시를 비교합니다.
+    """
+    if not DIARIZE_CACHE_ENABLED:
+        return None
+    audio_file = audio_file or os.path.join("wav", f"{session_id}.wav")
+    run = get_diarization_run(session_id)
+    if run is None or not os.path.exists(audio_file):
+        return None
+    if run['config_key'] != _config_key():
+        print(f"ℹ️ (후처리) 모델 설정이 바뀌어 저장된 화자 분리 결과를 사용하지 않습니다. ({session_id})")
+        return None
+
+    stat = os.stat(audio_file)
+    if stat.st_size != run['wav_size']:
+        print(f"ℹ️ (후처리) 오디오가 바뀌어 저장된 화자 분리 결과를 사용하지 않습니다. ({session_id})")
+        return None
+    if stat.st_mtime_ns != run['wav_mtime_ns']:
+        if _file_hash(audio_file) != run['wav_hash']:
+            print(f"ℹ️ (후처리) 오디오가 바뀌어 저장된 화자 분리 결과를 사용하지 않습니다. ({session_id})")
+            return None
+        touch_diarization_run(session_id, stat.st_mtime_ns)
+
+    turns = get_diarization_turns(session_id)
+    print(f"✅ (후처리) 저장된 화자 분리 결과 사용: '{session_id}' ({len(turns)}개 발화, {run['created_at']})")
+    return turns
+
+
+def _store_diarization(session_id, audio_file, turns):
+    """번역 실패가 없는 결과만 저장합니다. (실패한 번역이 캐시에 굳지 않도록) 저장했으면 True"""
+    if not DIARIZE_CACHE_ENABLED:
+        return False
+    if any(turn['translation'] == TRANSLATION_FAILED for turn in turns):
+        print("ℹ️ (후처리) 번역 실패 문장이 있어 화자 분리 결과를 저장하지 않습니다.")
+        return False
+    stat = os.stat(audio_file)
+    if put_diarization_result(session_id, stat.st_size, stat.st_mtime_ns, _file_hash(audio_file),
+                              _config_key(), turns):
+        print(f"💾 (후처리) 화자 분리 결과 저장 완료: '{session_id}' ({len(turns)}개 발화)")
+        return True
+    return False
+
+
+def format_diarization(turns):
+    """결과 행 목록을 화면 표시용 텍스트로 만듭니다. (speaker가 없으면 화자 분리 없이 번역만 된 결과)"""
     final_transcript = []
+    current_speaker = None  # ⭐️ 현재 화자를 추적하기 위한 변수
 
-    try:
-        # --- 3. Whisper STT 실행 ---
-        print("🔄 (1/4) 음성 인식(STT) 실행 중...")
-        model = load_whisper_model()
-        result = model.transcribe(audio_data, batch_size=4)
+    for turn in turns:
+        text, translated, speaker = turn['text'], turn['translation'], turn['speaker']
+        if speaker is None:
+            final_transcript.append(f"**[내용]**: {text}\n*({translated})*\n")
+            continue
 
-        # --- 4. 정렬 모델 실행 (단어 타임스탬프) ---
-        print("🔄 (2/4) 타임스탬프 정렬 중...")
-        align_model, metadata = load_align_model()
-        result = whisperx.align(
-            result["segments"],
+        # ⭐️ 화자가 바뀌었는지 확인
+        if speaker != current_speaker:
+            # ⭐️ 화자가 바뀌었으면, 태그와 함께 원문 추가
+            final_transcript.append(f"**{speaker}**: {text}")
+            current_speaker = speaker  # ⭐️ 현재 화자 업데이트
+        else:
+            # ⭐️ 화자가 동일하면, 특수 태그와 함께 원문 추가
+            final_transcript.append(f"**_SAME_SPEAKER_**: {text}")
+
+        # ⭐️ 번역문과 빈 줄 추가
+        final_transcript.append(f"*({translated})*")
+        final_transcript.append("")  # 줄바꿈용 빈 줄
+
+    if not final_transcript:
+        return "[분석 결과] 인식된 텍스트가 없습니다."
+    return "\n".join(final_transcript)
+
+
+# ============================================
+# 🎙️ 메인 분석 함수
+# ============================================
+
+def _transcribe_gaps(audio_window, model, live_segments, gap_min_sec=DIARIZE_GAP_MIN_SEC):
+    """
+    실시간 세그먼트(창 기준 시간)를 그대로 사용하고, 세그먼트가 없는 gap_min_sec 이상 구간만 다시 인식합니다.
+    (whisperx는 자체 VAD로 무음 구간을 건너뛰므로 빈 구간 재인식 비용은 작음)
+    반환: (창 기준 세그먼트 목록, 재인식한 구간 길이 합(초))
+    """
+    window_sec = len(audio_window) / TARGET_SR
+    gaps = []
+    cursor = 0.0
+    for segment in live_segments:
+        if segment['start'] - cursor >= gap_min_sec:
+            gaps.append((cursor, segment['start']))
+        cursor = max(cursor, segment['end'])
+    if window_sec - cursor >= gap_min_sec:
+        gaps.append((cursor, window_sec))
+
+    segments = [dict(segment) for segment in live_segments]
+    for gap_start, gap_end in gaps:
+        gap_audio = audio_window[int(gap_start * TARGET_SR):int(gap_end * TARGET_SR)]
+        result = model.transcribe(gap_audio, batch_size=4)
+        segments += _shift_segments(result["segments"], gap_start)
+
+    segments.sort(key=lambda segment: segment['start'])
+    return segments, sum(end - start for start, end in gaps)
+
+
+def _process_window(audio_window, offset, model, align_model, metadata, diarize_model, live_segments=None):
+    """
+    창 1개: STT → 정렬 → 화자 분리 (메모리에 있는 같은 파형을 pyannote에도 그대로 전달)
+    live_segments: 이 창에 속한 실시간 세그먼트 (녹음 기준 시간) - 있으면 STT 대신 사용
+    """
+    if live_segments:
+        window_end = len(audio_window) / TARGET_SR
+        local = [{
+            'start': segment['start'] - offset,
+            'end': min(segment['end'] - offset, window_end),
+            'text': segment['text']
+        } for segment in live_segments]
+        segments, gap_sec = _transcribe_gaps(audio_window, model, local)
+        print(f"    ♻️ 실시간 세그먼트 {len(local)}개 재사용, 빈 구간 {gap_sec:.0f}초만 다시 인식")
+    else:
+        segments = model.transcribe(audio_window, batch_size=4)["segments"]
+    if segments:
+        segments = whisperx.align(
+            segments,
             align_model,
             metadata,
-            audio_data,
+            audio_window,
             DEVICE,
             return_char_alignments=False
-        )
-
-        # --- 5. 화자 분리 모델 실행 ---
-        print("🔄 (3/4) 화자 분리 실행 중...")
-        diarize_model = load_diarize_model()
-
-        if diarize_model is None:
-            print("⚠️ (3/4) 화자 분리 모델 로드 실패. 일반 번역으로 대체합니다.")
-            for segment in result["segments"]:
-                text = segment.get("text", "").strip()
-                if text:
-                    translated = translate_text(text)
-                    final_transcript.append(f"**[내용]**: {text}\n*({translated})*\n")
-            return "\n".join(final_transcript)
-
-        diarize_result = diarize_model(audio_file)
-
-        print("🔄 (3.5/4) 화자 분리 결과 포맷 변환 중...")
-        diarize_segments = []
+        )["segments"]
+
+    turns = []
+    if diarize_model is not None:
+        diarize_result = diarize_model({
+            'waveform': torch.from_numpy(audio_window).unsqueeze(0),
+            'sample_rate': TARGET_SR
+        })
         for segment, track, speaker in diarize_result.itertracks(yield_label=True):
-            diarize_segments.append({
-                'start': segment.start,
-                'end': segment.end,
+            turns.append({
+                'start': segment.start + offset,
+                'end': segment.end + offset,
                 'speaker': speaker
             })
 
-        if not diarize_segments:
-            print("⚠️ (후처리) 화자 분리 모델이 아무도 감지하지 못했습니다. 일반 번역으로 대체합니다.")
-            for segment in result["segments"]:
-                text = segment.get("text", "").strip()
-                if text:
-                    translated = translate_text(text)
-                    final_transcript.append(f"**[내용]**: {text}\n*({translated})*\n")
-            return "\n".join(final_transcript)
+    return _shift_segments(segments, offset), turns
+
+
+def run_diarization(session_id, use_cache=True, progress_callback=None, return_stats=False):
+    """
+    저장된 .wav 파일을 기반으로 화자 분리 및 번역을 수행합니다.
+    (CPU에서 실행되므로 매우 느립니다)
+    긴 녹음은 겹치는 창 단위로 나누어 처리한 뒤 결과를 이어 붙입니다. (메모리에는 창 하나만 유지)
+    ⭐️ 결과는 DB에 저장되고, 오디오와 모델 설정이 그대로면 다음 요청부터 저장된 결과를 반환합니다.
+    progress_callback(phase, **fields): 단계별 진행 상황 (loading / window / merge / translate)
+    return_stats=True이면 (결과 텍스트, {'cached': 저장된 결과 사용 여부, 'stored': DB에 저장되어 있는지})
+    """
+    stats = {'cached': False, 'stored': False}
+    result_text = _run_diarization(session_id, use_cache, progress_callback, stats)
+    return (result_text, stats) if return_stats else result_text
 
-        diarize_df = pd.DataFrame(diarize_segments)
 
-        # --- 6. STT 결과와 화자 분리 결과 병합 ---
-        print("🔄 (4/4) 화자와 텍스트 병합 중...")
-        final_result = whisperx.assign_word_speakers(diarize_df, result)
+def _run_diarization(session_id, use_cache, progress_callback, stats):
+    started = time.time()
 
-        # --- 7. 결과 포맷팅 및 번역 ---
-        print("✅ 분석 완료. 최종 텍스트 포맷팅 및 번역 중...")
+    def report(phase, **fields):
+        if progress_callback is None:
+            return
+        try:
+            progress_callback(phase, elapsed_sec=round(time.time() - started, 1), **fields)
+        except Exception as e:
+            print(f"⚠️ (후처리) 진행 상황 전송 실패: {e}")
 
-        # ⭐️ [신규] 현재 화자를 추적하기 위한 변수
-        current_speaker = None
+    # --- 1. 오디오 파일 확인 ---
+    output_dir = "wav"
+    audio_file = os.path.join(output_dir, f"{session_id}.wav")
 
-        for segment in final_result["segments"]:
-            speaker = segment.get("speaker", "UNKNOWN")
-            text = segment.get("text", "").strip()
+    if not os.path.exists(audio_file):
+        print(f"❌ (후처리) 오디오 파일 없음: {audio_file}")
+        return f"[오류] 세션 오디오 파일({audio_file})을 찾을 수 없습니다."
 
-            if not text:
-                continue
+    if use_cache:
+        cached = get_cached_diarization(session_id, audio_file)
+        if cached is not None:
+            stats['cached'] = stats['stored'] = True
+            return format_diarization(cached)
 
-            # 각 문장별로 바로 번역 실행
-            translated = translate_text(text)
+    print(f"✅ (후처리) 세션 '{session_id}' 분석 시작... (CPU 사용, 매우 느릴 수 있음)")
 
-            # ⭐️ [수정] 화자가 바뀌었는지 확인
-            if speaker != current_speaker:
-                # ⭐️ 화자가 바뀌었으면, 태그와 함께 원문 추가
-                final_transcript.append(f"**{speaker}**: {text}")
-                current_speaker = speaker  # ⭐️ 현재 화자 업데이트
-            else:
-                # ⭐️ 화자가 동일하면, 특수 태그와 함께 원문 추가
-                final_transcript.append(f"**_SAME_SPEAKER_**: {text}")
+    try:
+        # --- 2. 오디오 열기 (전체를 읽지 않음) ---
+        # (16kHz 모노가 아니면 폴리페이즈 리샘플링 + 다운믹스 후 캐시 - audio_ingest.py)
+        source, sr = load_audio_source(audio_file)
+        duration_sec = len(source) / sr
+        windows = plan_windows(duration_sec)
 
-                # ⭐️ 번역문과 빈 줄 추가 (동일)
-            final_transcript.append(f"*({translated})*")
-            final_transcript.append("")  # 줄바꿈용 빈 줄
+    except Exception as e:
+        print(f"❌ (후처리) 오디오 파일 로드 실패: {e}")
+        return "[오류] 오디오 파일 로드에 실패했습니다."
 
-        if not final_transcript:
-            return "[분석 결과] 인식된 텍스트가 없습니다."
+    try:
+        # --- 3. 모델 준비 ---
+        print("🔄 (1/4) 모델 준비 중...")
+        report('loading')
+        model = load_whisper_model()
+        align_model, metadata = load_align_model()
+        diarize_model = load_diarize_model()
+        if diarize_model is None:
+            print("⚠️ (1/4) 화자 분리 모델 로드 실패. 일반 번역으로 대체합니다.")
+
+        # --- 4. 창별 STT / 정렬 / 화자 분리 ---
+        print(f"🔄 (2/4) 음성 인식 + 정렬 + 화자 분리 실행 중... ({duration_sec:.0f}초, 창 {len(windows)}개)")
+        # ⭐️ [신규] 실시간 세션 세그먼트가 있으면 STT 대신 사용 (없으면 전체 인식)
+        live_segments = get_live_segments(session_id) if DIARIZE_REUSE_LIVE_SEGMENTS else []
+        if live_segments:
+            print(f"♻️ (후처리) 실시간 Whisper 세그먼트 {len(live_segments)}개를 재사용합니다.")
+
+        window_results = []
+        for i, (start_sec, end_sec) in enumerate(windows, start=1):
+            print(f"    창 {i}/{len(windows)}: {start_sec:.0f}초 ~ {end_sec:.0f}초")
+            report('window', index=i, total=len(windows))
+            audio_window = read_window(source, sr, start_sec, end_sec)
+            window_live = [seg for seg in live_segments if start_sec <= seg['start'] < end_sec]
+            segments, turns = _process_window(audio_window, start_sec, model, align_model, metadata, diarize_model,
+                                              window_live)
+            del audio_window  # 다음 창을 읽기 전에 해제
+            window_results.append({'start': start_sec, 'end': end_sec, 'segments': segments, 'turns': turns})
+
+        # --- 5. 창 경계 이어 붙이기 ---
+        print("🔄 (3/4) 창별 결과 병합 중...")
+        report('merge')
+        segments, diarize_segments = stitch_windows(window_results)
 
-        return "\n".join(final_transcript)
+        if not diarize_segments:
+            if diarize_model is not None:
+                print("⚠️ (후처리) 화자 분리 모델이 아무도 감지하지 못했습니다. 일반 번역으로 대체합니다.")
+            turns = [{'start': seg.get("start"), 'end': seg.get("end"), 'speaker': None, 'text': seg["text"].strip()}
+                     for seg in segments if seg.get("text", "").strip()]
+        else:
+            diarize_df = pd.DataFrame(diarize_segments)
+
+            # --- 6. STT 결과와 화자 분리 결과 병합 ---
+            print("🔄 (4/4) 화자와 텍스트 병합 중...")
+            final_result = whisperx.assign_word_speakers(diarize_df, {"segments": segments})
+            turns = [{
+                'start': segment.get("start"),
+                'end': segment.get("end"),
+                'speaker': segment.get("speaker", "UNKNOWN"),
+                'text': segment["text"].strip()
+            } for segment in final_result["segments"] if segment.get("text", "").strip()]
+
+        # --- 7. 번역 (모든 문장을 모은 뒤 한꺼번에, 순서 유지) ---
+        print("✅ 분석 완료. 번역 중...")
+        report('translate', sentences=len(turns))
+        translations = translate_texts([turn['text'] for turn in turns])
+        for turn, translated in zip(turns, translations):
+            turn['translation'] = translated
+
+        # --- 8. 결과 저장 + 포맷팅 ---
+        stats['stored'] = _store_diarization(session_id, audio_file, turns)
+        return format_diarization(turns)
 
     except Exception as e:
         print(f"❌ (후처리) 분석 중 심각한 오류 발생: {e}")
@@ -0,0 +1,218 @@
+import os
+import sys
+import secrets
+import subprocess
+import threading
+import queue
+import traceback
+from multiprocessing.connection import Listener, Client
+
+from config import DIARIZE_PROCESS_THREADS, DIARIZE_CPU_AFFINITY, DIARIZE_PROCESS_NICE
+
+# ============================================
+# 🧮 화자 분리 전용 작업 프로세스
+# ============================================
+# - WhisperX / pyannote / pandas 연산을 웹 서버 + 실시간 캡처가 도는 프로세스 밖에서 실행 (GIL 경쟁 없음)
+#   → 실시간 번역 중에도 지난 회의 분석 가능
+# - 작업 프로세스는 작업이 끝나도 유지되므로 모델은 프로세스마다 1회만 로드 (diarize_handler.model_cache)
+# - 진행 상황/결과는 파이프(multiprocessing.connection)로 서버에 전달
+# - CPU 코어 지정(affinity) / 연산 스레드 수 / 우선순위(nice)로 실시간 번역이 쓸 CPU를 남겨 둠
+# - multiprocessing.Process 대신 별도 인터프리터로 실행: spawn 방식은 app.py를 다시 임포트해서
+#   실시간 Whisper/VAD 모델까지 작업 프로세스에 로드하게 됨
+
+_AUTHKEY_ENV = "DIARIZE_WORKER_AUTHKEY"
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+class DiarizationWorkerError(Exception):
+    """작업 프로세스가 비정상 종료되었거나 분석 중 예외가 발생했을 때"""
+
+
+# --- 서버 쪽 ---
+class DiarizationProcess:
+    """작업 프로세스 1개 (처음 작업을 받을 때 시작, 비정상 종료/취소 후에는 다음 작업 때 다시 시작)"""
+
+    def __init__(self, name="diarize-worker"):
+        self.name = name
+        self._proc = None
+        self._conn = None
+
+    def _start(self):
+        authkey = secrets.token_bytes(32)
+        listener = Listener(authkey=authkey)  # Windows: named pipe, 그 외: Unix 소켓
+        env = dict(os.environ, **{_AUTHKEY_ENV: authkey.hex()})
+        script = os.path.abspath(__file__)
+        print(f"🔄 [{self.name}] 화자 분리 작업 프로세스 시작...")
+        proc = subprocess.Popen([sys.executable, script, str(listener.address)], env=env)
+
+        # 프로세스가 접속 전에 죽으면 accept()가 끝나지 않으므로, 직접 접속해서 깨움
+        connected = threading.Event()
+
+        def unblock_if_dead():
+            proc.wait()
+            if not connected.is_set():
+                try:
+                    Client(listener.address, authkey=authkey).close()
+                except Exception:
+                    pass
+
+        threading.Thread(target=unblock_if_dead, name=f"{self.name}-watch", daemon=True).start()
+        try:
+            conn = listener.accept()
+            connected.set()
+        finally:
+            listener.close()
+
+        if proc.poll() is not None:
+            conn.close()
+            raise DiarizationWorkerError(f"작업 프로세스 시작 실패 (exitcode={proc.returncode})")
+        self._proc, self._conn = proc, conn
+        print(f"✅ [{self.name}] 작업 프로세스 연결 완료 (pid={proc.pid})")
+
+    def _alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def run(self, session_id, use_cache=True, progress_callback=None, cancel_event=None, poll_sec=0.5):
+        """
+        작업 프로세스에서 diarize_handler.run_diarization을 실행하고 (결과 텍스트, 통계)를 반환합니다.
+        cancel_event가 설정되면 프로세스를 종료하고 None을 반환합니다. (실행 중인 모델 연산도 즉시 중단)
+        """
+        if not self._alive():
+            self._start()
+        try:
+            self._conn.send((session_id, use_cache))
+        except OSError:  # 대기 중에 프로세스가 종료된 경우 1회 재시작
+            self.terminate()
+            self._start()
+            self._conn.send((session_id, use_cache))
+
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                print(f"🛑 [{self.name}] 작업 취소: 작업 프로세스를 종료합니다. (다음 작업 때 모델 다시 로드)")
+                self.terminate()
+                return None
+            try:
+                if not self._conn.poll(poll_sec):
+                    if not self._alive():
+                        raise EOFError
+                    continue
+                kind, payload = self._conn.recv()
+            except (EOFError, OSError):
+                try:
+                    exitcode = self._proc.wait(timeout=1.0)
+                except subprocess.TimeoutExpired:
+                    exitcode = None
+                self.terminate()
+                raise DiarizationWorkerError(f"작업 프로세스가 비정상 종료되었습니다. (exitcode={exitcode})")
+
+            if kind == 'progress':
+                if progress_callback is not None:
+                    try:
+                        progress_callback(payload)
+                    except Exception as e:
+                        print(f"⚠️ [{self.name}] 진행 상황 전송 실패: {e}")
+            elif kind == 'result':
+                return payload
+            else:
+                raise DiarizationWorkerError(payload)
+
+    def terminate(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._proc is not None:
+            if self._proc.poll() is None:
+                self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+
+    def close(self, timeout=None):
+        """종료 신호를 보내고 기다린 뒤, 끝나지 않으면 강제 종료합니다."""
+        if self._alive():
+            try:
+                self._conn.send(None)
+                self._proc.wait(timeout=timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self.terminate()
+
+
+class DiarizationProcessPool:
+    """작업 프로세스 size개를 재사용하는 풀 (스케줄러의 화자 분리 작업 스레드 수와 같게 설정)"""
+
+    def __init__(self, size=1):
+        self._workers = [DiarizationProcess(f"diarize-worker-{i}") for i in range(max(1, size))]
+        self._idle = queue.Queue()
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    def run(self, session_id, use_cache=True, progress_callback=None, cancel_event=None):
+        worker = self._idle.get()
+        try:
+            return worker.run(session_id, use_cache, progress_callback, cancel_event)
+        finally:
+            self._idle.put(worker)
+
+    def close(self, timeout=None):
+        for worker in self._workers:
+            worker.close(timeout)
+
+
+# --- 작업 프로세스 쪽 ---
+def _configure_process(num_threads, cpu_affinity, nice):
+    """torch 등을 임포트하기 전에 호출 (연산 스레드 풀 크기는 임포트 시점에 결정됨)"""
+    if num_threads:
+        for name in _THREAD_ENV_VARS:
+            os.environ[name] = str(num_threads)
+    if cpu_affinity:
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, set(cpu_affinity))
+            except OSError as e:
+                print(f"⚠️ [diarize-worker] CPU 코어 지정 실패 ({cpu_affinity}): {e}")
+        else:
+            print("⚠️ [diarize-worker] 이 OS에서는 CPU 코어 지정을 지원하지 않습니다.")
+    if nice and hasattr(os, "nice"):  # (Windows 제외)
+        try:
+            os.nice(nice)
+        except OSError as e:
+            print(f"⚠️ [diarize-worker] 우선순위 변경 실패: {e}")
+
+
+def _worker_main(address):
+    conn = Client(address, authkey=bytes.fromhex(os.environ.pop(_AUTHKEY_ENV)))
+    _configure_process(DIARIZE_PROCESS_THREADS, DIARIZE_CPU_AFFINITY, DIARIZE_PROCESS_NICE)
+
+    import torch
+    if DIARIZE_PROCESS_THREADS:
+        torch.set_num_threads(DIARIZE_PROCESS_THREADS)
+    import diarize_handler
+    print(f"✅ [diarize-worker] 준비 완료 (pid={os.getpid()}, 스레드 {DIARIZE_PROCESS_THREADS or '기본값'}, "
+          f"CPU {DIARIZE_CPU_AFFINITY or '전체'})")
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:  # 서버 종료
+            break
+        if message is None:
+            break
+
+        session_id, use_cache = message
+
+        def report(phase, **fields):
+            conn.send(('progress', {'phase': phase, **fields}))
+
+        try:
+            result = diarize_handler.run_diarization(session_id, use_cache=use_cache, progress_callback=report,
+                                                     return_stats=True)
+            conn.send(('result', result))
+        except Exception as e:
+            traceback.print_exc()
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    _worker_main(sys.argv[1])
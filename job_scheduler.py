@@ -0,0 +1,251 @@
+import itertools
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+
+# ============================================
+# 🗂️ 백그라운드 작업 스케줄러 (요약 / 화자 분리)
+# ============================================
+# - 작업 종류(kind)별로 고정된 수의 작업 스레드와 크기 제한 우선순위 큐를 둠
+#   (요약 버튼을 여러 번 눌러도 KoBART 생성이 동시에 여러 개 돌지 않음)
+# - 같은 종류 + 같은 key(세션/파라미터)의 작업이 대기/실행 중이면 새 작업을 만들지 않고 합침(coalescing)
+# - 작업마다 상태/구독자(결과를 받을 클라이언트)/취소 신호를 가짐
+
+# --- 작업 상태 ---
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+FINISHED_STATUSES = (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+
+# --- 우선순위 (숫자가 작을수록 먼저 실행) ---
+PRIORITY_HIGH = 0  # 사용자가 화면에서 기다리는 작업
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20  # 미리 계산해 두는 작업 등
+
+_STOP = object()  # 작업 스레드 종료 신호
+
+
+class JobQueueFull(Exception):
+    """해당 종류의 대기열이 가득 차서 작업을 받을 수 없을 때 발생"""
+
+
+class Job:
+    """스케줄러에 등록된 작업 1개. func(job, *args)로 실행됩니다."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, kind, key, func, args, priority):
+        self.job_id = f"{kind}-{next(Job._ids)}"
+        self.kind = kind
+        self.key = key
+        self.func = func
+        self.args = args
+        self.priority = priority
+        self.status = STATUS_QUEUED
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()  # 실행 중인 작업이 주기적으로 확인
+        self.subscribers = set()  # 결과를 받을 클라이언트(sid) 목록
+        self.done_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def wait(self, timeout=None):
+        return self.done_event.wait(timeout)
+
+    def snapshot(self):
+        now = time.time()
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'key': list(self.key) if isinstance(self.key, tuple) else self.key,
+            'priority': self.priority,
+            'status': self.status,
+            'error': str(self.error) if self.error else None,
+            'subscribers': len(self.subscribers),
+            'wait_sec': round((self.started_at or now) - self.created_at, 2),
+            'run_sec': round((self.finished_at or now) - self.started_at, 2) if self.started_at else 0.0,
+        }
+
+
+class JobScheduler:
+    """
+    kinds: {종류: (작업 스레드 수, 대기열 최대 크기)}
+    on_update(job): 작업 상태가 바뀔 때마다 호출 (예: 클라이언트에 상태 전송)
+    """
+
+    def __init__(self, kinds, on_update=None, history_size=50):
+        self.on_update = on_update
+        self._lock = threading.Lock()
+        self._jobs = {}  # job_id -> Job (대기/실행 중)
+        self._active_by_key = {}  # (kind, key) -> Job (coalescing용)
+        self._history = deque(maxlen=history_size)  # 끝난 작업 (상태 조회용)
+        self._queues = {}
+        self._maxsize = {}
+        self._workers = []
+        self._seq = itertools.count()  # 같은 우선순위는 먼저 들어온 순서대로
+
+        for kind, (num_workers, maxsize) in kinds.items():
+            self._queues[kind] = queue.PriorityQueue()
+            self._maxsize[kind] = maxsize
+            for i in range(max(1, num_workers)):
+                worker = threading.Thread(target=self._run, args=(kind,), name=f"job-{kind}-{i}", daemon=True)
+                worker.start()
+                self._workers.append((kind, worker))
+
+    # --- 등록 / 취소 ---
+    def submit(self, kind, key, func, args=(), priority=PRIORITY_NORMAL, subscriber=None):
+        """
+        작업을 등록하고 (job, 새로 만들었는지)를 반환합니다.
+        같은 kind + key 작업이 이미 대기/실행 중이면 그 작업에 구독자만 추가합니다.
+        대기열이 가득 차면 JobQueueFull 예외가 발생합니다.
+        """
+        if kind not in self._queues:
+            raise ValueError(f"알 수 없는 작업 종류: {kind}")
+
+        with self._lock:
+            existing = self._active_by_key.get((kind, key))
+            if existing is not None and not existing.cancelled:
+                if subscriber is not None:
+                    existing.subscribers.add(subscriber)
+                if priority < existing.priority and existing.status == STATUS_QUEUED:
+                    # 더 급한 요청이 합쳐지면 우선순위를 올려서 다시 넣음 (이전 항목은 꺼낼 때 무시됨)
+                    existing.priority = priority
+                    self._queues[kind].put((priority, next(self._seq), existing))
+                return existing, False
+
+            queued = sum(1 for job in self._jobs.values() if job.kind == kind and job.status == STATUS_QUEUED)
+            if self._maxsize[kind] and queued >= self._maxsize[kind]:
+                raise JobQueueFull(f"'{kind}' 작업 대기열이 가득 찼습니다. ({queued}개 대기 중)")
+
+            job = Job(kind, key, func, args, priority)
+            if subscriber is not None:
+                job.subscribers.add(subscriber)
+            self._jobs[job.job_id] = job
+            self._active_by_key[(kind, key)] = job
+            self._queues[kind].put((priority, next(self._seq), job))
+
+        print(f"🗂️ [Job] 등록: {job.job_id} (key={key}, 우선순위={priority})")
+        self._notify(job)
+        return job, True
+
+    def cancel(self, job_id):
+        """
+        작업을 취소합니다. 대기 중이면 바로 취소되고, 실행 중이면 취소 신호만 보냅니다.
+        (실행 중인 작업은 job.cancel_event를 확인하는 지점에서 중단됨)
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return False
+            job.cancel_event.set()
+            self._active_by_key.pop((job.kind, job.key), None)  # 이후 같은 요청은 새 작업으로
+            if job.status == STATUS_QUEUED:
+                self._finish_locked(job, STATUS_CANCELLED)
+        print(f"🛑 [Job] 취소 요청: {job_id}")
+        if job.status == STATUS_CANCELLED:
+            self._notify(job)
+        return True
+
+    def unsubscribe(self, job_id, subscriber, cancel_if_unused=True):
+        """구독자를 제거하고, 남은 구독자가 없으면 작업을 취소합니다. (취소했으면 True)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job.subscribers.discard(subscriber)
+            unused = not job.subscribers
+        if unused and cancel_if_unused:
+            return self.cancel(job_id)
+        return False
+
+    # --- 조회 ---
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = next((j for j in self._history if j.job_id == job_id), None)
+            return job.snapshot() if job else None
+
+    def list_jobs(self, kind=None, include_finished=False):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            if include_finished:
+                jobs += list(self._history)
+        return [job.snapshot() for job in jobs if kind is None or job.kind == kind]
+
+    def subscribers(self, job):
+        """작업 구독자 목록 사본 (전송 중에 구독자가 바뀌어도 안전)"""
+        with self._lock:
+            return list(job.subscribers)
+
+    # --- 종료 ---
+    def shutdown(self, cancel_pending=True, timeout=None):
+        if cancel_pending:
+            for job_id in [j['job_id'] for j in self.list_jobs()]:
+                self.cancel(job_id)
+        for kind, _ in self._workers:
+            self._queues[kind].put((float("inf"), next(self._seq), _STOP))
+        for _, worker in self._workers:
+            worker.join(timeout=timeout)
+
+    # --- 내부 ---
+    def _finish_locked(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        self._jobs.pop(job.job_id, None)
+        if self._active_by_key.get((job.kind, job.key)) is job:
+            self._active_by_key.pop((job.kind, job.key), None)
+        self._history.append(job)
+        job.done_event.set()
+
+    def _notify(self, job):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(job)
+        except Exception as e:
+            print(f"⚠️ [Job] 상태 전송 실패 ({job.job_id}): {e}")
+
+    def _run(self, kind):
+        jobs_queue = self._queues[kind]
+        while True:
+            _, _, job = jobs_queue.get()
+            if job is _STOP:
+                break
+
+            with self._lock:
+                # 이미 취소됐거나, 우선순위 변경으로 중복 등록된 항목은 건너뜀
+                if job.status != STATUS_QUEUED:
+                    continue
+                job.status = STATUS_RUNNING
+                job.started_at = time.time()
+            print(f"▶️ [Job] 실행: {job.job_id} (대기 {job.started_at - job.created_at:.2f}초)")
+            self._notify(job)
+
+            status, error = STATUS_DONE, None
+            try:
+                job.result = job.func(job, *job.args)
+                if job.cancelled:
+                    status = STATUS_CANCELLED
+            except Exception as e:
+                status = STATUS_CANCELLED if job.cancelled else STATUS_FAILED
+                error = None if job.cancelled else e
+                if error is not None:
+                    print(f"⚠️ [Job] 실행 오류 ({job.job_id}): {e}")
+                    traceback.print_exc()
+
+            with self._lock:
+                self._finish_locked(job, status, error)
+            print(f"✅ [Job] 종료: {job.job_id} ({status}, {job.finished_at - job.started_at:.2f}초)")
+            self._notify(job)
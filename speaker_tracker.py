@@ -0,0 +1,107 @@
+import threading
+import numpy as np
+
+from config import (
+    HF_TOKEN,
+    RATE,
+    LIVE_SPEAKER_EMBEDDING_MODEL,
+    LIVE_SPEAKER_SIMILARITY,
+    LIVE_SPEAKER_MIN_SEC,
+    LIVE_SPEAKER_MAX_SPEAKERS
+)
+
+# ============================================
+# 🗣️ 실시간 화자 구분 (발화 단위 화자 임베딩 + 점진적 군집화)
+# ============================================
+# - 발화(utterance)가 끝날 때마다 화자 임베딩을 1회 계산
+# - 지금까지 등장한 화자별 평균 임베딩(centroid)과 코사인 유사도 비교
+#   → 가장 가까운 화자가 기준(LIVE_SPEAKER_SIMILARITY) 이상이면 그 화자, 아니면 새 화자
+# - 세션이 끝난 뒤의 pyannote 화자 분리보다 정확도는 낮지만 지연 없이 "누가 말했는지" 표시 가능
+
+_embedding_model = None
+_embedding_lock = threading.Lock()
+_embedding_failed = False
+
+
+def load_embedding_model():
+    """pyannote 화자 임베딩 모델을 (최초 1회) 로드합니다. 실패하면 None"""
+    global _embedding_model, _embedding_failed
+    with _embedding_lock:
+        if _embedding_model is None and not _embedding_failed:
+            print(f"🔄 (실시간 화자 구분) 화자 임베딩 모델 로드 중... ({LIVE_SPEAKER_EMBEDDING_MODEL})")
+            try:
+                from pyannote.audio import Model, Inference
+                model = Model.from_pretrained(LIVE_SPEAKER_EMBEDDING_MODEL, use_auth_token=HF_TOKEN)
+                # window="whole": 발화 전체에서 임베딩 1개
+                _embedding_model = Inference(model, window="whole")
+                print("✅ (실시간 화자 구분) 화자 임베딩 모델 로드 완료.")
+            except Exception as e:
+                print(f"⚠️ (실시간 화자 구분) 화자 임베딩 모델 로드 실패, 화자 표시 없이 진행합니다: {e}")
+                _embedding_failed = True
+        return _embedding_model
+
+
+def _speaker_label(index):
+    # 후처리 화자 분리(pyannote)와 같은 형식
+    return f"SPEAKER_{index:02d}"
+
+
+class OnlineSpeakerTracker:
+    """세션 1개 동안의 화자 군집 상태 (세션마다 새로 생성)"""
+
+    def __init__(self, similarity=LIVE_SPEAKER_SIMILARITY, min_sec=LIVE_SPEAKER_MIN_SEC,
+                 max_speakers=LIVE_SPEAKER_MAX_SPEAKERS, rate=RATE):
+        self.similarity = similarity
+        self.min_samples = int(min_sec * rate)
+        self.max_speakers = max(1, max_speakers)
+        self.rate = rate
+        self._sums = []  # 화자별 정규화 임베딩 합 (평균 방향 = centroid)
+        self._counts = []
+        self.last_label = None
+
+    def embed(self, audio_int16):
+        """int16 발화 오디오의 정규화된 화자 임베딩 (모델이 없으면 None)"""
+        model = load_embedding_model()
+        if model is None:
+            return None
+        import torch
+        waveform = torch.from_numpy(audio_int16.reshape(1, -1).astype(np.float32) / 32768.0)
+        embedding = np.asarray(model({'waveform': waveform, 'sample_rate': self.rate}), dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(embedding)
+        if not np.isfinite(norm) or norm == 0:
+            return None
+        return embedding / norm
+
+    def assign(self, audio_int16):
+        """발화 1개의 화자 라벨을 반환합니다. (판단할 수 없으면 직전 화자 또는 None)"""
+        if len(audio_int16) < self.min_samples:
+            # 너무 짧은 발화("네", "음")는 임베딩이 불안정하므로 직전 화자로 간주
+            return self.last_label
+
+        embedding = self.embed(audio_int16)
+        if embedding is None:
+            return self.last_label
+
+        index = None
+        if self._sums:
+            centroids = np.stack(self._sums)
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+            scores = centroids @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity or len(self._sums) >= self.max_speakers:
+                index = best
+
+        if index is None:
+            index = len(self._sums)
+            self._sums.append(embedding.copy())
+            self._counts.append(1)
+            print(f"🗣️ (실시간 화자 구분) 새 화자 감지: {_speaker_label(index)}")
+        else:
+            self._sums[index] += embedding
+            self._counts[index] += 1
+
+        self.last_label = _speaker_label(index)
+        return self.last_label
+
+    def stats(self):
+        return {_speaker_label(i): count for i, count in enumerate(self._counts)}
@@ -0,0 +1,215 @@
+import queue
+import threading
+import time
+import traceback
+
+# ============================================
+# 🔗 단계별 작업자(Stage) 파이프라인
+# ============================================
+# 캡처 → VAD/발화 분할 → STT → 번역 → 전송/저장 을 각각 별도 스레드로 분리하고,
+# 단계 사이를 크기 제한 큐로 연결합니다. (번역 지연이 음성 인식을 막지 않도록)
+
+# --- 큐가 가득 찼을 때의 정책 ---
+POLICY_BLOCK = "block"  # 빈 자리가 날 때까지 대기 (앞 단계로 역압 전달)
+POLICY_DROP_OLDEST = "drop_oldest"  # 가장 오래된 항목을 버리고 새 항목 추가
+POLICY_DROP_NEWEST = "drop_newest"  # 새 항목을 버림
+
+_POLL_SEC = 0.1  # 입력 큐가 비어 있을 때 종료 요청을 확인하는 간격
+
+
+class StageStats:
+    """단계별 처리량/지연 카운터 (스레드 안전)"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.processed = 0
+            self.dropped = 0
+            self.errors = 0
+            self.total_wait = 0.0  # 큐 대기 시간 합
+            self.total_work = 0.0  # 처리 시간 합
+            self.max_work = 0.0
+
+    def record(self, wait_sec, work_sec):
+        with self._lock:
+            self.processed += 1
+            self.total_wait += wait_sec
+            self.total_work += work_sec
+            self.max_work = max(self.max_work, work_sec)
+
+    def record_drop(self, count=1):
+        with self._lock:
+            self.dropped += count
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            n = self.processed or 1
+            return {
+                'stage': self.name,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'avg_wait_ms': round(1000 * self.total_wait / n, 1),
+                'avg_work_ms': round(1000 * self.total_work / n, 1),
+                'max_work_ms': round(1000 * self.max_work, 1),
+            }
+
+
+class PipelineStage:
+    """
+    크기 제한 입력 큐와 작업 스레드 1개로 구성된 파이프라인 단계.
+    handler(item)은 다음 단계로 넘길 항목들의 리스트(또는 None)를 반환합니다.
+    작업 스레드가 1개이므로 항목 순서가 보장됩니다.
+    """
+
+    def __init__(self, name, handler, maxsize=0, policy=POLICY_BLOCK, output=None):
+        if policy not in (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_DROP_NEWEST):
+            raise ValueError(f"알 수 없는 큐 정책: {policy}")
+        self.name = name
+        self.handler = handler
+        self.policy = policy
+        self.output = output  # 다음 PipelineStage (없으면 마지막 단계)
+        self.stats = StageStats(name)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        # ⭐️ [수정] 종료 신호는 큐 대신 이벤트로 전달 (큐가 가득 차도 stop()이 막히지 않음)
+        self._stopping = threading.Event()  # 남은 항목을 모두 처리한 뒤 종료
+        self._aborting = threading.Event()  # 제한 시간 초과: 현재 항목만 끝내고 종료
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def put(self, item):
+        """정책에 따라 항목을 입력 큐에 넣습니다. (넣었으면 True)"""
+        entry = (time.perf_counter(), item)
+        if self.policy == POLICY_BLOCK:
+            self._queue.put(entry)
+            return True
+
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            pass
+
+        if self.policy == POLICY_DROP_NEWEST:
+            self.stats.record_drop()
+            print(f"⚠️ [Pipeline:{self.name}] 큐가 가득 차 새 항목을 버립니다.")
+            return False
+
+        # POLICY_DROP_OLDEST
+        try:
+            self._queue.get_nowait()
+            self.stats.record_drop()
+            print(f"⚠️ [Pipeline:{self.name}] 큐가 가득 차 가장 오래된 항목을 버립니다.")
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.stats.record_drop()
+            return False
+
+    def start(self):
+        self._stopping.clear()
+        self._aborting.clear()
+        self._thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        큐에 남은 항목을 모두 처리한 뒤 종료합니다.
+        timeout 안에 끝나지 않으면 남은 항목을 버리고(dropped로 집계) 현재 항목만 처리한 뒤 끝나도록 합니다.
+        """
+        if self._thread is None:
+            return True
+        self._stopping.set()
+        self._thread.join(timeout=timeout)
+        if not self._thread.is_alive():
+            self._thread = None
+            return True
+
+        self._aborting.set()
+        discarded = 0
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            discarded += 1
+        if discarded:
+            self.stats.record_drop(discarded)
+            print(f"⚠️ [Pipeline:{self.name}] 종료 제한 시간 초과로 남은 {discarded}개 항목을 버립니다.")
+        return False
+
+    def _run(self):
+        while not self._aborting.is_set():
+            try:
+                enqueued_at, item = self._queue.get(timeout=_POLL_SEC)
+            except queue.Empty:
+                if self._stopping.is_set():  # 남은 항목을 모두 처리함
+                    break
+                continue
+
+            started_at = time.perf_counter()
+            try:
+                results = self.handler(item)
+            except Exception as e:
+                self.stats.record_error()
+                print(f"⚠️ [Pipeline:{self.name}] 처리 오류: {e}")
+                traceback.print_exc()
+                results = None
+            finished_at = time.perf_counter()
+            self.stats.record(started_at - enqueued_at, finished_at - started_at)
+
+            if results and self.output is not None:
+                if self._aborting.is_set():
+                    # 제한 시간 초과 후 끝난 항목: 다음 단계가 이미 종료되었을 수 있으므로 전달하지 않고 집계
+                    self.stats.record_drop(len(results))
+                    print(f"⚠️ [Pipeline:{self.name}] 종료 제한 시간 이후 처리된 {len(results)}개 결과를 버립니다.")
+                    continue
+                for result in results:
+                    self.output.put(result)
+
+
+class StreamingPipeline:
+    """여러 PipelineStage를 순서대로 연결하고 함께 시작/종료합니다."""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        for upstream, downstream in zip(self.stages, self.stages[1:]):
+            upstream.output = downstream
+
+    def start(self):
+        # 뒤쪽 단계부터 시작해야 앞 단계 결과를 바로 받을 수 있음
+        for stage in reversed(self.stages):
+            stage.start()
+
+    def put(self, item):
+        return self.stages[0].put(item)
+
+    def stop(self, timeout_per_stage=None):
+        """
+        앞 단계부터 차례로 남은 항목을 비우고(drain) 종료합니다.
+        timeout_per_stage: 단계마다 따로 주는 제한 시간 (앞 단계가 오래 걸려도 뒤 단계 시간이 줄지 않음)
+        마지막 단계(전송/저장)는 제한 없이 끝까지 비움 - 앞 단계를 통과한 결과가 저장되지 않고 버려지지 않도록
+        """
+        all_stopped = True
+        for index, stage in enumerate(self.stages):
+            is_last = index == len(self.stages) - 1
+            if not stage.stop(timeout=None if is_last else timeout_per_stage):
+                print(f"⚠️ [Pipeline:{stage.name}] 제한 시간 내에 종료되지 않았습니다.")
+                all_stopped = False
+        return all_stopped
+
+    def stats(self):
+        return [stage.stats.snapshot() for stage in self.stages]
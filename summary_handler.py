@@ -1,103 +1,562 @@
 import torch
 import traceback
 import threading
-from transformers import PreTrainedTokenizerFast, BartForConditionalGeneration
-from db_handler import fetch_data_from_db
-from config import KOBART_MODEL_NAME
+from transformers import PreTrainedTokenizerFast, BartForConditionalGeneration, StoppingCriteria, \
+    StoppingCriteriaList, LogitsProcessor, LogitsProcessorList
+from db_handler import fetch_data_from_db, get_cached_summaries, put_cached_summary
+from config import KOBART_MODEL_NAME, SUMMARY_CACHE_ENABLED, SUMMARY_BATCH_SIZE, KOBART_BACKEND, \
+    KOBART_ONNX_DIR, KOBART_PARITY_CHECK, KOBART_PARITY_MIN_SIMILARITY, SUMMARY_REDUCE_GROUP_TOKENS, \
+    SUMMARY_PARALLEL_WORKERS
 import math
+import bisect
+import hashlib
+import json
+import time
+import os
+import difflib
+from concurrent.futures import ThreadPoolExecutor
 
 # --- KoBART 모델 상태 변수 ---
 kobart_model = None
 kobart_tokenizer = None
 kobart_loading = False
+kobart_backend = None  # ⭐️ 실제로 사용 중인 백엔드 ("torch", "torch_int8", "onnx")
 latest_summary = "[요약은 '요약 보기'를 누르세요]"
 DEVICE = "cpu"  # ⭐️ KoBART는 CPU로 실행 (VRAM 부족)
 
+# ⭐️ [신규] 생성 파라미터 (요약 캐시 키에도 포함되므로 바꾸면 캐시가 자동으로 무효화됨)
+MAX_INPUT_TOKENS = 1024  # 모델의 최대 입력 길이
+GENERATION_PARAMS = {
+    "num_beams": 4,
+    "early_stopping": True,
+    "no_repeat_ngram_size": 2
+}
+FAILED_CHUNK_SUMMARY = "[요약 조각 생성 실패]"
+
+
+class SummaryCancelled(Exception):
+    """요약 도중 취소 요청(cancel_event)이 들어왔을 때 발생"""
+
+
+# ⭐️ [신규] generate() 도중에도 취소 요청을 확인 (다음 토큰 생성 전에 중단)
+class _CancelCriteria(StoppingCriteria):
+    def __init__(self, cancel_event):
+        self.cancel_event = cancel_event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.cancel_event.is_set()
+
+
+# ⭐️ [신규] 배치의 각 청크마다 자기 min_length까지 </s>를 막음
+# (배치 최솟값 하나를 쓰면 짧은 청크 때문에 긴 청크 요약까지 짧아짐)
+class _RowMinLengthProcessor(LogitsProcessor):
+    def __init__(self, min_lengths, eos_token_id, num_beams=1):
+        self.min_lengths = min_lengths
+        self.eos_token_id = eos_token_id
+        self.num_beams = num_beams
+
+    def __call__(self, input_ids, scores):
+        cur_len = input_ids.shape[-1]
+        for row in range(scores.shape[0]):  # 빔 서치: 행 = 청크 수 x num_beams
+            if cur_len < self.min_lengths[row // self.num_beams]:
+                scores[row, self.eos_token_id] = -float("inf")
+        return scores
+
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise SummaryCancelled()
+
 
 # -----------------------------
 
+def _load_torch_model():
+    model = BartForConditionalGeneration.from_pretrained(
+        KOBART_MODEL_NAME,
+        ignore_mismatched_sizes=True
+    )
+    model.to(DEVICE)  # ⭐️ CPU로 설정
+    model.eval()
+    return model
+
+
+# ⭐️ [신규] 추론 백엔드 로드 (실패 시 fp32 torch로 대체)
+def _load_backend_model(backend):
+    """반환: (model, 실제 백엔드 이름)"""
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            if os.path.isdir(KOBART_ONNX_DIR):
+                model = ORTModelForSeq2SeqLM.from_pretrained(KOBART_ONNX_DIR)
+            else:
+                print(f"🔄 KoBART ONNX 변환 중... (최초 1회, 저장 위치: {KOBART_ONNX_DIR})")
+                model = ORTModelForSeq2SeqLM.from_pretrained(KOBART_MODEL_NAME, export=True)
+                model.save_pretrained(KOBART_ONNX_DIR)
+            return model, "onnx"
+        except ImportError:
+            print("⚠️ optimum[onnxruntime]이 설치되지 않아 torch 백엔드로 대체합니다.")
+        except Exception as e:
+            print(f"⚠️ ONNX 백엔드 로드 실패, torch 백엔드로 대체합니다: {e}")
+        return _load_torch_model(), "torch"
+
+    model = _load_torch_model()
+    if backend == "torch_int8":
+        try:
+            # Linear 층 가중치만 int8로 (활성값은 실행 시 동적으로 양자화)
+            quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            return quantized, "torch_int8"
+        except Exception as e:
+            print(f"⚠️ int8 양자화 실패, fp32로 실행합니다: {e}")
+    elif backend != "torch":
+        print(f"⚠️ 알 수 없는 KOBART_BACKEND '{backend}', fp32 torch로 실행합니다.")
+    return model, "torch"
+
+
 def load_kobart_model():
     """KoBART 모델을 메모리로 로드합니다."""
-    global kobart_model, kobart_tokenizer, kobart_loading, latest_summary, DEVICE
+    global kobart_model, kobart_tokenizer, kobart_loading, kobart_backend, latest_summary, DEVICE
     if kobart_model is None and not kobart_loading:
         kobart_loading = True
         latest_summary = "[KoBART 모델 로드 중...]"  # 상태 업데이트
 
         # ⭐️ (VRAM 2GB로는 GPU 가속 실패)
         DEVICE = "cpu"
-        print(f"🔄 KoBART 모델 로드 중... (Device: {DEVICE})")
+        print(f"🔄 KoBART 모델 로드 중... (Device: {DEVICE}, 백엔드: {KOBART_BACKEND})")
 
         try:
             kobart_tokenizer = PreTrainedTokenizerFast.from_pretrained(
                 KOBART_MODEL_NAME,
                 ignore_mismatched_sizes=True
             )
-            kobart_model = BartForConditionalGeneration.from_pretrained(
-                KOBART_MODEL_NAME,
-                ignore_mismatched_sizes=True
-            )
-            kobart_model.to(DEVICE)  # ⭐️ CPU로 설정
-
-            print(f"✅ KoBART 모델 로드 완료. (Device: {DEVICE})")
+            model, backend = _load_backend_model(KOBART_BACKEND)
+            # ⭐️ [수정] 비교 검사는 모델을 공개(kobart_model 설정)하기 전에 실행
+            # → 요청이 검증되지 않은 모델을 쓰거나, 처리 도중 모델이 바뀌는 일이 없음
+            if KOBART_PARITY_CHECK and backend != "torch":
+                model, backend = _verified_backend_model(model, backend)
+            kobart_model, kobart_backend = model, backend
+
+            print(f"✅ KoBART 모델 로드 완료. (Device: {DEVICE}, 백엔드: {kobart_backend})")
             latest_summary = "[모델 로드 완료. 요약 버튼을 다시 눌러주세요]"
-            return True
         except Exception as e:
             print(f"⚠️ KoBART 모델 로드 실패: {e}")
             kobart_model = None
             kobart_tokenizer = None
+            kobart_backend = None
             latest_summary = "[모델 로드 실패. 관리자에게 문의하세요]"
             return False
         finally:
             kobart_loading = False
+        return True
 
 
-# ⭐️ 헬퍼 함수: 실제 요약 실행기 (파라미터화)
-def _summarize_internal(text_chunk, max_gen_len=150, min_gen_len=30):
-    """주어진 텍스트 조각(chunk)을 지정된 길이로 요약합니다."""
-    global kobart_tokenizer, kobart_model, DEVICE
-
+# ⭐️ [신규] 비교 검사를 통과한 백엔드만 사용 (통과하지 못하거나 검사 중 오류가 나면 fp32 torch로 대체)
+def _verified_backend_model(model, backend):
+    """반환: (사용할 model, 백엔드 이름) - 검사에 쓴 fp32 모델을 그대로 대체 모델로 사용"""
+    reference = _load_torch_model()
     try:
-        # <s>, </s> 태그 추가
-        text_with_tags = '<s>' + text_chunk + '</s>'
-
-        inputs = kobart_tokenizer(
-            text_with_tags,
-            return_tensors="pt",
-            max_length=1024,  # ⭐️ 모델의 최대 입력 길이
-            truncation=True,
-            padding="max_length"
-        )
+        report = check_backend_parity(model=model, backend=backend, reference=reference)
+        if report['passed']:
+            return model, backend
+        print(f"⚠️ 비교 검사를 통과하지 못한 {backend} 백엔드 대신 fp32 torch 백엔드를 사용합니다.")
+    except Exception as e:
+        print(f"⚠️ 백엔드 비교 검사 실패 ({backend}), fp32 torch 백엔드로 전환합니다: {e}")
+        traceback.print_exc()
+    return reference, "torch"
+
+
+# ⭐️ [신규] 길이 인식 인코딩 (padding="max_length" 대신 실제 길이/배치 최장 길이까지만 패딩)
+def _tokenize_ids(texts):
+    """fast tokenizer로 여러 텍스트를 한 번에 토큰 ID 목록으로 변환합니다. (특수 토큰 제외)"""
+    return kobart_tokenizer(list(texts), add_special_tokens=False)['input_ids']
 
-        # ⭐️ 입력 텐서를 모델과 동일한 장치로 이동
-        inputs = {k: v.to(DEVICE) for k, v in inputs.items()}
 
-        summary_ids = kobart_model.generate(
+def _encode_ids(token_id_lists):
+    """
+    미리 토큰화된 ID 목록들에 <s>, </s>를 붙이고 배치 내 가장 긴 길이까지만 패딩합니다.
+    반환: (inputs, input_lengths) - input_lengths는 <s>, </s> 태그를 뺀 청크별 실제 토큰 수
+    """
+    bos_id = kobart_tokenizer.convert_tokens_to_ids('<s>')
+    eos_id = kobart_tokenizer.convert_tokens_to_ids('</s>')
+    pad_id = kobart_tokenizer.pad_token_id if kobart_tokenizer.pad_token_id is not None else eos_id
+
+    # ⭐️ 모델의 최대 입력 길이를 넘으면 잘라냄
+    sequences = [[bos_id] + list(ids[:MAX_INPUT_TOKENS - 2]) + [eos_id] for ids in token_id_lists]
+    longest = max(len(seq) for seq in sequences)
+
+    input_ids = torch.full((len(sequences), longest), pad_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), longest), dtype=torch.long)
+    for row, seq in enumerate(sequences):
+        input_ids[row, :len(seq)] = torch.tensor(seq, dtype=torch.long)
+        attention_mask[row, :len(seq)] = 1
+
+    input_lengths = [max(len(seq) - 2, 1) for seq in sequences]
+
+    # ⭐️ 입력 텐서를 모델과 동일한 장치로 이동
+    inputs = {'input_ids': input_ids.to(DEVICE), 'attention_mask': attention_mask.to(DEVICE)}
+    return inputs, input_lengths
+
+
+def _encode_chunks(text_chunks):
+    """텍스트 청크 목록을 토큰화하고 인코딩합니다. (_encode_ids 참고)"""
+    return _encode_ids(_tokenize_ids(text_chunks))
+
+
+def _generate(inputs, input_lengths, max_gen_len, min_gen_len, model=None, cancel_event=None):
+    """인코딩된 입력으로 요약을 생성합니다. (배치 지원, model 미지정 시 현재 백엔드 모델)"""
+    model = model or kobart_model
+    _check_cancelled(cancel_event)
+    extra_params = {}
+    if cancel_event is not None:
+        extra_params['stopping_criteria'] = StoppingCriteriaList([_CancelCriteria(cancel_event)])
+    # ⭐️ 안전 장치: 원문이 너무 짧은데 min_length가 크면 환각(반복) 발생하므로
+    # 실제 입력 길이보다 길게 요약하라고 강제하지 않음
+    # ⭐️ [수정] 청크별로 계산 (배치 최솟값을 쓰면 짧은 청크 하나가 배치 전체의 min_length를 낮춤)
+    safe_mins = [min(min_gen_len, length) for length in input_lengths]
+    if len(set(safe_mins)) == 1:
+        extra_params['min_length'] = safe_mins[0]
+    else:
+        eos_id = kobart_tokenizer.convert_tokens_to_ids('</s>')
+        extra_params['min_length'] = 0  # 모델 설정의 기본 min_length가 섞이지 않도록
+        extra_params['logits_processor'] = LogitsProcessorList(
+            [_RowMinLengthProcessor(safe_mins, eos_id, GENERATION_PARAMS.get("num_beams", 1))])
+
+    with torch.no_grad():
+        summary_ids = model.generate(
             inputs['input_ids'],
             attention_mask=inputs['attention_mask'],
-            num_beams=4,
             max_length=max_gen_len,  # ⭐️ 가변 길이 적용
-            min_length=min_gen_len,  # ⭐️ 가변 길이 적용
-            early_stopping=True,
-            no_repeat_ngram_size=2
+            **GENERATION_PARAMS,
+            **extra_params
         )
+    _check_cancelled(cancel_event)  # 취소로 중간에 멈춘 결과는 버림
+    return [_clean_summary(raw) for raw in kobart_tokenizer.batch_decode(summary_ids)]
 
-        summary_raw = kobart_tokenizer.decode(summary_ids[0])
-        summary_cleaned = summary_raw.replace('<s>', '').replace('</s>', '').replace('<usr>', '').strip()
 
-        return summary_cleaned
+# ⭐️ 헬퍼 함수: 실제 요약 실행기 (파라미터화)
+def _summarize_internal(text_chunk, max_gen_len=150, min_gen_len=30, token_ids=None, cancel_event=None):
+    """
+    주어진 텍스트 조각(chunk)을 지정된 길이로 요약합니다.
+    token_ids가 주어지면 다시 토큰화하지 않고 그대로 사용합니다.
+    """
+    try:
+        if token_ids is not None:
+            inputs, input_lengths = _encode_ids([token_ids])
+        else:
+            inputs, input_lengths = _encode_chunks([text_chunk])
+        return _generate(inputs, input_lengths, max_gen_len, min_gen_len, cancel_event=cancel_event)[0]
 
+    except SummaryCancelled:
+        raise
     except Exception as e:
         print(f"⚠️ 요약(내부) 중 오류 발생: {e}")
         traceback.print_exc()
-        return "[요약 조각 생성 실패]"
+        return FAILED_CHUNK_SUMMARY
+
+
+def _clean_summary(summary_raw):
+    for tag in ('<s>', '</s>', '<usr>', '<pad>'):
+        summary_raw = summary_raw.replace(tag, '')
+    return summary_raw.strip()
+
+
+# ⭐️ [신규] 여러 청크를 한 번의 generate()로 요약 (배치 내 가장 긴 청크 길이까지만 패딩)
+def _summarize_batch(text_chunks, max_gen_len=150, min_gen_len=30, token_id_lists=None, cancel_event=None):
+    """청크 목록을 한 배치로 요약합니다. 실패하면 청크별 요약으로 대체합니다."""
+    if token_id_lists is None:
+        token_id_lists = [None] * len(text_chunks)
+    if len(text_chunks) == 1:
+        return [_summarize_internal(text_chunks[0], max_gen_len, min_gen_len, token_id_lists[0], cancel_event)]
+
+    try:
+        if all(ids is not None for ids in token_id_lists):
+            inputs, input_lengths = _encode_ids(token_id_lists)
+        else:
+            inputs, input_lengths = _encode_chunks(text_chunks)
+        return _generate(inputs, input_lengths, max_gen_len, min_gen_len, cancel_event=cancel_event)
+
+    except SummaryCancelled:
+        raise
+    except Exception as e:
+        print(f"⚠️ 배치 요약 실패, 청크별로 재시도: {e}")
+        traceback.print_exc()
+        return [_summarize_internal(chunk, max_gen_len, min_gen_len, ids, cancel_event)
+                for chunk, ids in zip(text_chunks, token_id_lists)]
+
+
+# ⭐️ [신규] 요약 캐시 (같은 청크 + 같은 모델/파라미터면 다시 생성하지 않음)
+def _summary_cache_key(text_chunk, max_gen_len, min_gen_len, token_ids=None):
+    # ⭐️ [수정] 토큰 ID가 있으면 모델에 실제로 들어가는 ID로 키를 만듦 (텍스트 재토큰화 결과와 다를 수 있음)
+    payload = json.dumps({
+        "input": {"token_ids": list(token_ids)} if token_ids is not None else {"text": text_chunk},
+        "model": KOBART_MODEL_NAME,
+        "backend": kobart_backend,  # 양자화/ONNX는 fp32와 결과가 조금 다를 수 있음
+        "max_input": MAX_INPUT_TOKENS,
+        "max_length": max_gen_len,
+        "min_length": min_gen_len,
+        **GENERATION_PARAMS
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _summarize_chunks_cached(text_chunks, max_gen_len, min_gen_len, token_id_lists=None,
+                             cancel_event=None, on_result=None):
+    """
+    여러 청크를 같은 길이 설정으로 요약합니다. 캐시에 있는 청크는 건너뛰고,
+    새로 생성한 요약은 캐시에 저장합니다. (입력 순서대로 반환)
+    token_id_lists: 청크별로 미리 토큰화된 ID 목록 (있으면 재토큰화 생략)
+    cancel_event: 설정되면 SummaryCancelled 발생 / on_result(index, summary): 청크 요약이 준비될 때마다 호출
+    """
+    if token_id_lists is None:
+        token_id_lists = [None] * len(text_chunks)
+
+    if SUMMARY_CACHE_ENABLED:
+        keys = [_summary_cache_key(chunk, max_gen_len, min_gen_len, ids)
+                for chunk, ids in zip(text_chunks, token_id_lists)]
+        cached = get_cached_summaries(keys)
+        if cached:
+            print(f"    (캐시) {len(text_chunks)}개 중 {sum(k in cached for k in keys)}개 청크 요약 재사용")
+    else:
+        keys = [None] * len(text_chunks)
+        cached = {}
+
+    summaries = [cached.get(key) for key in keys]
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    if on_result is not None:
+        for i, summary in enumerate(summaries):
+            if summary is not None:
+                on_result(i, summary)
+
+    # ⭐️ 캐시에 없는 청크만 SUMMARY_BATCH_SIZE개씩 묶어서 생성
+    batch_size = max(1, SUMMARY_BATCH_SIZE)
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        results = _summarize_batch([text_chunks[i] for i in batch], max_gen_len, min_gen_len,
+                                   [token_id_lists[i] for i in batch], cancel_event)
+        for i, summary in zip(batch, results):
+            summaries[i] = summary
+            if SUMMARY_CACHE_ENABLED and summary != FAILED_CHUNK_SUMMARY:
+                put_cached_summary(keys[i], KOBART_MODEL_NAME, summary)
+            if on_result is not None:
+                on_result(i, summary)
+    return summaries
+
+
+# ⭐️ [신규] 같은 레벨의 청크들을 배치 단위로 나눠 여러 스레드에서 동시에 요약
+def _summarize_level(text_chunks, max_gen_len, min_gen_len, token_id_lists=None, cancel_event=None,
+                     on_result=None):
+    """_summarize_chunks_cached와 같지만, SUMMARY_PARALLEL_WORKERS > 1이면 배치들을 병렬 실행합니다."""
+    if token_id_lists is None:
+        token_id_lists = [None] * len(text_chunks)
+    workers = max(1, SUMMARY_PARALLEL_WORKERS)
+    if workers == 1 or len(text_chunks) <= SUMMARY_BATCH_SIZE:
+        return _summarize_chunks_cached(text_chunks, max_gen_len, min_gen_len, token_id_lists,
+                                        cancel_event, on_result)
+
+    batch_size = max(1, SUMMARY_BATCH_SIZE)
+    slices = [(start, start + batch_size) for start in range(0, len(text_chunks), batch_size)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kobart") as executor:
+        futures = [executor.submit(_summarize_chunks_cached, text_chunks[a:b], max_gen_len, min_gen_len,
+                                   token_id_lists[a:b], cancel_event,
+                                   # 배치 내 위치 → 전체 위치로 변환
+                                   (lambda i, summary, a=a: on_result(a + i, summary)) if on_result else None)
+                   for a, b in slices]
+        summaries = []
+        for future in futures:  # 입력 순서대로 이어 붙임
+            summaries.extend(future.result())
+    return summaries
+
+
+# ⭐️ [신규] 백엔드 결과 비교 검사 (양자화/ONNX vs fp32)
+PARITY_SAMPLE_TEXTS = [
+    "오늘 회의에서는 다음 분기 마케팅 예산과 신제품 출시 일정을 논의했습니다. "
+    "마케팅팀은 온라인 광고 비중을 늘리자고 제안했고, 개발팀은 출시일을 2주 늦추는 방안을 요청했습니다. "
+    "최종적으로 예산은 10% 증액하고 출시일은 다음 회의에서 확정하기로 했습니다.",
+    "고객 지원 센터의 응답 시간이 지난달보다 30% 줄었습니다. "
+    "자동 응답 시스템 도입과 상담 인력 충원이 주요 원인으로 분석되었습니다. "
+    "다만 주말 응답률은 여전히 낮아 추가 대책이 필요하다는 의견이 나왔습니다.",
+]
+
+
+def check_backend_parity(sample_texts=None, max_gen_len=150, min_gen_len=30, model=None, backend=None,
+                         reference=None):
+    """
+    백엔드의 요약 결과를 fp32 torch 모델과 비교합니다. (문자열 유사도 0~1)
+    model/backend 미지정 시 현재 로드된 모델, reference 미지정 시 fp32 모델을 잠시 로드해서 비교합니다.
+    반환: {'backend', 'similarities', 'mean_similarity', 'passed'}
+    """
+    model = model or kobart_model
+    backend = backend or kobart_backend
+    if model is None or kobart_tokenizer is None:
+        print("⚠️ 비교 검사 불가: KoBART 모델이 로드되지 않았습니다.")
+        return None
+    if backend == "torch":
+        return {'backend': "torch", 'similarities': [], 'mean_similarity': 1.0, 'passed': True}
+
+    print(f"🔄 백엔드 비교 검사 중... ({backend} vs fp32)")
+    owns_reference = reference is None
+    if owns_reference:
+        reference = _load_torch_model()
+    similarities = []
+    try:
+        for text in sample_texts or PARITY_SAMPLE_TEXTS:
+            inputs, input_lengths = _encode_chunks([text])
+            ours = _generate(inputs, input_lengths, max_gen_len, min_gen_len, model=model)[0]
+            expected = _generate(inputs, input_lengths, max_gen_len, min_gen_len, model=reference)[0]
+            similarities.append(difflib.SequenceMatcher(None, ours, expected).ratio())
+    finally:
+        if owns_reference:
+            del reference  # fp32 모델 메모리 해제
+
+    mean_similarity = sum(similarities) / len(similarities) if similarities else 0.0
+    passed = mean_similarity >= KOBART_PARITY_MIN_SIMILARITY
+    if passed:
+        print(f"✅ 백엔드 비교 검사 통과: 평균 유사도 {mean_similarity:.3f}")
+    else:
+        print(f"⚠️ 백엔드 비교 검사 경고: 평균 유사도 {mean_similarity:.3f} "
+              f"(기준 {KOBART_PARITY_MIN_SIMILARITY}) - KOBART_BACKEND = \"torch\" 사용을 권장합니다.")
+    return {
+        'backend': backend,
+        'similarities': similarities,
+        'mean_similarity': mean_similarity,
+        'passed': passed
+    }
+
+
+# ⭐️ [수정] 1회 토큰화 기반 청크 분할 (이어 붙인 전체 텍스트를 한 번 토큰화한 뒤 오프셋으로 나눔)
+def _build_chunks(sentences, max_chunk_tokens=1000):
+    """
+    문장들을 공백으로 이어 붙인 텍스트를 한 번에 토큰화한 뒤,
+    토큰 수가 max_chunk_tokens를 넘지 않도록 문장 경계에서 나눕니다.
+    반환: (청크 텍스트 목록, 청크별 토큰 ID 목록)
+    - 토큰 ID는 전체 텍스트 토큰화 결과를 잘라낸 것이라 문장 사이 공백까지 그대로 반영되며,
+      생성 단계와 캐시 키(_summary_cache_key)에 그대로 사용됩니다.
+    """
+    if not sentences:
+        return [], []
+
+    # 문장별 시작/끝 문자 위치
+    starts, ends = [], []
+    position = 0
+    for sentence in sentences:
+        starts.append(position)
+        ends.append(position + len(sentence))
+        position += len(sentence) + 1
+    joined = " ".join(sentences)
+
+    encoded = kobart_tokenizer(joined, add_special_tokens=False, return_offsets_mapping=True)
+    token_ids = encoded['input_ids']
+
+    # 토큰마다 속한 문장 찾기 (앞 공백이 붙은 토큰도 있으므로 끝 위치 기준)
+    sentence_token_start = [None] * len(sentences)
+    for token_index, (char_start, char_end) in enumerate(encoded['offset_mapping']):
+        sentence_index = max(0, bisect.bisect_right(starts, max(char_start, char_end - 1)) - 1)
+        if sentence_token_start[sentence_index] is None:
+            sentence_token_start[sentence_index] = token_index
+    # 토큰이 하나도 없는 문장은 다음 문장 시작 위치를 공유 (토큰 수 0)
+    next_start = len(token_ids)
+    for i in range(len(sentences) - 1, -1, -1):
+        if sentence_token_start[i] is None:
+            sentence_token_start[i] = next_start
+        next_start = sentence_token_start[i]
+    sentence_token_start[0] = 0
+    sentence_token_end = sentence_token_start[1:] + [len(token_ids)]
+
+    chunk_texts = []
+    chunk_token_ids = []
+    first = 0
+    for i in range(1, len(sentences) + 1):
+        if i < len(sentences) and sentence_token_end[i] - sentence_token_start[first] <= max_chunk_tokens:
+            continue
+        # 다음 문장을 넣으면 넘치므로 여기까지를 하나의 청크로
+        chunk_texts.append(joined[starts[first]:ends[i - 1]])
+        chunk_token_ids.append(token_ids[sentence_token_start[first]:sentence_token_end[i - 1]])
+        first = i
+
+    return chunk_texts, chunk_token_ids
 
 
 # ⭐️ [수정] Map-Reduce 로직 + 단일 청크 최적화 + 길이 옵션
-def summarize_text(text, length_mode="medium"):
+def summarize_text(text, length_mode="medium", return_stats=False, progress_callback=None, cancel_event=None):
     """
     KoBART 모델을 사용하여 텍스트를 요약합니다.
     length_mode: 'short', 'medium', 'long'
+    return_stats=True이면 (요약, 단계별 소요 시간(초) dict)를 반환합니다.
+    progress_callback(event): 진행 상황 dict를 받는 함수 (_ProgressReporter 참고)
+    cancel_event: threading.Event - 설정되면 SummaryCancelled 예외로 중단됩니다.
+    """
+    stats = {'chunks': 0, 'reduce_levels': 0, 'chunking_sec': 0.0, 'map_sec': 0.0, 'reduce_sec': 0.0}
+    started_at = time.perf_counter()
+    progress = _ProgressReporter(progress_callback, started_at)
+    try:
+        summary = _summarize_text(text, length_mode, stats, progress, cancel_event)
+    except SummaryCancelled:
+        print(f"🛑 요약 작업 취소됨 ({time.perf_counter() - started_at:.2f}초 경과)")
+        raise
+    stats['total_sec'] = time.perf_counter() - started_at
+    print(f"⏱️ 요약 소요 시간: 청크화 {stats['chunking_sec']:.2f}초, Map {stats['map_sec']:.2f}초, "
+          f"Reduce {stats['reduce_sec']:.2f}초({stats['reduce_levels']}단계), 전체 {stats['total_sec']:.2f}초 ({stats['chunks']}개 청크)")
+
+    if return_stats:
+        return summary, stats
+    return summary
+
+
+# ⭐️ [신규] 진행 상황 전달 (콜백 예외가 요약 작업을 멈추지 않도록 보호)
+class _ProgressReporter:
+    """
+    전달되는 event dict:
+      phase: 'chunking' | 'map' | 'reduce' | 'done'
+      done / total: 해당 단계에서 완료된 청크 수 / 전체 청크 수
+      elapsed_sec: 요약 시작 후 경과 시간
+      (map 단계) chunk_index, chunk_summary: 방금 완성된 청크 요약
+      (reduce 단계) level: Reduce 레벨 (1부터), done / total: 해당 레벨에서 완료된 그룹 수 / 전체 그룹 수
     """
+
+    def __init__(self, callback, started_at):
+        self.callback = callback
+        self.started_at = started_at
+        self._lock = threading.Lock()  # 병렬 Map(SUMMARY_PARALLEL_WORKERS)에서도 done 카운트 보호
+        self._done = 0
+
+    def report(self, phase, **fields):
+        if self.callback is None:
+            return
+        event = {'phase': phase, 'elapsed_sec': round(time.perf_counter() - self.started_at, 2), **fields}
+        try:
+            self.callback(event)
+        except Exception as e:
+            print(f"⚠️ 요약 진행 상황 전달 실패: {e}")
+
+    def chunk_callback(self, total):
+        """Map 단계에서 청크 요약이 하나 완성될 때마다 호출되는 on_result 함수를 만듭니다."""
+        if self.callback is None:
+            return None
+        self._done = 0
+
+        def on_result(index, summary):
+            with self._lock:
+                self._done += 1
+                done = self._done
+            self.report('map', done=done, total=total, chunk_index=index, chunk_summary=summary)
+        return on_result
+
+    # ⭐️ [신규] Reduce 레벨 진행 상황 (그룹 요약이 하나 완성될 때마다 실제 완료 수 전달)
+    def reduce_callback(self, level, total):
+        """Reduce 레벨에서 그룹 요약이 하나 완성될 때마다 호출되는 on_result 함수를 만듭니다."""
+        self.report('reduce', level=level, done=0, total=total)
+        if self.callback is None:
+            return None
+        self._done = 0
+
+        def on_result(index, summary):
+            with self._lock:
+                self._done += 1
+                done = self._done
+            self.report('reduce', level=level, done=done, total=total)
+        return on_result
+
+
+def _summarize_text(text, length_mode, stats, progress, cancel_event=None):
     global kobart_tokenizer, kobart_model
     if not text.strip():
         return "[요약할 텍스트가 없습니다]"
@@ -124,71 +583,55 @@ def summarize_text(text, length_mode="medium"):
     if not sentences:
         return "[요약할 텍스트가 없습니다]"
 
-    # ⭐️ 2. Map 단계: 청크화
-    max_chunk_tokens = 1000
-    current_chunk_sentences = []
-    current_chunk_tokens = 0
-    intermediate_summaries = []
-
+    # ⭐️ 2. Map 단계: 청크화 (먼저 모든 청크를 만든 뒤 요약)
     print(f" (1/3) 총 {len(sentences)}개 문장 청크화 시작...")
+    phase_started = time.perf_counter()
+    chunk_texts, chunk_token_ids = _build_chunks(sentences)
 
-    for sentence in sentences:
-        sentence_tokens = len(kobart_tokenizer.tokenize(sentence))
-
-        if current_chunk_tokens + sentence_tokens > max_chunk_tokens:
-            # 청크가 꽉 찼으면 '중간 요약' 실행 (Map)
-            # 중간 요약은 정보 손실을 막기 위해 적당한 길이(150) 유지
-            if current_chunk_sentences:
-                chunk_text = " ".join(current_chunk_sentences)
-                chunk_summary = _summarize_internal(chunk_text, max_gen_len=150, min_gen_len=30)
-                intermediate_summaries.append(chunk_summary)
-
-            current_chunk_sentences = [sentence]
-            current_chunk_tokens = sentence_tokens
-        else:
-            current_chunk_sentences.append(sentence)
-            current_chunk_tokens += sentence_tokens
-
-    # ⭐️ 3. 마지막 청크 처리 (중요 수정)
-    if current_chunk_sentences:
-        chunk_text = " ".join(current_chunk_sentences)
-
-        # ⭐️ [핵심 수정] 만약 이것이 '첫 번째이자 마지막' 청크라면 (즉, 전체 텍스트가 한 번에 들어간다면)
-        # 중간 요약(150토큰)을 거치지 않고 바로 '최종 목표 길이(final_max)'로 요약합니다.
-        if not intermediate_summaries:
-            print(" (2/3) 단일 청크 요약 실행 (Reduce 생략)...")
-
-            # ⭐️ 안전 장치: 원문이 너무 짧은데 min_length가 크면 환각(반복) 발생하므로 조절
-            input_len = len(kobart_tokenizer.tokenize(chunk_text))
-            safe_min = min(final_min, input_len)  # 원문보다 길게 요약하라고 강제하지 않음
-
-            # 여기서 바로 최종 결과 생성
-            final_summary_text = _summarize_internal(chunk_text, max_gen_len=final_max, min_gen_len=safe_min)
-
-            # 포맷팅 후 바로 리턴
-            final_summary_formatted = final_summary_text.replace(". ", ".\n")
-            print("✅ 요약 작업 완료.")
-            return final_summary_formatted
-
-        else:
-            # 이전 청크들이 있다면 이것도 그냥 중간 요약의 하나일 뿐임
-            chunk_summary = _summarize_internal(chunk_text, max_gen_len=150, min_gen_len=30)
-            intermediate_summaries.append(chunk_summary)
+    stats['chunks'] = len(chunk_texts)
+    stats['chunking_sec'] = time.perf_counter() - phase_started
+    if not chunk_texts:
+        return "[요약 생성 실패]"
+    progress.report('chunking', done=0, total=len(chunk_texts))
+    _check_cancelled(cancel_event)
+
+    # ⭐️ 3. 단일 청크 처리
+    # 전체 텍스트가 한 번에 들어간다면 중간 요약(150토큰)을 거치지 않고
+    # 바로 '최종 목표 길이(final_max)'로 요약합니다.
+    if len(chunk_texts) == 1:
+        print(" (2/3) 단일 청크 요약 실행 (Reduce 생략)...")
+        # 여기서 바로 최종 결과 생성
+        # (min_length는 인코딩 시 얻은 실제 입력 길이로 자동 제한됨 - _generate 참고)
+        phase_started = time.perf_counter()
+        final_summary_text = _summarize_chunks_cached(chunk_texts, final_max, final_min, chunk_token_ids,
+                                                      cancel_event)[0]
+        stats['reduce_sec'] = time.perf_counter() - phase_started
+        progress.report('done', done=1, total=1)
+
+        # 포맷팅 후 바로 리턴
+        final_summary_formatted = final_summary_text.replace(". ", ".\n")
+        print("✅ 요약 작업 완료.")
+        return final_summary_formatted
+
+    # 중간 요약은 정보 손실을 막기 위해 적당한 길이(150) 유지
+    # (세션이 길어져도 앞쪽 청크는 그대로이므로 캐시에서 재사용되고 새 청크만 요약)
+    phase_started = time.perf_counter()
+    intermediate_summaries = _summarize_level(chunk_texts, 150, 30, chunk_token_ids, cancel_event,
+                                              progress.chunk_callback(len(chunk_texts)))
+    stats['map_sec'] = time.perf_counter() - phase_started
 
     if not intermediate_summaries:
         return "[요약 생성 실패]"
 
     print(f" (2/3) {len(intermediate_summaries)}개 중간 요약 생성 완료.")
 
-    # ⭐️ 4. Reduce 단계: 중간 요약본들을 합쳐서 최종 요약
-    combined_summary_text = "\n".join(intermediate_summaries)
-
+    # ⭐️ 4. Reduce 단계: 중간 요약본들을 계층적으로 합쳐서 최종 요약
     print(" (3/3) 중간 요약본들을 합쳐 최종 요약 중...")
-    # Reduce 단계에서도 안전 장치 적용
-    input_len = len(kobart_tokenizer.tokenize(combined_summary_text))
-    safe_min = min(final_min, input_len)
-
-    final_summary_text = _summarize_internal(combined_summary_text, max_gen_len=final_max, min_gen_len=safe_min)
+    phase_started = time.perf_counter()
+    final_summary_text = _reduce_summaries(intermediate_summaries, final_max, final_min, stats, progress,
+                                           cancel_event)
+    stats['reduce_sec'] = time.perf_counter() - phase_started
+    progress.report('done', done=len(chunk_texts), total=len(chunk_texts))
 
     # ⭐️ 5. 최종 포맷팅
     final_summary_formatted = final_summary_text.replace(". ", ".\n")
@@ -197,6 +640,36 @@ def summarize_text(text, length_mode="medium"):
     return final_summary_formatted
 
 
+# ⭐️ [신규] 계층형(트리) Reduce
+def _reduce_summaries(summaries, final_max, final_min, stats, progress, cancel_event=None):
+    """
+    중간 요약들을 토큰 수 기준(SUMMARY_REDUCE_GROUP_TOKENS)으로 묶어 다시 요약하는 과정을
+    전체가 한 번의 입력에 들어갈 때까지 반복한 뒤, 최종 길이로 한 번 더 요약합니다.
+    (모든 중간 요약이 최종 요약에 반영되며, 1024토큰을 넘는 입력이 잘려 나가지 않음)
+    """
+    level = 0
+    while True:
+        group_texts, group_token_ids = _build_chunks(summaries, SUMMARY_REDUCE_GROUP_TOKENS)
+        if len(group_texts) <= 1:
+            break
+        if len(group_texts) >= len(summaries):
+            # 요약 하나가 그룹 한도를 넘는 경우 (생성 길이가 150토큰이라 보통 발생하지 않음)
+            print(f"⚠️ Reduce 레벨 {level + 1}: 더 이상 묶을 수 없어 현재 요약들로 최종 요약합니다.")
+            break
+        level += 1
+        print(f"    Reduce 레벨 {level}: {len(summaries)}개 요약 → {len(group_texts)}개 그룹")
+        summaries = _summarize_level(group_texts, 150, 30, group_token_ids, cancel_event,
+                                     progress.reduce_callback(level, len(group_texts)))
+
+    stats['reduce_levels'] = level + 1
+    on_final = progress.reduce_callback(level + 1, 1)
+    # 마지막 1개 그룹은 최종 목표 길이로 요약 (_generate에서 실제 입력 길이로 min_length 제한)
+    if len(group_texts) != 1:
+        group_texts, group_token_ids = ["\n".join(summaries)], None
+    return _summarize_chunks_cached(group_texts, final_max, final_min, group_token_ids, cancel_event,
+                                    on_final)[0]
+
+
 def generate_summary_thread(latest_data):
     """(구버전 호환용)"""
     pass
\ No newline at end of file
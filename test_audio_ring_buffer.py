@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from audio_segmenter import AudioRingBuffer
+
+
+def ramp(start, n):
+    return np.arange(start, start + n, dtype=np.int16)
+
+
+def test_chunks_are_contiguous_across_wraparound():
+    buf = AudioRingBuffer(4, capacity=6)
+    written = 0
+    chunks = []
+    for size in (3, 3, 3, 3, 3, 3, 3, 3):  # 용량(6)의 배수가 아닌 크기로 여러 번 순환
+        buf.write(ramp(written, size))
+        written += size
+        while buf.has_chunk():
+            chunk = buf.read_chunk()
+            assert chunk.flags['C_CONTIGUOUS'] and len(chunk) == 4
+            chunks.append(chunk.copy())
+
+    assert np.array_equal(np.concatenate(chunks), ramp(0, 24))
+    assert buf.dropped_samples == 0 and len(buf) == 0
+
+
+def test_hop_smaller_than_chunk_overlaps():
+    buf = AudioRingBuffer(4, hop_size=2, capacity=8)
+    buf.write(ramp(0, 8))
+    assert list(buf.read_chunk()) == [0, 1, 2, 3]
+    assert list(buf.read_chunk()) == [2, 3, 4, 5]
+    assert list(buf.read_chunk()) == [4, 5, 6, 7]
+    assert buf.read_chunk() is None
+
+
+def test_accepts_column_shaped_blocks():
+    buf = AudioRingBuffer(4)
+    buf.write(ramp(0, 4).reshape(-1, 1))
+    assert list(buf.read_chunk()) == [0, 1, 2, 3]
+
+
+def test_overflow_drops_oldest_samples():
+    buf = AudioRingBuffer(4, capacity=8)
+    buf.write(ramp(0, 6))
+    buf.write(ramp(6, 6))  # 12 > 8 → 가장 오래된 4개 버림
+    assert buf.dropped_samples == 4
+    assert len(buf) == 8
+    assert list(buf.read_chunk()) == [4, 5, 6, 7]
+
+
+def test_block_larger_than_capacity_counts_each_lost_sample_once():
+    buf = AudioRingBuffer(100, capacity=400)
+    buf.write(ramp(0, 150))
+    buf.write(ramp(150, 1000))
+    assert buf.dropped_samples == 150 + 1000 - 400
+    assert len(buf) == 400
+    chunk = buf.read_chunk()
+    assert chunk[0] == 750 and chunk[-1] == 849
+
+
+def test_clear_resets_positions_and_drop_count():
+    buf = AudioRingBuffer(4, capacity=4)
+    buf.write(ramp(0, 10))
+    assert buf.dropped_samples == 6
+
+    buf.clear()
+    assert len(buf) == 0 and buf.dropped_samples == 0
+    buf.write(ramp(100, 4))
+    assert list(buf.read_chunk()) == [100, 101, 102, 103]
+
+
+@pytest.mark.parametrize("hop_size", [-1, 5])
+def test_invalid_hop_size_is_rejected(hop_size):
+    with pytest.raises(ValueError):
+        AudioRingBuffer(4, hop_size=hop_size)
+
+
+def test_capacity_smaller_than_chunk_is_rejected():
+    with pytest.raises(ValueError):
+        AudioRingBuffer(4, capacity=3)
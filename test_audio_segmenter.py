@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from audio_segmenter import UtteranceSegmenter
+
+FRAME = 512
+RATE = 16000
+
+
+class FakeVad:
+    """프레임의 첫 샘플 값으로 음성 확률을 정하는 가짜 VAD (호출 순서/상태 초기화 횟수 기록)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.resets = 0
+
+    def __call__(self, frame, rate):
+        self.calls += 1
+        return frame[0] * 32768.0 / 1000.0  # tensor → .item()
+
+    def reset_states(self):
+        self.resets += 1
+
+
+def frames(*probs):
+    """확률 목록 → 프레임마다 (확률 x 1000) 값으로 채운 int16 오디오"""
+    return np.concatenate([np.full(FRAME, int(round(p * 1000)), dtype=np.int16) for p in probs])
+
+
+def make_segmenter(vad=None, **kwargs):
+    params = dict(rate=RATE, frame_size=FRAME, threshold=0.5, silence_timeout_ms=10 * 32,
+                  speech_pad_ms=2 * 32, min_speech_ms=3 * 32, max_utterance_sec=15.0, batch_frames=4)
+    params.update(kwargs)
+    return UtteranceSegmenter(vad or FakeVad(), **params)
+
+
+def feed_blocks(segmenter, audio, block=FRAME):
+    utterances = []
+    for start in range(0, len(audio), block):
+        utterances += segmenter.feed(audio[start:start + block])
+    return utterances
+
+
+@pytest.fixture(autouse=True)
+def _require_torch():
+    pytest.importorskip("torch")
+
+
+def test_utterance_keeps_preroll_and_trailing_pad():
+    audio = frames(*[0.0] * 10, *[0.9] * 20, *[0.0] * 12)
+    utterances = feed_blocks(make_segmenter(), audio)
+
+    assert len(utterances) == 1
+    samples, reason, start_sec = utterances[0]
+    assert reason == "silence"
+    assert len(samples) == (2 + 20 + 2) * FRAME  # 앞 패딩 2 + 음성 20 + 뒤 패딩 2
+    assert start_sec == pytest.approx(8 * FRAME / RATE)
+    assert (samples[2 * FRAME:22 * FRAME] == 900).all()
+
+
+def test_hysteresis_frames_inside_silence_are_not_trimmed():
+    # 음성 뒤에 무음/히스테리시스(0.4: neg_threshold 0.35 ~ threshold 0.5) 프레임이 섞인 경우
+    tail = [0.0, 0.4] * 6 + [0.0] * 6
+    audio = frames(*[0.0] * 4, *[0.9] * 10, *tail, *[0.0] * 4)
+    utterances = feed_blocks(make_segmenter(), audio)
+
+    assert len(utterances) == 1
+    samples, reason, _ = utterances[0]
+    assert reason == "silence"
+    # 마지막 히스테리시스 프레임까지 남기고, 그 뒤 무음은 패딩(2프레임)만 남김
+    assert len(samples) == (2 + 10 + 12 + 2) * FRAME
+    assert samples[(2 + 10 + 11) * FRAME] == 400
+    assert (samples[-2 * FRAME:] == 0).all()
+
+
+def test_short_noise_is_discarded():
+    audio = frames(*[0.0] * 4, 0.9, 0.9, *[0.0] * 12)  # 음성 2프레임 < 최소 3프레임
+    assert feed_blocks(make_segmenter(), audio) == []
+
+
+def test_max_length_splits_long_speech():
+    segmenter = make_segmenter(max_utterance_sec=10 * FRAME / RATE)
+    utterances = feed_blocks(segmenter, frames(*[0.9] * 24))
+
+    assert [reason for _, reason, _ in utterances] == ["max_length", "max_length"]
+    assert all(len(samples) == 10 * FRAME for samples, _, _ in utterances)
+    assert utterances[1][2] == pytest.approx(10 * FRAME / RATE)
+    rest = segmenter.flush()
+    assert len(rest) == 1 and rest[0][1] == "flush" and len(rest[0][0]) == 4 * FRAME
+
+
+def test_flush_without_speech_returns_nothing():
+    segmenter = make_segmenter()
+    feed_blocks(segmenter, frames(*[0.0] * 8))
+    assert segmenter.flush() == []
+
+
+def test_vad_state_is_reset_once_and_every_frame_is_scored_in_order():
+    vad = FakeVad()
+    segmenter = make_segmenter(vad)
+    # 배치(4프레임)보다 작은/큰 블록이 섞여도 프레임은 한 번씩 순서대로 VAD에 들어감
+    audio = frames(*[0.0] * 3, *[0.9] * 6, *[0.0] * 15)
+    utterances = []
+    for size in (300, 1700, 512, 4096, 3000, len(audio)):
+        utterances += segmenter.feed(audio[:size])
+        audio = audio[size:]
+
+    assert vad.resets == 1
+    assert vad.calls == 24
+    assert len(utterances) == 1
@@ -0,0 +1,251 @@
+import sqlite3
+import time
+
+import pytest
+
+import db_handler
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """테스트마다 새 DB 파일 (스레드별 연결도 새로 생성)"""
+    db_handler.close_all_connections()
+    monkeypatch.setattr(db_handler, "DB_NAME", str(tmp_path / "test.db"))
+    db_handler.init_db()
+    yield db_handler
+    db_handler.close_all_connections()
+
+
+def insert_rows(session_id, count, start=0):
+    for i in range(start, start + count):
+        db_handler.insert_transcript(session_id, f"original {i}", f"translated {i}")
+
+
+# --- 세션 기록 페이지 ---
+def test_transcript_pages_cover_all_rows_in_order(db):
+    insert_rows("s1", 5)
+    insert_rows("other", 3)
+
+    pages = list(db.iter_transcript_pages("s1", page_size=2))
+    assert [len(rows) for rows in pages] == [2, 2, 1]
+    assert [row['original'] for rows in pages for row in rows] == [f"original {i}" for i in range(5)]
+
+
+def test_last_full_page_ends_with_empty_page(db):
+    insert_rows("s1", 4)
+    rows, cursor = db.fetch_transcript_page("s1", page_size=2)
+    rows, cursor = db.fetch_transcript_page("s1", cursor, page_size=2)
+    assert len(rows) == 2 and cursor is not None
+    rows, cursor = db.fetch_transcript_page("s1", cursor, page_size=2)
+    assert rows == [] and cursor is None
+
+
+def test_page_error_is_raised_instead_of_truncating(db, monkeypatch):
+    insert_rows("s1", 3)
+    rows, cursor = db.fetch_transcript_page("s1", page_size=2)
+
+    def locked():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(db, "get_connection", locked)
+    with pytest.raises(sqlite3.OperationalError):
+        db.fetch_transcript_page("s1", cursor, page_size=2)
+    with pytest.raises(sqlite3.OperationalError):
+        list(db.iter_transcript_pages("s1", page_size=2))
+
+
+# --- 스키마 마이그레이션 ---
+def test_legacy_database_is_migrated_with_existing_rows(tmp_path, monkeypatch):
+    path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(path)
+    legacy.executescript("""
+        CREATE TABLE transcripts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            original_text TEXT,
+            translated_text TEXT
+        );
+        INSERT INTO transcripts (session_id, timestamp, original_text, translated_text) VALUES
+            ('old', '2025-01-01 10:00:00', 'hello meeting', '안녕 회의'),
+            ('old', '2025-01-01 10:05:00', 'second line', '두 번째'),
+            ('other', '2025-01-02 09:00:00', 'another', '다른');
+    """)
+    legacy.commit()
+    legacy.close()
+
+    db_handler.close_all_connections()
+    monkeypatch.setattr(db_handler, "DB_NAME", str(path))
+    try:
+        db_handler.init_db()
+        conn = db_handler.get_connection()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == db_handler.SCHEMA_VERSION
+
+        details = {d['session_id']: d for d in db_handler.get_session_details()}
+        assert details['old']['row_count'] == 2
+        assert details['old']['start_time'] == '2025-01-01 10:00:00'
+        assert details['old']['last_activity'] == '2025-01-01 10:05:00'
+        assert db_handler.get_all_session_ids()[0] == 'other'  # 최근 활동순
+
+        # 기존 행도 검색 인덱스에 포함되고, 새 컬럼이 추가됨
+        assert [r['session_id'] for r in db_handler.search_transcripts("meeting")] == ['old']
+        db_handler.insert_transcript('old', 'third', '세 번째', speaker='SPEAKER_00', start_sec=1.0, end_sec=2.0)
+        assert db_handler.get_session_details()[0]['row_count'] == 3
+
+        db_handler.init_db()  # 두 번 실행해도 그대로
+        assert conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0] == 4
+    finally:
+        db_handler.close_all_connections()
+
+
+def test_insert_and_delete_keep_session_row_count(db):
+    insert_rows("s1", 3)
+    assert db.get_session_details()[0]['row_count'] == 3
+    assert db.delete_session("s1")
+    assert db.get_all_session_ids() == []
+
+
+# --- 세션 이름 변경 ---
+def test_rename_moves_rows_metadata_and_wav_path(db):
+    db.register_session("old", "wav/old.wav")
+    insert_rows("old", 2)
+
+    assert db.rename_session("old", "new", wav_path="wav/new.wav")
+    details = db.get_session_details()
+    assert [(d['session_id'], d['row_count'], d['wav_path']) for d in details] == [("new", 2, "wav/new.wav")]
+    assert len(list(db.iter_transcript_pages("new"))[0]) == 2
+
+
+def test_rename_session_without_transcripts(db):
+    db.register_session("empty", "wav/empty.wav")
+    assert db.rename_session("empty", "renamed")
+    assert db.get_all_session_ids() == ["renamed"]
+    assert db.get_session_details()[0]['wav_path'] == "wav/empty.wav"  # wav_path 미지정 시 그대로
+
+
+def test_rename_fails_for_missing_or_taken_names(db):
+    db.register_session("a")
+    db.register_session("b")
+    assert not db.rename_session("missing", "x")
+    assert not db.rename_session("a", "b")
+    assert sorted(db.get_all_session_ids()) == ["a", "b"]
+
+
+# --- 전문 검색 (FTS5) ---
+def set_timestamp(row_id, timestamp):
+    conn = db_handler.get_connection()
+    conn.execute("UPDATE transcripts SET timestamp = ? WHERE id = ?", (timestamp, row_id))
+    conn.commit()
+
+
+def test_search_matches_word_prefixes_in_both_columns(db):
+    db.insert_transcript("s1", "The meeting starts now", "회의가 시작됩니다")
+    db.insert_transcript("s1", "unrelated text", "관계없는 문장")
+
+    assert [r['original'] for r in db.search_transcripts("meet")] == ["The meeting starts now"]
+    assert [r['translated'] for r in db.search_transcripts("회의")] == ["회의가 시작됩니다"]
+    # 모든 단어를 포함해야 함 (AND)
+    assert db.search_transcripts("meeting unrelated") == []
+    assert db.search_transcripts("   ") == []
+
+
+def test_search_snippets_highlight_matches(db):
+    db.insert_transcript("s1", "budget review for next quarter", "다음 분기 예산 검토")
+    result = db.search_transcripts("budget")[0]
+    assert "[budget]" in result['original_snippet']
+    assert result['translated_snippet'] == "다음 분기 예산 검토"
+
+
+def test_search_quotes_are_not_fts_syntax(db):
+    db.insert_transcript("s1", 'say "hello" OR bye', "인사")
+    assert len(db.search_transcripts('"hello" OR')) == 1
+
+
+def test_search_filters_by_session_and_time(db):
+    db.insert_transcript("a", "deploy plan", "배포 계획")
+    db.insert_transcript("b", "deploy done", "배포 완료")
+    db.insert_transcript("b", "deploy again", "재배포")
+    rows = {r['original']: r['id'] for r in db.search_transcripts("deploy")}
+    assert len(rows) == 3
+    set_timestamp(rows["deploy plan"], "2025-01-01 09:00:00")
+    set_timestamp(rows["deploy done"], "2025-01-02 09:00:00")
+    set_timestamp(rows["deploy again"], "2025-01-03 09:00:00")
+
+    assert {r['original'] for r in db.search_transcripts("deploy", session_id="b")} == {"deploy done", "deploy again"}
+    assert [r['original'] for r in db.search_transcripts(
+        "deploy", start_time="2025-01-02 00:00:00", end_time="2025-01-02 23:59:59")] == ["deploy done"]
+    assert len(db.search_transcripts("deploy", limit=1)) == 1
+
+
+def test_search_index_follows_deletes_and_renames(db):
+    db.insert_transcript("old", "keyword here", "키워드")
+    assert db.rename_session("old", "new")
+    assert [r['session_id'] for r in db.search_transcripts("keyword")] == ["new"]
+
+    assert db.delete_session("new")
+    assert db.search_transcripts("keyword") == []
+
+
+# --- 일괄 기록 (TranscriptWriter) ---
+def row_count(session_id):
+    conn = db_handler.get_connection()
+    return conn.execute("SELECT COUNT(*) FROM transcripts WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+
+def wait_for_rows(session_id, expected, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while row_count(session_id) < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return row_count(session_id)
+
+
+def test_writer_writes_when_batch_is_full(db):
+    writer = db.TranscriptWriter(batch_size=3, flush_interval=60)
+    for i in range(5):
+        writer.enqueue("s1", f"original {i}", f"translated {i}")
+
+    assert wait_for_rows("s1", 3) == 3
+    time.sleep(0.1)
+    assert row_count("s1") == 3  # 나머지 2개는 배치가 차거나 flush할 때까지 대기
+    assert writer.flush(timeout=2)
+    assert row_count("s1") == 5
+
+
+def test_writer_writes_partial_batch_after_interval(db):
+    writer = db.TranscriptWriter(batch_size=100, flush_interval=0.2)
+    started = time.monotonic()
+    writer.enqueue("s1", "only one", "하나")
+
+    assert wait_for_rows("s1", 1) == 1
+    assert time.monotonic() - started >= 0.15
+
+
+def test_writer_flush_waits_for_everything_enqueued(db):
+    writer = db.TranscriptWriter(batch_size=50, flush_interval=60)
+    assert writer.flush(timeout=1)  # 아무것도 넣지 않았으면 바로 True
+    for i in range(120):
+        writer.enqueue("s1", f"original {i}", f"translated {i}")
+
+    assert writer.flush(timeout=5)
+    pages = list(db.iter_transcript_pages("s1", page_size=200))
+    assert [row['original'] for row in pages[0]] == [f"original {i}" for i in range(120)]
+
+
+def test_writer_stores_live_segments_with_sentence_span(db):
+    writer = db.TranscriptWriter(batch_size=10, flush_interval=60)
+    writer.enqueue("s1", "hello world", "안녕 세상", speaker="SPEAKER_01", segments=[
+        {'start': 1.5, 'end': 2.0, 'text': "hello"},
+        {'start': 2.0, 'end': 3.25, 'text': "world"},
+    ])
+    writer.enqueue("s1", "no segments", "세그먼트 없음")
+    assert writer.flush(timeout=2)
+
+    conn = db.get_connection()
+    rows = conn.execute(
+        "SELECT speaker, start_sec, end_sec FROM transcripts WHERE session_id = 's1' ORDER BY id").fetchall()
+    assert rows == [("SPEAKER_01", 1.5, 3.25), (None, None, None)]
+    assert db.get_live_segments("s1") == [
+        {'start': 1.5, 'end': 2.0, 'text': "hello"},
+        {'start': 2.0, 'end': 3.25, 'text': "world"},
+    ]
+    assert db.get_live_segments("s1", start_sec=2.0) == [{'start': 2.0, 'end': 3.25, 'text': "world"}]
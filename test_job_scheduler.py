@@ -0,0 +1,143 @@
+import threading
+
+import pytest
+
+from job_scheduler import JobScheduler, JobQueueFull, PRIORITY_HIGH, PRIORITY_LOW, STATUS_CANCELLED, \
+    STATUS_DONE, STATUS_FAILED
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = JobScheduler({'work': (1, 3)})
+    yield scheduler
+    scheduler.shutdown(timeout=2.0)
+
+
+def _block_worker(scheduler):
+    """작업 스레드 1개를 붙잡아 두는 작업 (release.set()으로 해제)"""
+    started, release = threading.Event(), threading.Event()
+
+    def blocker(job):
+        started.set()
+        release.wait(5.0)
+
+    job, _ = scheduler.submit('work', 'blocker', blocker)
+    assert started.wait(2.0)
+    return job, release
+
+
+def test_same_key_is_coalesced_into_one_job(scheduler):
+    blocker, release = _block_worker(scheduler)
+    runs = []
+    first, created_first = scheduler.submit('work', 's1', lambda job: runs.append(job.job_id), subscriber='a')
+    second, created_second = scheduler.submit('work', 's1', lambda job: runs.append('dup'), subscriber='b')
+    other, created_other = scheduler.submit('work', 's2', lambda job: runs.append(job.job_id))
+
+    assert created_first and not created_second and created_other
+    assert second is first and other is not first
+    assert set(scheduler.subscribers(first)) == {'a', 'b'}
+
+    release.set()
+    assert first.wait(2.0) and other.wait(2.0)
+    assert runs == [first.job_id, other.job_id]
+    assert first.status == STATUS_DONE
+
+
+def test_finished_job_is_not_reused(scheduler):
+    job, _ = scheduler.submit('work', 's1', lambda job: 1)
+    assert job.wait(2.0)
+    again, created = scheduler.submit('work', 's1', lambda job: 2)
+    assert created and again is not job
+    assert again.wait(2.0) and again.result == 2
+
+
+def test_full_queue_rejects_new_jobs(scheduler):
+    blocker, release = _block_worker(scheduler)
+    for i in range(3):
+        scheduler.submit('work', f"s{i}", lambda job: None)
+    with pytest.raises(JobQueueFull):
+        scheduler.submit('work', 's-extra', lambda job: None)
+    # 합쳐지는 요청은 대기열이 가득 차도 받음
+    _, created = scheduler.submit('work', 's0', lambda job: None)
+    assert not created
+    release.set()
+
+
+def test_higher_priority_runs_first(scheduler):
+    blocker, release = _block_worker(scheduler)
+    order = []
+    low, _ = scheduler.submit('work', 'low', lambda job: order.append('low'), priority=PRIORITY_LOW)
+    high, _ = scheduler.submit('work', 'high', lambda job: order.append('high'), priority=PRIORITY_HIGH)
+    release.set()
+    assert low.wait(2.0) and high.wait(2.0)
+    assert order == ['high', 'low']
+
+
+def test_coalesced_request_raises_priority(scheduler):
+    blocker, release = _block_worker(scheduler)
+    order = []
+    scheduler.submit('work', 'a', lambda job: order.append('a'), priority=PRIORITY_LOW)
+    b, _ = scheduler.submit('work', 'b', lambda job: order.append('b'), priority=PRIORITY_LOW)
+    scheduler.submit('work', 'b', lambda job: None, priority=PRIORITY_HIGH)
+    release.set()
+    assert b.wait(2.0)
+    scheduler.shutdown(timeout=2.0)
+    assert order == ['b', 'a']  # 우선순위가 올라간 작업은 한 번만 실행됨
+
+
+def test_cancel_queued_job_never_runs(scheduler):
+    blocker, release = _block_worker(scheduler)
+    runs = []
+    job, _ = scheduler.submit('work', 's1', lambda job: runs.append(1))
+    assert scheduler.cancel(job.job_id)
+    assert job.status == STATUS_CANCELLED and job.done_event.is_set()
+    release.set()
+    assert blocker.wait(2.0)
+    scheduler.shutdown(timeout=2.0)
+    assert runs == []
+    assert not scheduler.cancel(job.job_id)  # 이미 끝난 작업
+
+
+def test_cancel_running_job_sets_cancel_event(scheduler):
+    started = threading.Event()
+
+    def cooperative(job):
+        started.set()
+        job.cancel_event.wait(5.0)
+
+    job, _ = scheduler.submit('work', 's1', cooperative)
+    assert started.wait(2.0)
+    assert scheduler.cancel(job.job_id)
+    assert job.wait(2.0)
+    assert job.status == STATUS_CANCELLED
+    # 취소 후 같은 요청은 새 작업으로 등록됨
+    again, created = scheduler.submit('work', 's1', lambda job: None)
+    assert created and again is not job
+
+
+def test_last_unsubscribe_cancels_job(scheduler):
+    blocker, release = _block_worker(scheduler)
+    job, _ = scheduler.submit('work', 's1', lambda job: None, subscriber='a')
+    scheduler.submit('work', 's1', lambda job: None, subscriber='b')
+    assert not scheduler.unsubscribe(job.job_id, 'a')
+    assert scheduler.unsubscribe(job.job_id, 'b')
+    assert job.status == STATUS_CANCELLED
+    release.set()
+
+
+def test_failed_job_records_error_and_worker_survives(scheduler):
+    def boom(job):
+        raise RuntimeError("boom")
+
+    failed, _ = scheduler.submit('work', 's1', boom)
+    assert failed.wait(2.0)
+    assert failed.status == STATUS_FAILED and str(failed.error) == "boom"
+
+    ok, _ = scheduler.submit('work', 's2', lambda job: "ok")
+    assert ok.wait(2.0) and ok.result == "ok"
+    assert scheduler.get(ok.job_id)['status'] == STATUS_DONE
+
+
+def test_unknown_kind_is_rejected(scheduler):
+    with pytest.raises(ValueError):
+        scheduler.submit('other', 's1', lambda job: None)
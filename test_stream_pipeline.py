@@ -0,0 +1,160 @@
+import threading
+import time
+
+from stream_pipeline import PipelineStage, StreamingPipeline, POLICY_BLOCK, POLICY_DROP_OLDEST, \
+    POLICY_DROP_NEWEST
+
+
+def _collector():
+    items = []
+    return items, lambda item: items.append(item)
+
+
+def test_stop_drains_remaining_items_in_order():
+    items, handler = _collector()
+    stage = PipelineStage("sink", handler, maxsize=0)
+    stage.start()
+    for i in range(100):
+        stage.put(i)
+
+    assert stage.stop(timeout=5.0)
+    assert items == list(range(100))
+    assert stage.stats.snapshot()['processed'] == 100
+
+
+def test_handler_results_are_forwarded_to_next_stage():
+    items, handler = _collector()
+    pipeline = StreamingPipeline([
+        PipelineStage("double", lambda x: [x, x], maxsize=4),
+        PipelineStage("sink", handler, maxsize=4),
+    ])
+    pipeline.start()
+    for i in range(10):
+        pipeline.put(i)
+
+    assert pipeline.stop(timeout_per_stage=5.0)
+    assert items == [i for i in range(10) for _ in range(2)]
+
+
+def test_handler_error_is_counted_and_stage_keeps_running():
+    items, collect = _collector()
+
+    def handler(item):
+        if item == 1:
+            raise RuntimeError("boom")
+        collect(item)
+
+    stage = PipelineStage("sink", handler)
+    stage.start()
+    for i in range(3):
+        stage.put(i)
+
+    assert stage.stop(timeout=5.0)
+    assert items == [0, 2]
+    assert stage.stats.snapshot()['errors'] == 1
+
+
+def test_drop_oldest_keeps_newest_items():
+    items, handler = _collector()
+    stage = PipelineStage("sink", handler, maxsize=2, policy=POLICY_DROP_OLDEST)
+    for i in range(5):  # 작업 스레드 시작 전이므로 큐에 그대로 쌓임
+        assert stage.put(i)
+
+    stage.start()
+    assert stage.stop(timeout=5.0)
+    assert items == [3, 4]
+    assert stage.stats.snapshot()['dropped'] == 3
+
+
+def test_drop_newest_keeps_oldest_items():
+    items, handler = _collector()
+    stage = PipelineStage("sink", handler, maxsize=2, policy=POLICY_DROP_NEWEST)
+    results = [stage.put(i) for i in range(5)]
+
+    stage.start()
+    assert stage.stop(timeout=5.0)
+    assert results == [True, True, False, False, False]
+    assert items == [0, 1]
+    assert stage.stats.snapshot()['dropped'] == 3
+
+
+def test_stop_on_full_blocking_queue_returns_within_timeout():
+    release = threading.Event()
+    stage = PipelineStage("slow", lambda item: release.wait(5.0), maxsize=2, policy=POLICY_BLOCK)
+    stage.start()
+    for i in range(3):  # 1개는 처리 중, 2개는 큐에 (가득 참)
+        stage.put(i)
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    assert not stage.stop(timeout=0.2)
+    assert time.monotonic() - started < 1.0
+    assert stage.stats.snapshot()['dropped'] == 2
+    release.set()
+
+
+def test_each_stage_gets_its_own_budget_and_last_stage_always_drains():
+    release = threading.Event()
+    items, collect = _collector()
+
+    def slow_first(item):
+        if item == 0:
+            release.wait(5.0)
+        return [item]
+
+    def slow_sink(item):
+        time.sleep(0.05)
+        collect(item)
+
+    first = PipelineStage("first", slow_first, maxsize=8)
+    last = PipelineStage("last", slow_sink, maxsize=8)
+    pipeline = StreamingPipeline([first, last])
+    pipeline.start()
+    for i in range(4):
+        pipeline.put(i)
+    time.sleep(0.05)
+    threading.Timer(0.5, release.set).start()  # 첫 단계는 제한 시간 초과 후에 풀림
+
+    started = time.monotonic()
+    assert not pipeline.stop(timeout_per_stage=0.2)
+    assert time.monotonic() - started < 0.5  # 마지막 단계는 비어 있으므로 바로 종료
+    assert first.stats.snapshot()['dropped'] == 3
+    # 제한 시간 이후에 끝난 항목도 전달되지 않고 버린 항목으로 집계됨
+    time.sleep(0.5)
+    assert first.stats.snapshot()['dropped'] == 4
+    assert items == []
+    assert last.stats.snapshot()['dropped'] == 0
+
+
+def test_last_stage_is_not_cut_off_by_budget():
+    items, collect = _collector()
+
+    def slow_sink(item):
+        time.sleep(0.15)
+        collect(item)
+
+    pipeline = StreamingPipeline([
+        PipelineStage("first", lambda item: [item], maxsize=16),
+        PipelineStage("last", slow_sink, maxsize=16),
+    ])
+    pipeline.start()
+    for i in range(10):
+        pipeline.put(i)
+
+    # 마지막 단계는 1.5초 걸리지만 제한 시간과 관계없이 모두 처리됨
+    assert pipeline.stop(timeout_per_stage=1.0)
+    assert items == list(range(10))
+    assert pipeline.stats()[-1]['dropped'] == 0
+
+
+def test_stage_can_restart_after_stop():
+    items, handler = _collector()
+    stage = PipelineStage("sink", handler)
+    stage.start()
+    stage.put(1)
+    assert stage.stop(timeout=5.0)
+
+    stage.start()
+    stage.put(2)
+    assert stage.stop(timeout=5.0)
+    assert items == [1, 2]
@@ -1,4 +1,4 @@
-from db_handler import fetch_data_from_db, get_latest_session_id
+from db_handler import init_db, fetch_data_from_db, get_latest_session_id
 from summary_handler import load_kobart_model, summarize_text
 from config import KOBART_MODEL_NAME
 
@@ -9,6 +9,9 @@ def run_test():
     print(f"=== KOBART 요약 테스트 시작 ===")
     print(f"사용 중인 모델: {KOBART_MODEL_NAME}\n")
 
+    # 0. DB 스키마 확인 (요약 캐시 테이블 포함)
+    init_db()
+
     # 1. 모델 로드
     success = load_kobart_model()
 
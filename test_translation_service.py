@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+
+from translation_service import LRUCache, TranslationService, normalize_text
+
+
+class RecordingBackend:
+    """요청을 기록하고, results에 지정한 번역(기본: 대문자 변환)을 반환하는 백엔드"""
+
+    name = "recording"
+
+    def __init__(self, results=None, gate=None):
+        self.results = results or {}
+        self.gate = gate  # 설정되면 요청을 잠시 붙잡아 둠 (동시 요청 합치기 확인용)
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def translate_batch(self, texts, source, target):
+        with self._lock:
+            self.batches.append(list(texts))
+        if self.gate is not None:
+            self.gate.wait(5.0)
+        return [self.results.get(text, text.upper()) for text in texts]
+
+    @property
+    def requested(self):
+        return [text for batch in self.batches for text in batch]
+
+
+def make_service(backend, **kwargs):
+    params = dict(cache_size=100, cache_max_chars=0, batch_window_ms=20, max_batch_size=16,
+                  max_batch_chars=4500, num_workers=1)
+    params.update(kwargs)
+    return TranslationService(backend, **params)
+
+
+def test_cache_hit_skips_backend_and_uses_normalized_key():
+    backend = RecordingBackend()
+    service = make_service(backend)
+
+    assert service.translate("hello  world", "ko") == "HELLO WORLD"
+    assert service.translate("  hello world ", "ko") == "HELLO WORLD"
+    assert backend.requested == ["hello world"]
+    assert service.stats()['cache_hits'] == 1
+
+
+def test_language_pair_is_part_of_the_key():
+    backend = RecordingBackend()
+    service = make_service(backend)
+    service.translate("hello", "ko")
+    service.translate("hello", "ja")
+    assert backend.requested == ["hello", "hello"]
+
+
+def test_empty_result_is_not_cached():
+    backend = RecordingBackend(results={"flaky": ""})
+    service = make_service(backend)
+
+    assert service.translate("flaky", "ko") == ""
+    backend.results["flaky"] = "OK"
+    assert service.translate("flaky", "ko") == "OK"
+    assert backend.requested == ["flaky", "flaky"]
+    assert service.translate("flaky", "ko") == "OK"
+    assert len(backend.requested) == 2
+
+
+def test_concurrent_requests_for_same_text_are_coalesced():
+    gate = threading.Event()
+    backend = RecordingBackend(gate=gate)
+    service = make_service(backend)
+
+    first = service.submit("same", "ko")
+    second = service.submit("same", "ko")
+    assert second is first
+    gate.set()
+    assert first.result(timeout=5.0) == "SAME"
+    assert backend.requested == ["same"]
+
+
+def test_requests_in_window_are_batched_in_order():
+    backend = RecordingBackend()
+    service = make_service(backend, batch_window_ms=200)
+
+    results = service.translate_many(["a", "b", "", "c"], "ko", timeout=5.0)
+    assert results == ["A", "B", "", "C"]
+    assert backend.batches == [["a", "b", "c"]]
+
+
+def test_backend_error_fails_all_futures_and_is_not_cached():
+    class FailingBackend(RecordingBackend):
+        def translate_batch(self, texts, source, target):
+            super().translate_batch(texts, source, target)
+            raise RuntimeError("network down")
+
+    backend = FailingBackend()
+    service = make_service(backend)
+    with pytest.raises(RuntimeError):
+        service.translate("hello", "ko", timeout=5.0)
+    with pytest.raises(RuntimeError):
+        service.translate("hello", "ko", timeout=5.0)
+    assert backend.requested == ["hello", "hello"]
+
+
+def test_lru_evicts_least_recently_used_by_count():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a가 최근 사용
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_lru_evicts_by_total_weight():
+    cache = LRUCache(100, max_weight=10)
+    cache.put("a", "x", weight=4)
+    cache.put("b", "y", weight=4)
+    cache.put("c", "z", weight=4)  # 합계 12 > 10 → 가장 오래된 a 제거
+    assert cache.get("a") is None
+    assert cache.weight == 8 and len(cache) == 2
+
+    cache.put("b", "y2", weight=1)  # 같은 키 갱신 시 크기도 갱신
+    assert cache.weight == 5
+    cache.put("huge", "w", weight=11)  # 혼자서 한도를 넘는 항목은 저장하지 않음
+    assert cache.get("huge") is None and len(cache) == 2
+
+
+def test_service_cache_is_bounded_by_characters():
+    backend = RecordingBackend()
+    service = make_service(backend, cache_max_chars=20)
+    for text in ("aaaaa", "bbbbb", "ccccc"):  # 항목마다 원문 5 + 번역 5 = 10자
+        service.translate(text, "ko")
+    assert service.stats()['cache_chars'] == 20
+    assert service.cache.get(("aaaaa", "auto", "ko")) is None
+
+
+def test_normalize_text_collapses_whitespace():
+    assert normalize_text("  a \n b\t c ") == "a b c"
@@ -0,0 +1,272 @@
+import threading
+import queue
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import config
+
+# ============================================
+# 🌐 공용 번역 서비스
+# ============================================
+# - (작업 스레드, source, target)마다 번역 클라이언트를 재사용
+# - 정규화된 텍스트 + 언어 쌍 기준 LRU 캐시 ("yes", "okay" 같은 반복 문장은 네트워크 호출 없음)
+# - 작업 스레드가 짧은 시간 동안 모인 요청을 묶어서(batch) 한 번에 번역 (스레드 수만큼 병렬)
+# - 같은 문장이 동시에 요청되면 하나의 요청으로 합침(coalescing)
+# - 백엔드 교체 가능 (오프라인용 "stub")
+
+
+def normalize_text(text):
+    """캐시 키용 정규화 (앞뒤/중복 공백 제거)"""
+    return " ".join(text.split())
+
+
+# --- 번역 백엔드 ---
+class GoogleTranslateBackend:
+    """deep_translator.GoogleTranslator 기반 백엔드 (작업 스레드 + 언어 쌍별 클라이언트 재사용)"""
+
+    name = "google"
+    # 여러 문장을 한 요청으로 보낼 때 사용하는 구분자
+    separator = "\n"
+
+    def __init__(self):
+        from deep_translator import GoogleTranslator
+        self._translator_cls = GoogleTranslator
+        # ⭐️ [수정] 작업 스레드별 클라이언트 (GoogleTranslator는 요청 텍스트/언어를 객체에 저장하므로
+        # 여러 스레드가 같은 객체를 쓰면 서로의 요청을 덮어씀)
+        self._local = threading.local()
+
+    def _client(self, source, target):
+        clients = self._local.__dict__.setdefault("clients", {})
+        key = (source, target)
+        client = clients.get(key)
+        if client is None:
+            client = self._translator_cls(source=source, target=target)
+            clients[key] = client
+        return client
+
+    def translate(self, text, source, target):
+        return self._client(source, target).translate(text)
+
+    def translate_batch(self, texts, source, target):
+        """여러 문장을 줄바꿈으로 묶어 1회 요청. 줄 수가 어긋나면 문장별로 다시 요청합니다."""
+        if len(texts) == 1:
+            return [self.translate(texts[0], source, target)]
+
+        joined = self._client(source, target).translate(self.separator.join(texts))
+        parts = joined.split(self.separator) if joined else []
+        if len(parts) == len(texts):
+            return [p.strip() for p in parts]
+
+        print(f"⚠️ 묶음 번역 결과 줄 수 불일치 ({len(parts)} != {len(texts)}), 문장별로 재시도")
+        return [self.translate(text, source, target) for text in texts]
+
+
+class StubTranslateBackend:
+    """오프라인/테스트용 백엔드 (원문을 그대로 반환)"""
+
+    name = "stub"
+
+    def translate(self, text, source, target):
+        return text
+
+    def translate_batch(self, texts, source, target):
+        return list(texts)
+
+
+TRANSLATION_BACKENDS = {
+    GoogleTranslateBackend.name: GoogleTranslateBackend,
+    StubTranslateBackend.name: StubTranslateBackend,
+}
+
+
+# --- LRU 캐시 ---
+class LRUCache:
+    """
+    가장 오래 사용하지 않은 항목부터 제거하는 캐시 (스레드 안전)
+    ⭐️ [수정] 항목 수(max_size)와 크기 합계(max_weight, 예: 글자 수) 중 하나라도 넘으면 제거 (0이면 제한 없음)
+    """
+
+    def __init__(self, max_size, max_weight=0):
+        self.max_size = max_size
+        self.max_weight = max_weight
+        self._data = OrderedDict()  # key -> (value, weight)
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, weight=0):
+        if self.max_size <= 0 or (self.max_weight and weight > self.max_weight):
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._weight -= previous[1]
+            self._data[key] = (value, weight)
+            self._weight += weight
+            while len(self._data) > self.max_size or (self.max_weight and self._weight > self.max_weight):
+                _, (_, evicted_weight) = self._data.popitem(last=False)
+                self._weight -= evicted_weight
+
+    @property
+    def weight(self):
+        return self._weight
+
+    def __len__(self):
+        return len(self._data)
+
+
+# --- 번역 서비스 ---
+class TranslationService:
+    def __init__(self, backend, cache_size=config.TRANSLATION_CACHE_SIZE,
+                 cache_max_chars=config.TRANSLATION_CACHE_MAX_CHARS,
+                 batch_window_ms=config.TRANSLATION_BATCH_WINDOW_MS,
+                 max_batch_size=config.TRANSLATION_MAX_BATCH_SIZE,
+                 max_batch_chars=config.TRANSLATION_MAX_BATCH_CHARS,
+                 num_workers=config.TRANSLATION_WORKERS):
+        self.backend = backend
+        self.cache = LRUCache(cache_size, cache_max_chars)
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_chars = max_batch_chars
+        self._pending = queue.Queue()
+        self._inflight = {}  # key -> Future (같은 문장 요청 합치기)
+        self._lock = threading.Lock()
+        # 작업 스레드 수 = 동시에 보낼 수 있는 최대 번역 요청 수
+        self._workers = [
+            threading.Thread(target=self._run, name=f"translation-worker-{i}", daemon=True)
+            for i in range(max(1, num_workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, text, target, source="auto"):
+        """번역 요청을 등록하고 Future를 반환합니다. (캐시 적중 시 즉시 완료된 Future)"""
+        normalized = normalize_text(text)
+        key = (normalized, source, target)
+
+        future = Future()
+        cached = self.cache.get(key)
+        if cached is not None:
+            future.set_result(cached)
+            return future
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                return inflight
+            self._inflight[key] = future
+        self._pending.put((key, future))
+        return future
+
+    def translate(self, text, target, source="auto", timeout=config.TRANSLATION_TIMEOUT_SEC):
+        """블로킹 번역. 실패/시간 초과 시 예외를 그대로 올립니다."""
+        if not text or not text.strip():
+            return ""
+        return self.submit(text, target, source).result(timeout=timeout)
+
+    def translate_many(self, texts, target, source="auto", timeout=None):
+        """여러 문장을 한꺼번에 요청하고 순서대로 결과(또는 예외 객체)를 반환합니다."""
+        futures = [self.submit(t, target, source) if t and t.strip() else None for t in texts]
+        results = []
+        for future in futures:
+            if future is None:
+                results.append("")
+                continue
+            try:
+                results.append(future.result(timeout=timeout))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _collect_batch(self):
+        first = self._pending.get()
+        batch = [first]
+        chars = len(first[0][0])
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size and chars < self.max_batch_chars:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            chars += len(item[0][0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+
+            # 언어 쌍별로 묶어서 요청
+            groups = {}
+            for key, future in batch:
+                groups.setdefault((key[1], key[2]), []).append((key, future))
+
+            for (source, target), items in groups.items():
+                texts = [key[0] for key, _ in items]
+                try:
+                    translations = self.backend.translate_batch(texts, source, target)
+                    if len(translations) != len(items):
+                        raise RuntimeError(f"번역 결과 개수 불일치 ({len(translations)} != {len(items)})")
+                    for (key, future), translated in zip(items, translations):
+                        translated = translated or ""
+                        # ⭐️ [수정] 빈 결과(일시적 실패 등)는 캐시하지 않음 - 다음 요청 때 다시 번역
+                        if translated:
+                            self.cache.put(key, translated, weight=len(key[0]) + len(translated))
+                        future.set_result(translated)
+                except Exception as e:
+                    print(f"⚠️ 번역 요청 실패 ({len(items)}개 문장): {e}")
+                    traceback.print_exc()
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+                finally:
+                    with self._lock:
+                        for key, _ in items:
+                            self._inflight.pop(key, None)
+
+    def stats(self):
+        return {
+            'backend': self.backend.name,
+            'cache_size': len(self.cache),
+            'cache_chars': self.cache.weight,
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+        }
+
+
+# --- 공용 인스턴스 ---
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_translation_service():
+    """config.TRANSLATION_BACKEND 설정으로 공용 번역 서비스를 (최초 1회) 생성합니다."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            backend_cls = TRANSLATION_BACKENDS.get(config.TRANSLATION_BACKEND)
+            if backend_cls is None:
+                print(f"⚠️ 알 수 없는 번역 백엔드 '{config.TRANSLATION_BACKEND}', stub으로 대체합니다.")
+                backend_cls = StubTranslateBackend
+            _service = TranslationService(backend_cls())
+            print(f"✅ 번역 서비스 준비 완료 (백엔드: {_service.backend.name})")
+        return _service
+
+
+def translate(text, target, source="auto"):
+    return get_translation_service().translate(text, target, source)